@@ -0,0 +1 @@
+"""Benchmarks for `portray`, run from the project root (see `benchmarks/run.py`)."""
@@ -0,0 +1,89 @@
+"""Benchmarks how generating the nav for a tree of Markdown documents (`render._nested_docs`)
+scales with the number of documents, compared against the previous glob based implementation.
+
+Run from the project root using: `python benchmarks/nested_docs.py`
+"""
+import os
+import sys
+import tempfile
+import timeit
+from functools import partial
+from glob import glob
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portray import config, render  # noqa: E402
+
+SIZES = (100, 1_000, 10_000, 50_000)
+FILES_PER_DIRECTORY = 20
+
+
+def glob_nested_docs(directory: str, root_directory: str, config: dict) -> list:
+    """The glob based `_nested_docs` implementation used up to portray 1.8.0.
+
+    Note: its non-recursive `**` glob omits directories whose documents are two or more
+    levels deep, so the generated trees are kept shallow enough for both to produce the same nav.
+    """
+    nav: list = [
+        render._doc(doc, root_directory, config)
+        for doc in sorted(glob(os.path.join(directory, "*.md")))
+    ]
+    for nested_dir in sorted(glob(os.path.join(directory, "*/"))):
+        if glob(os.path.join(nested_dir, "*.md")) + glob(os.path.join(nested_dir, "**/*.md")):
+            nav.append(
+                {
+                    render._label(nested_dir[:-1], config): glob_nested_docs(
+                        nested_dir, root_directory, config
+                    )
+                }
+            )
+    return nav
+
+
+def docs_tree(root: str, files: int, files_per_directory: int = FILES_PER_DIRECTORY) -> str:
+    """Writes `files` Markdown documents beneath root, spread across `package_*/module_*`
+    directories, returning the top level documentation directory.
+    """
+    docs_dir = os.path.join(root, "reference")
+    for index in range(files):
+        directory_index = index // files_per_directory
+        directory = os.path.join(
+            docs_dir, f"package_{directory_index // 10}", f"module_{directory_index % 10}"
+        )
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"page_{index}.md"), "w") as doc:
+            doc.write(f"# Page {index}\n")
+    return docs_dir
+
+
+def main() -> None:
+    print(f"{'documents':>10} {'scandir (s)':>12} {'glob (s)':>10} {'speedup':>8}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as root:
+            docs_dir = docs_tree(root, size)
+            assert render._nested_docs(docs_dir, root, config.PORTRAY_DEFAULTS) == (
+                glob_nested_docs(docs_dir, root, config.PORTRAY_DEFAULTS)
+            )
+            repeat = max(1, 1_000 // size)
+            scandir_time = min(
+                timeit.repeat(
+                    partial(render._nested_docs, docs_dir, root, config.PORTRAY_DEFAULTS),
+                    number=repeat,
+                    repeat=3,
+                )
+            )
+            glob_time = min(
+                timeit.repeat(
+                    partial(glob_nested_docs, docs_dir, root, config.PORTRAY_DEFAULTS),
+                    number=repeat,
+                    repeat=3,
+                )
+            )
+            print(
+                f"{size:>10} {scandir_time / repeat:>12.4f} {glob_time / repeat:>10.4f}"
+                f" {glob_time / scandir_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Generates synthetic projects of configurable size for `portray` to document.
+
+A generated project contains:
+
+- a `README.md` and a `pyproject.toml` with a `[tool.portray]` section,
+- a package of `modules` modules (split across subpackages nested `depth` levels deep),
+  each defining `classes` documented classes and functions,
+- `pages` Markdown pages within `docs`, nested `depth` levels deep,
+- `assets` binary files of `asset_size` bytes each within each of the `extra_dirs`.
+"""
+import os
+import random
+from typing import Dict, NamedTuple
+
+PACKAGE = "synthetic_project"
+
+MODULE_TEMPLATE = '''"""Synthetic module {index} generated to benchmark portray."""
+from typing import List, Optional
+
+CONSTANT_{index} = {index}
+
+{classes}
+'''
+
+CLASS_TEMPLATE = '''
+class Class{index}:
+    """A synthetic class with a few documented methods.
+
+    It exists purely so that pdocs has realistic definitions to render.
+    """
+
+    count: int = 0
+
+    def __init__(self, name: str, values: Optional[List[int]] = None) -> None:
+        """Creates the instance, storing its name and values."""
+        self.name = name
+        self.values = values or []
+
+    def total(self, offset: int = 0) -> int:
+        """Returns the sum of all values plus the given offset."""
+        return sum(self.values) + offset
+
+    @property
+    def label(self) -> str:
+        """The name of the instance, formatted for display."""
+        return self.name.title()
+
+    @classmethod
+    def create(cls, name: str) -> "Class{index}":
+        """Creates a new, empty instance with the given name."""
+        return cls(name)
+
+
+def function_{index}(first: int, second: str = "value", *args, **kwargs) -> str:
+    """Combines the given arguments into a single string.
+
+    - *first*: The first argument.
+    - *second*: The second argument.
+    """
+    return f"{{first}}{{second}}{{args}}{{kwargs}}"
+'''
+
+PAGE_TEMPLATE = """# Page {index}
+
+Synthetic documentation page used to benchmark `portray`.
+
+## Section
+
+Some text with a [link](https://github.com/timothycrosley/portray), *emphasis* and `code`.
+
+```python
+print("page {index}")
+```
+
+!!! note
+    An admonition, rendered using a Markdown extension.
+"""
+
+
+class Size(NamedTuple):
+    """The dimensions of a synthetic project."""
+
+    modules: int
+    classes: int
+    pages: int
+    depth: int
+    assets: int
+    asset_size: int
+    extra_dirs: int = 1
+
+
+SIZES: Dict[str, Size] = {
+    "tiny": Size(modules=2, classes=2, pages=3, depth=1, assets=2, asset_size=1024),
+    "small": Size(modules=10, classes=5, pages=20, depth=2, assets=10, asset_size=10 * 1024),
+    "medium": Size(modules=100, classes=10, pages=200, depth=3, assets=100, asset_size=50 * 1024),
+    "large": Size(
+        modules=500,
+        classes=20,
+        pages=1000,
+        depth=4,
+        assets=500,
+        asset_size=100 * 1024,
+        extra_dirs=3,
+    ),
+}
+
+
+def generate(directory: str, size: Size, seed: int = 0) -> str:
+    """Writes a synthetic project of the given size into directory (which is created if
+    necessary), returning directory. The same size and seed always produce the same project.
+    """
+    randomness = random.Random(seed)
+    extra_dirs = [f"assets_{index}" for index in range(size.extra_dirs)]
+    _write(
+        os.path.join(directory, "pyproject.toml"),
+        f'[tool.portray]\nmodules = ["{PACKAGE}"]\nextra_dirs = {extra_dirs!r}\n'.replace("'", '"'),
+    )
+    _write(os.path.join(directory, "README.md"), f"# {PACKAGE}\n\nA synthetic project.\n")
+
+    for index in range(size.modules):
+        _write(
+            os.path.join(directory, PACKAGE, *_nesting(index, size.depth), f"module_{index}.py"),
+            MODULE_TEMPLATE.format(
+                index=index,
+                classes="".join(
+                    CLASS_TEMPLATE.format(index=f"{index}_{class_index}")
+                    for class_index in range(size.classes)
+                ),
+            ),
+        )
+    for current_root, _, _ in os.walk(os.path.join(directory, PACKAGE)):
+        init_file = os.path.join(current_root, "__init__.py")
+        if not os.path.exists(init_file):
+            _write(init_file, '"""Synthetic package generated to benchmark portray."""\n')
+
+    for index in range(size.pages):
+        _write(
+            os.path.join(directory, "docs", *_nesting(index, size.depth), f"page_{index}.md"),
+            PAGE_TEMPLATE.format(index=index),
+        )
+
+    for extra_dir in extra_dirs:
+        for index in range(size.assets):
+            asset_path = os.path.join(directory, extra_dir, f"asset_{index}.bin")
+            os.makedirs(os.path.dirname(asset_path), exist_ok=True)
+            with open(asset_path, "wb") as asset:
+                asset.write(
+                    randomness.getrandbits(8 * size.asset_size).to_bytes(size.asset_size, "little")
+                )
+
+    return directory
+
+
+def _nesting(index: int, depth: int, fan_out: int = 4) -> list:
+    """Returns the (up to depth - 1) directory names the item with the given index is nested
+    within, spreading items across `fan_out` directories per level.
+    """
+    return [f"level_{level}_{(index // fan_out**level) % fan_out}" for level in range(depth - 1)]
+
+
+def _write(path: str, contents: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as written_file:
+        written_file.write(contents)
@@ -0,0 +1,183 @@
+"""Times `portray`'s main entry points against a synthetic project, storing the results as JSON
+so they can be compared against a baseline.
+
+Run from the project root using: `python -m benchmarks.run --size medium --output results.json`
+and compare a later run against it using: `python -m benchmarks.run --baseline results.json`
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from typing import Callable, Dict, List, Optional
+
+from portray import api, config, render
+from portray._version import __version__
+
+from benchmarks import project
+
+MINIMUM_RUN_TIME = 0.1
+
+
+def benchmarks(directory: str) -> Dict[str, Callable[[], None]]:
+    """Returns the benchmarks to run against the project at directory, keyed by name."""
+
+    def project_configuration() -> None:
+        cache_home = os.environ["PORTRAY_CACHE_HOME"]
+        with tempfile.TemporaryDirectory() as empty_cache_home:
+            os.environ["PORTRAY_CACHE_HOME"] = empty_cache_home
+            try:
+                config.project(directory, "pyproject.toml")
+            finally:
+                os.environ["PORTRAY_CACHE_HOME"] = cache_home
+
+    def cached_project_configuration() -> None:
+        config.project(directory, "pyproject.toml")
+
+    def nested_docs() -> None:
+        render._nested_docs(os.path.join(directory, "docs"), directory, config.PORTRAY_DEFAULTS)
+
+    def documentation_in_temp_folder() -> None:
+        with render.documentation_in_temp_folder(config.project(directory, "pyproject.toml")):
+            pass
+
+    def as_html() -> None:
+        with tempfile.TemporaryDirectory() as output_dir:
+            api.as_html(directory, output_dir=os.path.join(output_dir, "site"))
+
+    return {
+        "config.project": project_configuration,
+        "config.project (cached)": cached_project_configuration,
+        "render._nested_docs": nested_docs,
+        "render.documentation_in_temp_folder": documentation_in_temp_folder,
+        "api.as_html": as_html,
+    }
+
+
+def run(size: project.Size, repeat: int = 3, only: Optional[List[str]] = None) -> dict:
+    """Generates a synthetic project of the given size and times every benchmark (or only those
+    named) against it `repeat` times, returning the results.
+    """
+    results: Dict[str, dict] = {}
+    previous_directory = os.getcwd()
+    previous_cache_home = os.environ.get("PORTRAY_CACHE_HOME")
+    with tempfile.TemporaryDirectory() as directory:
+        project.generate(directory, size)
+        os.chdir(directory)
+        os.environ["PORTRAY_CACHE_HOME"] = os.path.join(directory, ".project-cache")
+        try:
+            for name, benchmark in benchmarks(directory).items():
+                if only and name not in only:
+                    continue
+
+                with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    number = _calls_per_run(benchmark)
+                    timings = [_time(benchmark, number) for _ in range(repeat)]
+                results[name] = {
+                    "calls_per_run": number,
+                    "runs": timings,
+                    "min": min(timings),
+                    "median": statistics.median(timings),
+                    "mean": statistics.mean(timings),
+                }
+        finally:
+            os.chdir(previous_directory)
+            if previous_cache_home is None:
+                os.environ.pop("PORTRAY_CACHE_HOME", None)
+            else:
+                os.environ["PORTRAY_CACHE_HOME"] = previous_cache_home
+
+    return {
+        "portray": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "size": size._asdict(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def _calls_per_run(benchmark: Callable[[], None]) -> int:
+    """Returns how many times benchmark needs calling for a run to last at least
+    MINIMUM_RUN_TIME, warming it up in the process.
+    """
+    return max(1, int(MINIMUM_RUN_TIME / max(_time(benchmark, 1), 1e-9)))
+
+
+def _time(benchmark: Callable[[], None], number: int) -> float:
+    """Returns the average wall time taken by calling benchmark number times."""
+    start = time.perf_counter()
+    for _ in range(number):
+        benchmark()
+    return (time.perf_counter() - start) / number
+
+
+def compare(results: dict, baseline: dict) -> Dict[str, float]:
+    """Returns the ratio of each benchmark's median time to its median time within baseline
+    (above 1 is slower), for every benchmark found in both.
+    """
+    if results["size"] != baseline["size"]:
+        print("Warning: the baseline was recorded against a differently sized project.")
+    return {
+        name: timing["median"] / baseline["results"][name]["median"]
+        for name, timing in results["results"].items()
+        if baseline["results"].get(name, {}).get("median")
+    }
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", choices=sorted(project.SIZES), default="small")
+    for dimension in project.Size._fields:
+        parser.add_argument(f"--{dimension.replace('_', '-')}", type=int, dest=dimension)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", action="append", help="Only run the named benchmark(s)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results against this JSON file")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        help="Exit with an error if any benchmark is slower than the baseline by more than this "
+        "ratio (for example 1.1 allows 10%% slower)",
+    )
+    options = parser.parse_args(arguments)
+
+    size = project.SIZES[options.size]._replace(
+        **{
+            dimension: getattr(options, dimension)
+            for dimension in project.Size._fields
+            if getattr(options, dimension) is not None
+        }
+    )
+    results = run(size, repeat=options.repeat, only=options.only)
+
+    ratios: Dict[str, float] = {}
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            ratios = compare(results, json.load(baseline_file))
+
+    print(f"{'benchmark':<40} {'min (s)':>12} {'median (s)':>12} {'vs baseline':>12}")
+    for name, timing in results["results"].items():
+        ratio = f"{ratios[name]:.2f}x" if name in ratios else "-"
+        print(f"{name:<40} {timing['min']:>12.6f} {timing['median']:>12.6f} {ratio:>12}")
+
+    if options.output:
+        with open(options.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    if options.max_regression and any(ratio > options.max_regression for ratio in ratios.values()):
+        print(f"Regression: a benchmark is more than {options.max_regression}x the baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
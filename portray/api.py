@@ -4,13 +4,30 @@
    If you want to extend `portray` or use it directly from within Python - this is the place
    to start.
 """
+import io
 import os
 import webbrowser
-from typing import Dict, Union
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional, Tuple, Union
 
-import mkdocs.commands.gh_deploy
-from livereload import Server
-from portray import config, logo, render
+from portray import (
+    archive,
+    cache,
+    compression,
+    config,
+    deploy,
+    logo,
+    profiling,
+    render,
+    static_server,
+    versions,
+)
+from portray import daemon as build_daemon
+from portray.exceptions import DocumentationAlreadyExists, NoProjectFound
+
+# directory, config_file, output_dir, site_path, incremental, workers, settings, repository
+_ProjectTask = Tuple[str, str, str, str, bool, Optional[int], dict, Optional[dict]]
 
 
 def as_html(
@@ -19,6 +36,12 @@ def as_html(
     output_dir: str = "site",
     overwrite: bool = False,
     modules: list = None,  # type: ignore
+    incremental: bool = False,
+    workers: int = None,  # type: ignore
+    profile: bool = False,
+    profile_report: str = "portray-profile.json",
+    profile_trace: str = "",
+    only: list = None,  # type: ignore
 ) -> None:
     """Produces HTML documentation for a Python project placing it into output_dir.
 
@@ -31,16 +54,329 @@ def as_html(
       specified `output_dir` the command will fail with a `DocumentationAlreadyExists`
       exception.
     - *modules*: One or more modules to render reference documentation for
+    - *incremental*: If set to `True` the persistent build cache (`cache_dir`) is used so that
+      only the parts of the documentation whose inputs changed since the last build are redone.
+    - *workers*: The number of processes to split reference documentation generation across
+      (`0` uses one per CPU).
+    - *profile*: If set to `True` the wall time, CPU time and memory usage of every phase
+      of the build is recorded into a JSON report.
+    - *profile_report*: The file to write the build profile report to.
+    - *profile_trace*: If given, a file to also write the build profile to as a Chrome trace.
+    - *only*: One or more glob patterns restricting the build to the Markdown pages (by path
+      within the project, such as `docs/guides/*`) and modules (by name, such as
+      `my_package.api*`) matching any of them, for quick previews. Every other page is replaced
+      by a placeholder, keeping the nav and links to it intact.
+
+    `portray as_html` builds the documentation within a running `portray daemon` instead,
+    if there is one.
     """
     directory = directory if directory else os.getcwd()
-    render.documentation(
-        project_configuration(directory, config_file, modules=modules, output_dir=output_dir),
-        overwrite=overwrite,
-    )
+    with profiling.profiled(profile, profile_report, profile_trace):
+        with profiling.phase("project configuration"):
+            project_config = project_configuration(
+                directory, config_file, modules=modules, output_dir=output_dir
+            )
+        if incremental:
+            project_config["incremental"] = True
+        if workers is not None:
+            project_config["workers"] = workers
+        if only:
+            project_config["only"] = only
+        render.documentation(project_config, overwrite=overwrite)
     print(logo.ascii_art)
     print(f"Documentation successfully generated into `{os.path.abspath(output_dir)}` !")
 
 
+def as_html_many(
+    directories: list = None,  # type: ignore
+    root: str = "",
+    config_file: str = "pyproject.toml",
+    output_dir: str = "site",
+    overwrite: bool = False,
+    incremental: bool = False,
+    workers: int = None,  # type: ignore
+) -> None:
+    """Produces HTML documentation for many Python projects at once (such as every package of a
+    monorepo) from a single process, placing each project's into its own directory within
+    output_dir alongside an `index.html` page linking to all of them.
+
+    - *directories*: The root folders of the projects to document (defaults to every project
+      found within root, see `portray.config.find_projects`).
+    - *root*: The folder projects are found within, and named relative to
+      (defaults to the current directory).
+    - *config_file*: The [TOML](https://github.com/toml-lang/toml#toml)
+      formatted config file each project uses.
+    - *output_dir*: The directory to place the generated HTML into, each project's within the
+      subdirectory matching its location relative to root.
+    - *overwrite*: If set to `True` any existing documentation output will be replaced.
+      Otherwise, if documentation exists in the specified `output_dir` the command will fail
+      with a `DocumentationAlreadyExists` exception.
+    - *incremental*: If set to `True` each project's persistent build cache (`cache_dir`) is used
+      so that only the parts of its documentation whose inputs changed are redone.
+    - *workers*: The number of processes to split the projects across (`0` uses one per CPU).
+      By default they are documented one after another.
+
+    Each project is documented as if `as_html` was ran from within its directory. Projects share
+    the imported MkDocs, pdocs and theme, their compiled templates and the project configuration
+    cache; when split across workers, these are loaded before the workers are started.
+    """
+    root = os.path.abspath(root or os.getcwd())
+    directories = (
+        [os.path.abspath(directory) for directory in directories]
+        if directories
+        else config.find_projects(root, config_file)
+    )
+    if not directories:
+        raise NoProjectFound(root)
+
+    output_dir = os.path.abspath(output_dir)
+    if os.path.lexists(output_dir) and not overwrite:
+        raise DocumentationAlreadyExists(output_dir)
+
+    workers = min(len(directories), 1 if workers is None else workers or os.cpu_count() or 1)
+    tasks: List[_ProjectTask] = [
+        (
+            directory,
+            config_file,
+            output_dir,
+            _site_path(root, directory),
+            incremental,
+            1 if workers > 1 else None,
+            {},
+            None,
+        )
+        for directory in directories
+    ]
+    if workers > 1:
+        build_daemon.warm_up()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            sites = list(pool.map(_as_html_in_project, tasks))
+    else:
+        build_daemon.keep_templates_compiled()
+        sites = [_as_html_in_project(task) for task in tasks]
+
+    for site in sites:
+        print(f"Documented {site['name']} into `{os.path.join(output_dir, site['path'])}`")
+    render.index(output_dir, sites)
+    print(logo.ascii_art)
+    print(f"Documentation for {len(sites)} projects successfully generated into `{output_dir}` !")
+
+
+def as_html_versions(
+    refs: list,
+    directory: str = "",
+    config_file: str = "pyproject.toml",
+    output_dir: str = "site",
+    overwrite: bool = False,
+    default: str = "",
+    workers: int = 0,
+) -> None:
+    """Produces HTML documentation for several versions of a Python project at once, one for
+    each of the given git refs, placing each version's into its own directory within output_dir
+    alongside a `versions.json` listing them (read by the version selector of the Material theme)
+    and an `index.html` page redirecting to the default version.
+
+    - *refs*: The git refs (such as tags, branches or commits) to document the project as of.
+      Each is documented into a directory named after it (see `portray.versions.name`).
+    - *directory*: The root folder of your project, within a git repository.
+    - *config_file*: The [TOML](https://github.com/toml-lang/toml#toml)
+      formatted config file you wish to use. Each version uses its own.
+    - *output_dir*: The directory to place the generated HTML into.
+    - *overwrite*: If set to `True` any existing documentation output will be replaced.
+      Otherwise, if documentation exists in the specified `output_dir` the command will fail
+      with a `DocumentationAlreadyExists` exception.
+    - *default*: The ref of the version `index.html` redirects to (defaults to the first ref).
+    - *workers*: The number of processes to split the versions across (`0` uses one per CPU).
+
+    Each ref is exported from git into the project's build cache (`cache_dir`) without touching
+    its working tree, then documented as if `as_html --incremental` was ran from within the
+    export. Versions share a reference documentation cache, so modules that are the same across
+    versions are only documented once (see `portray.versions`).
+    """
+    directory = os.path.abspath(directory or os.getcwd())
+    if not refs:
+        raise ValueError("At least one git ref to document is required")
+    documented = [{"version": versions.name(ref), "title": ref} for ref in refs]
+    version_names = [version["version"] for version in documented]
+    if len(set(version_names)) != len(version_names):
+        raise ValueError(f"The git refs {', '.join(refs)} don't all name different versions")
+    default_name = versions.name(default) if default else version_names[0]
+    if default_name not in version_names:
+        raise ValueError(f"The default version '{default}' isn't one of those documented")
+
+    output_dir = os.path.abspath(output_dir)
+    if os.path.lexists(output_dir) and not overwrite:
+        raise DocumentationAlreadyExists(output_dir)
+
+    cache_directory = cache.directory(config.project(directory=directory, config_file=config_file))
+    exports = {ref: versions.export(directory, ref, cache_directory) for ref in refs}
+    versions.prune_exports(cache_directory, [commit for commit, _ in exports.values()])
+
+    started = versions.file_system_time(cache_directory)
+    workers = min(len(refs), workers or os.cpu_count() or 1)
+    repository_settings = versions.repository(directory)
+    tasks: List[_ProjectTask] = [
+        (
+            exports[version["title"]][1],
+            config_file,
+            output_dir,
+            version["version"],
+            True,
+            1 if workers > 1 else None,
+            {
+                "cache_dir": versions.build_cache(cache_directory, version["version"]),
+                "reference_cache_dir": versions.reference_cache(cache_directory),
+            },
+            repository_settings,
+        )
+        for version in documented
+    ]
+    if workers > 1:
+        build_daemon.warm_up()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_as_html_in_project, tasks))
+    else:
+        build_daemon.keep_templates_compiled()
+        for task in tasks:
+            _as_html_in_project(task)
+
+    versions.prune_reference_cache(cache_directory, started)
+    versions.write(output_dir, documented, default_name)
+    for version in documented:
+        print(
+            f"Documented {version['title']} into `{os.path.join(output_dir, version['version'])}`"
+        )
+    print(logo.ascii_art)
+    print(f"Documentation for {len(refs)} versions successfully generated into `{output_dir}` !")
+
+
+def _site_path(root: str, directory: str) -> str:
+    """Returns the path (relative to the output directory) of directory's documentation when
+    documenting many projects: its location relative to root, or its name if outside of root.
+    """
+    relative_path = os.path.relpath(directory, root)
+    if relative_path.startswith(os.pardir) or relative_path == os.curdir:
+        relative_path = os.path.basename(directory)
+    return relative_path.replace(os.sep, "/")
+
+
+def _as_html_in_project(task: _ProjectTask) -> Dict[str, str]:
+    """Documents a single project for `as_html_many` as if `as_html` was ran from within its
+    directory, into site_path within output_dir, returning what `render.index` links to it using.
+
+    Any settings given override those of the project. If repository settings are given, the
+    project is documented as an exported version of the project (see `portray.versions`).
+    """
+    (
+        directory,
+        config_file,
+        output_dir,
+        site_path,
+        incremental,
+        workers,
+        settings,
+        repository_settings,
+    ) = task
+    previous_directory = os.getcwd()
+    try:
+        with render.isolated_imports(directory):
+            os.chdir(directory)
+            project_config = project_configuration(
+                directory,
+                config_file,
+                output_dir=os.path.join(output_dir, *site_path.split("/")),
+            )
+            project_config.update(settings)
+            if repository_settings is not None:
+                versions.versioned(project_config, repository_settings)
+            if incremental:
+                project_config["incremental"] = True
+            if workers is not None:
+                project_config["workers"] = workers
+            if workers is None:
+                render.documentation(project_config, overwrite=True)
+            else:  # building alongside other workers, whose progress output would interleave
+                with redirect_stdout(io.StringIO()):
+                    render.documentation(project_config, overwrite=True)
+    finally:
+        os.chdir(previous_directory)
+
+    return {
+        "path": site_path,
+        "name": project_config["mkdocs"]["site_name"],
+        "description": project_config["mkdocs"].get("site_description", ""),
+    }
+
+
+def as_archive(
+    directory: str = "",
+    config_file: str = "pyproject.toml",
+    archive_file: str = "site.tar.gz",
+    overwrite: bool = False,
+    modules: list = None,  # type: ignore
+    workers: int = None,  # type: ignore
+    prefix: str = "",
+) -> None:
+    """Produces HTML documentation for a Python project packed into a single archive file,
+    without writing it to an output directory first.
+
+    - *directory*: The root folder of your project.
+    - *config_file*: The [TOML](https://github.com/toml-lang/toml#toml)
+      formatted config file you wish to use.
+    - *archive_file*: The archive to write, whose extension determines its format:
+      `.tar.gz` (or `.tgz`), `.tar.zst` or `.zip` (see `portray.archive`).
+    - *overwrite*: If set to `True` any existing archive_file will be replaced.
+      Otherwise, if archive_file exists the command will fail with a
+      `DocumentationAlreadyExists` exception.
+    - *modules*: One or more modules to render reference documentation for
+    - *workers*: The number of processes to split reference documentation generation across
+      (`0` uses one per CPU).
+    - *prefix*: A directory to place the documentation within inside the archive
+      (by default it is placed at the archive's root).
+
+    Archives are reproducible: building the same documentation twice produces identical files.
+    `portray as_archive` builds the documentation within a running `portray daemon` instead,
+    if there is one.
+    """
+    archive.format_of(archive_file)
+    if os.path.lexists(archive_file) and not overwrite:
+        raise DocumentationAlreadyExists(archive_file)
+
+    directory = directory if directory else os.getcwd()
+    project_config = project_configuration(directory, config_file, modules=modules)
+    if workers is not None:
+        project_config["workers"] = workers
+    with render.documentation_in_temp_folder(project_config) as (_, docs_folder):
+        if project_config["precompress"]:
+            with profiling.phase("precompress"):
+                compression.precompress(docs_folder, project_config["precompress"])
+        with profiling.phase("archive"):
+            archived = archive.write(docs_folder, archive_file, prefix)
+    print(logo.ascii_art)
+    print(
+        f"Documentation ({archived} files) successfully archived into "
+        f"`{os.path.abspath(archive_file)}` !"
+    )
+
+
+def rollback(
+    directory: str = "", config_file: str = "pyproject.toml", output_dir: str = "site"
+) -> None:
+    """Restores the documentation that was in output_dir before the last `as_html` call.
+
+    Requires `keep_previous_output` to have been enabled for that build. The current
+    documentation is kept in its place, so calling `rollback` again undoes the rollback.
+
+    - *directory*: The root folder of your project.
+    - *config_file*: The [TOML](https://github.com/toml-lang/toml#toml)
+      formatted config file you wish to use.
+    - *output_dir*: The directory the generated HTML was placed into.
+    """
+    directory = directory if directory else os.getcwd()
+    render.rollback(project_configuration(directory, config_file, output_dir=output_dir))
+    print(f"Documentation in `{os.path.abspath(output_dir)}` successfully rolled back!")
+
+
 def in_browser(
     directory: str = "",
     config_file: str = "pyproject.toml",
@@ -48,6 +384,7 @@ def in_browser(
     host: str = None,  # type: ignore
     modules: list = None,  # type: ignore
     reload: bool = False,
+    workers: int = None,  # type: ignore
 ) -> None:
     """Opens your default webbrowser pointing to a locally started development webserver enabling
     you to browse documentation locally
@@ -59,6 +396,8 @@ def in_browser(
     - *host*: The host to expose your documentation on (defaults to `"127.0.0.1"`)
     - *modules*: One or more modules to render reference documentation for
     - *reload*: If true the server will live load any changes
+    - *workers*: The number of processes to split reference documentation generation across
+      (`0` uses one per CPU).
     """
     directory = directory if directory else os.getcwd()
     server(
@@ -69,6 +408,7 @@ def in_browser(
         host=host,
         modules=modules,
         reload=reload,
+        workers=workers,
     )
 
 
@@ -80,6 +420,12 @@ def server(
     host: str = None,  # type: ignore
     modules: list = None,  # type: ignore
     reload: bool = False,
+    workers: int = None,  # type: ignore
+    profile: bool = False,
+    profile_report: str = "portray-profile.json",
+    profile_trace: str = "",
+    production: bool = False,
+    only: list = None,  # type: ignore
 ) -> None:
     """Runs a development webserver enabling you to browse documentation locally.
 
@@ -91,33 +437,102 @@ def server(
     - *host*: The host to expose your documentation on (defaults to `"127.0.0.1"`)
     - *modules*: One or more modules to render reference documentation for
     - *reload*: If true the server will live load any changes
+    - *workers*: The number of processes to split reference documentation generation across
+      (`0` uses one per CPU).
+    - *profile*: If set to `True` the wall time, CPU time and memory usage of every phase
+      of the initial build and each rebuild is recorded into a JSON report.
+    - *profile_report*: The file to write the build profile report to.
+    - *profile_trace*: If given, a file to also write the build profile to as a Chrome trace.
+    - *production*: If true the documentation is built once, precompressed, and served by a
+      threaded web server that sends cache headers (see `portray.static_server`) rather than
+      by the development server. Can't be combined with *reload*.
+    - *only*: One or more glob patterns restricting the build to the Markdown pages and modules
+      matching any of them, replacing every other page with a placeholder (see `as_html`).
     """
+    if production and reload:
+        raise ValueError("Live reloading is not available when serving in production mode")
+
     directory = directory if directory else os.getcwd()
-    project_config = project_configuration(directory, config_file, modules=modules)
+
+    def load_project_configuration() -> dict:
+        project_config = project_configuration(directory, config_file, modules=modules)
+        if workers is not None:
+            project_config["workers"] = workers
+        if only:
+            project_config["only"] = only
+        return project_config
+
+    project_config = load_project_configuration()
     host = host or project_config["host"]
     port = port or project_config["port"]
+    # never reload because of portray's own output
+    ignored_dirs = tuple(
+        os.path.join(os.path.abspath(ignored_dir), "")
+        for ignored_dir in (
+            os.path.join(project_config["directory"], project_config["cache_dir"]),
+            project_config["output_dir"],
+        )
+    )
+    ignored_files = {
+        os.path.abspath(profile_file)
+        for profile_file in (profile_report, profile_trace)
+        if profile_file
+    }
+
+    if production:
+        with profiling.profiled(
+            profile, profile_report, profile_trace
+        ) as save_profile, render.documentation_in_temp_folder(project_config) as (_, docs_folder):
+            with profiling.phase("precompress"):
+                compression.precompress(docs_folder, project_config["precompress"] or ["gzip"])
+            save_profile()
 
-    with render.documentation_in_temp_folder(project_config) as (sources_folder, docs_folder):
+            print(logo.ascii_art)
+            if open_browser:
+                webbrowser.open_new(f"http://{host}:{port}")
+            static_server.serve(docs_folder, host, port)
+        return
+
+    from livereload import Server
+
+    with profiling.profiled(
+        profile, profile_report, profile_trace
+    ) as save_profile, render.documentation_in_reloadable_folder(project_config) as (
+        sources_folder,
+        docs_folder,
+        rebuild,
+    ):
+        save_profile()
 
         print(logo.ascii_art)
 
         live_server = Server()
 
         if reload:
+            config_files = (
+                os.path.join(directory, config_file),
+                os.path.join(directory, "setup.py"),
+            )
+
+            def config_state() -> tuple:
+                return tuple(
+                    os.stat(config_path).st_mtime_ns if os.path.exists(config_path) else None
+                    for config_path in config_files
+                )
+
+            last_config_state = config_state()
 
             def reloader():  # pragma: no cover
-                sources_old = sources_folder + ".old"
-                docs_old = docs_folder + ".old"
-                with render.documentation_in_temp_folder(project_config) as (sources_new, docs_new):
-                    # cause as little churn as possible to the server watchers
-                    os.rename(sources_folder, sources_old)
-                    os.rename(sources_new, sources_folder)
-                    os.rename(sources_old, sources_new)
-                    os.rename(docs_folder, docs_old)
-                    os.rename(docs_new, docs_folder)
-                    os.rename(docs_old, docs_new)
-
-            # all directories that feed documentation_in_temp_folder
+                nonlocal last_config_state
+                current_config_state = config_state()
+                if current_config_state != last_config_state:
+                    last_config_state = current_config_state
+                    rebuild(load_project_configuration())
+                else:
+                    rebuild()
+                save_profile()
+
+            # all directories that feed documentation_in_reloadable_folder
             watch_dirs = {
                 project_config["directory"],
                 project_config["docs_dir"],
@@ -127,8 +542,13 @@ def server(
                 watch_dirs.add(project_config["mkdocs"]["docs_dir"])
             if "site_dir" in project_config["mkdocs"]:
                 watch_dirs.add(project_config["mkdocs"]["site_dir"])
+
+            def ignore(path: str) -> bool:  # pragma: no cover
+                path = os.path.abspath(path)
+                return path.startswith(ignored_dirs) or path in ignored_files
+
             for watch_dir in watch_dirs.difference({sources_folder, docs_folder}):
-                live_server.watch(watch_dir, reloader)
+                live_server.watch(watch_dir, reloader, ignore=ignore)
 
         if open_browser:
             webbrowser.open_new(f"http://{host}:{port}")
@@ -136,6 +556,24 @@ def server(
         live_server.serve(root=docs_folder, host=host, port=port, restart_delay=0)
 
 
+def daemon(socket_path: str = "", stop: bool = False) -> None:
+    """Runs a long lived build daemon that keeps MkDocs, pdocs and the theme loaded, so that
+    `as_html` calls made while it runs (from any project) skip warming all of them up.
+
+    - *socket_path*: The Unix socket to listen on (defaults to `$PORTRAY_DAEMON_SOCKET`, or
+      `daemon.sock` within the project configuration cache directory).
+    - *stop*: If set to `True` the running daemon is stopped instead.
+    """
+    if stop:
+        if build_daemon.request("stop", socket_path) is None:
+            print("No portray daemon is running.")
+        else:
+            print("portray daemon stopped.")
+        return
+
+    build_daemon.serve(socket_path)
+
+
 def project_configuration(
     directory: str = "",
     config_file: str = "pyproject.toml",
@@ -165,6 +603,8 @@ def on_github_pages(
     force: bool = False,
     ignore_version: bool = False,
     modules: list = None,  # type: ignore
+    workers: int = None,  # type: ignore
+    incremental: bool = False,
 ) -> None:
     """Regenerates and deploys the documentation to GitHub pages.
 
@@ -175,12 +615,46 @@ def on_github_pages(
     - *force*: Force the push to the repository.
     - *ignore_version*: Ignore check that build is not being deployed with an old version.
     - *modules*: One or more modules to render reference documentation for
+    - *workers*: The number of processes to split reference documentation generation across
+      (`0` uses one per CPU).
+    - *incremental*: If set to `True` the documentation is built using the persistent build
+      cache (`cache_dir`) and only the files that changed since the last deploy are committed
+      onto the branch, skipping the commit and push entirely if none did (see `portray.deploy`).
     """
+    import mkdocs.commands.gh_deploy
+
     directory = directory if directory else os.getcwd()
     project_config = project_configuration(directory, config_file, modules)
+    if workers is not None:
+        project_config["workers"] = workers
+    if incremental:
+        project_config["incremental"] = True
+        mkdocs_config = project_config["mkdocs"]
+        remote_branch = mkdocs_config.get("remote_branch", "gh-pages")
+        remote_name = mkdocs_config.get("remote_name", "origin")
+        if not ignore_version:
+            deploy.check_version(directory, mkdocs.__version__, remote_name, remote_branch)
+        with render.documentation_in_cache_folder(project_config) as (_, site_dir):
+            deployed = deploy.github_pages(
+                site_dir,
+                directory,
+                (message or mkdocs.commands.gh_deploy.default_message).format(
+                    version=mkdocs.__version__, sha=deploy.current_sha(directory)
+                ),
+                remote=remote_name,
+                branch=remote_branch,
+                force=force,
+            )
+        print(logo.ascii_art)
+        if deployed:
+            print(f"Documentation successfully generated and pushed as {deployed[:7]}!")
+        else:
+            print("Documentation is unchanged since it was last pushed, so nothing was pushed.")
+        return
+
     with render.documentation_in_temp_folder(project_config) as (_, site_dir):
         project_config["mkdocs"]["site_dir"] = site_dir
-        conf = render._mkdocs_config(project_config["mkdocs"])
+        conf = render._mkdocs_config(project_config["mkdocs"], project_config["search_index"])
         conf.config_file_path = directory
         mkdocs.commands.gh_deploy.gh_deploy(
             conf, message=message, force=force, ignore_version=ignore_version
@@ -0,0 +1,152 @@
+"""Defines how `portray as_archive` packs generated websites into a single archive file,
+for storing as a build artifact or shipping to a web server:
+
+- *.tar.gz* (or *.tgz*): A gzip compressed tarball.
+- *.tar.zst*: A Zstandard compressed tarball.
+  Requires the [zstandard](https://pypi.org/project/zstandard/) package to be installed.
+- *.zip*: A deflate compressed zip file.
+
+Archives are reproducible: entries are written in sorted order with normalized permissions,
+no owner, and the timestamp given by `$SOURCE_DATE_EPOCH` (defaulting to 1980-01-01, the
+earliest a zip file can represent), so archiving the same website twice produces identical bytes.
+"""
+import gzip
+import os
+import shutil
+import tarfile
+import time
+import zipfile
+from typing import BinaryIO, Iterator, Tuple
+
+FORMATS = {".tar.gz": "tar.gz", ".tgz": "tar.gz", ".tar.zst": "tar.zst", ".zip": "zip"}
+
+DEFAULT_TIMESTAMP = 315532800  # 1980-01-01T00:00:00Z
+
+DIRECTORY_MODE = 0o755
+FILE_MODE = 0o644
+
+
+def format_of(archive_file: str) -> str:
+    """Returns the format of archive_file based on its extension, raising a `ValueError` if it
+    isn't one `portray` can write (or an `ImportError` if zstandard isn't installed).
+    """
+    archive_format = next(
+        (
+            archive_format
+            for extension, archive_format in FORMATS.items()
+            if archive_file.lower().endswith(extension)
+        ),
+        "",
+    )
+    if not archive_format:
+        raise ValueError(
+            f"Unknown archive format for '{archive_file}'. "
+            f"Expected a file ending in any of: {', '.join(FORMATS)}"
+        )
+
+    if archive_format == "tar.zst":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError as error:
+            raise ImportError(
+                "Writing .tar.zst archives requires the zstandard package: pip install zstandard"
+            ) from error
+    return archive_format
+
+
+def write(directory: str, archive_file: str, prefix: str = "") -> int:
+    """Writes every file within directory into archive_file (placing them within a prefix
+    directory inside the archive, if given), returning the number of files archived.
+
+    The archive is written alongside archive_file and then moved into place, so archive_file is
+    never partially written.
+    """
+    archive_format = format_of(archive_file)
+    timestamp = int(os.environ.get("SOURCE_DATE_EPOCH", DEFAULT_TIMESTAMP))
+    temporary_archive = f"{archive_file}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_archive, "wb") as raw_archive:
+            if archive_format == "zip":
+                archived = _write_zip(raw_archive, directory, prefix, timestamp)
+            else:
+                archived = _write_tar(raw_archive, archive_format, directory, prefix, timestamp)
+        os.replace(temporary_archive, archive_file)
+    finally:
+        if os.path.lexists(temporary_archive):
+            os.remove(temporary_archive)
+    return archived
+
+
+def entries(directory: str, prefix: str = "") -> Iterator[Tuple[str, str, bool]]:
+    """Yields the name within the archive, path and whether it is a directory of every entry
+    beneath directory, each directory before its contents and siblings sorted by name.
+    """
+    prefix = prefix.strip("/")
+    if prefix:
+        yield prefix + "/", directory, True
+
+    children = sorted(os.scandir(directory), key=lambda entry: entry.name)
+    for child in children:
+        name = f"{prefix}/{child.name}" if prefix else child.name
+        if child.is_dir():
+            yield from entries(child.path, name)
+        else:
+            yield name, child.path, False
+
+
+def _write_tar(
+    raw_archive: BinaryIO, archive_format: str, directory: str, prefix: str, timestamp: int
+) -> int:
+    if archive_format == "tar.zst":
+        import zstandard
+
+        with zstandard.ZstdCompressor(level=19).stream_writer(raw_archive) as compressed:
+            return _add_to_tar(compressed, directory, prefix, timestamp)
+
+    # no file name and a fixed modification time in the gzip header
+    with gzip.GzipFile(
+        filename="", mode="wb", fileobj=raw_archive, compresslevel=9, mtime=0
+    ) as compressed:
+        return _add_to_tar(compressed, directory, prefix, timestamp)  # type: ignore
+
+
+def _add_to_tar(fileobj: BinaryIO, directory: str, prefix: str, timestamp: int) -> int:
+    archived = 0
+    with tarfile.open(fileobj=fileobj, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+        for name, path, is_directory in entries(directory, prefix):
+            info = tarfile.TarInfo(name.rstrip("/"))
+            info.mtime = timestamp
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            if is_directory:
+                info.type = tarfile.DIRTYPE
+                info.mode = DIRECTORY_MODE
+                tar.addfile(info)
+                continue
+
+            info.mode = FILE_MODE
+            info.size = os.path.getsize(path)
+            with open(path, "rb") as source_file:
+                tar.addfile(info, source_file)
+            archived += 1
+    return archived
+
+
+def _write_zip(raw_archive: BinaryIO, directory: str, prefix: str, timestamp: int) -> int:
+    date_time = time.gmtime(max(timestamp, DEFAULT_TIMESTAMP))[:6]
+    archived = 0
+    with zipfile.ZipFile(raw_archive, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for name, path, is_directory in entries(directory, prefix):
+            info = zipfile.ZipInfo(name, date_time=date_time)  # type: ignore
+            if is_directory:
+                info.external_attr = (0o040000 | DIRECTORY_MODE) << 16 | 0x10
+                zip_file.writestr(info, b"")
+                continue
+
+            info.external_attr = (0o100000 | FILE_MODE) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.file_size = os.path.getsize(path)  # so zip64 extensions are used when needed
+            with open(path, "rb") as source_file, zip_file.open(info, "w") as archived_file:
+                shutil.copyfileobj(source_file, archived_file)
+            archived += 1
+    return archived
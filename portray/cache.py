@@ -0,0 +1,184 @@
+"""Defines the persistent build cache `portray` uses to avoid redoing work between builds.
+
+The cache lives in `cache_dir` (by default `.portray-cache` within the project root) and
+contains a `manifest.json` that records content hashes for every staged input file, every
+generated Markdown file and every emitted HTML file, alongside the intermediate build
+directories those hashes describe.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Set
+
+from portray import staging
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+MANIFEST_SECTIONS = ("inputs", "sources", "markdown", "html", "fingerprints")
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def directory(config: dict) -> str:
+    """Returns the absolute location of the build cache for the given project config."""
+    return os.path.join(config["directory"], config["cache_dir"])
+
+
+def reference_directory(config: dict) -> str:
+    """Returns the absolute location of the reference documentation cache for the given project
+    config: `reference_cache_dir` if set (which builds of many projects can share, as it is keyed
+    on the contents of the documented modules), otherwise `reference` within the build cache.
+    """
+    if config.get("reference_cache_dir"):
+        return os.path.join(config["directory"], config["reference_cache_dir"])
+    return os.path.join(directory(config), "reference")
+
+
+def file_hash(path: str) -> str:
+    """Returns the sha256 hex digest of the contents of the file at path."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as hashed_file:
+        for chunk in iter(lambda: hashed_file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_hash(*parts: str) -> str:
+    """Returns a single sha256 hex digest representing all given string parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def cached_file_hash(path: str, entries: dict, key: str = "") -> str:
+    """Returns the sha256 hex digest of the file at path, reusing the digest recorded within
+    entries (under key, which defaults to path) if the file's size and mtime are unchanged.
+    """
+    key = key or path
+    stat = os.stat(path)
+    entry = entries.get(key)
+    if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+        return entry["hash"]
+
+    digest = file_hash(path)
+    entries[key] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": digest}
+    return digest
+
+
+def config_hash(config: dict) -> str:
+    """Returns a stable hash of a (JSON serializable) configuration dictionary."""
+    return text_hash(json.dumps(config, sort_keys=True, default=str))
+
+
+def load_manifest(cache_directory: str) -> dict:
+    """Loads the build manifest from the given cache directory, returning an empty manifest
+    if none exists yet or the existing one was written by an incompatible version.
+    """
+    manifest: Dict = {}
+    try:
+        with open(os.path.join(cache_directory, MANIFEST_FILE)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        pass
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        manifest = {"version": MANIFEST_VERSION}
+    for section in MANIFEST_SECTIONS:
+        manifest.setdefault(section, {})
+    return manifest
+
+
+def save_manifest(cache_directory: str, manifest: dict) -> None:
+    """Atomically writes the build manifest into the given cache directory."""
+    os.makedirs(cache_directory, exist_ok=True)
+    manifest_path = os.path.join(cache_directory, MANIFEST_FILE)
+    with open(f"{manifest_path}.tmp", "w") as manifest_file:
+        json.dump(manifest, manifest_file, sort_keys=True)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+
+def sync_file(
+    source: str, destination: str, entries: dict, key: str, strategy: str = "copy"
+) -> bool:
+    """Places source at destination (using the given `portray.staging` strategy) only if its
+    content differs from what the manifest entries record as last placed there.
+    Returns `True` if the destination was written.
+
+    File stats are compared first so unchanged files are never re-read or re-hashed.
+    """
+    stat = os.stat(source)
+    entry = entries.get(key)
+    destination_exists = os.path.isfile(destination)
+    if entry and destination_exists:
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return False
+
+        digest = file_hash(source)
+        if entry["hash"] == digest:
+            entry.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+            return False
+    else:
+        digest = file_hash(source)
+
+    staging.place_file(source, destination, strategy)
+    entries[key] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": digest}
+    return True
+
+
+def sync_text(text: str, destination: str, entries: dict, key: str) -> bool:
+    """Writes text to destination only if it differs from what was last written there,
+    replacing (but never writing through) whatever was placed there before.
+    Returns `True` if the destination was written.
+    """
+    digest = text_hash(text)
+    entry = entries.get(key)
+    if entry and entry["hash"] == digest and os.path.isfile(destination):
+        return False
+
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    if os.path.lexists(destination):
+        os.remove(destination)
+    with open(destination, "w") as destination_file:
+        destination_file.write(text)
+    entries[key] = {"size": len(text), "mtime": 0, "hash": digest}
+    return True
+
+
+def files(root: str) -> Iterable[str]:
+    """Yields the path (relative to root) of every file found beneath root."""
+    for current_root, _, file_names in os.walk(root, followlinks=True):
+        for file_name in file_names:
+            yield os.path.relpath(os.path.join(current_root, file_name), root)
+
+
+def prune(root: str, keep: Set[str], entries: dict, prefix: str = "") -> Set[str]:
+    """Removes every file beneath root whose relative path is not within keep, along with any
+    manifest entries (keyed by `prefix` joined with that relative path) for files not kept.
+    Returns the set of relative paths removed.
+    """
+    removed: Set[str] = set()
+    if not os.path.isdir(root):
+        return removed
+
+    for relative_path in list(files(root)):
+        if relative_path not in keep:
+            os.remove(os.path.join(root, relative_path))
+            removed.add(relative_path)
+
+    kept_keys = {os.path.join(prefix, relative_path) for relative_path in keep}
+    key_prefix = os.path.join(prefix, "") if prefix else ""
+    for key in [key for key in entries if key.startswith(key_prefix) and key not in kept_keys]:
+        del entries[key]
+    remove_empty_directories(root)
+    return removed
+
+
+def remove_empty_directories(root: str) -> None:
+    """Removes any empty directories beneath (but not including) root."""
+    for current_root, directories, _ in os.walk(root, topdown=False):
+        for directory_name in directories:
+            path = os.path.join(current_root, directory_name)
+            if not os.path.islink(path) and not os.listdir(path):
+                os.rmdir(path)
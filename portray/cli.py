@@ -5,18 +5,28 @@ it should maintain 1:1 compatibility with the programmatic API definition in the
 [API module](/reference/portray/api)
 
 - `portray as_html`: Renders the project as HTML into the `site` or other specified output directory
+- `portray as_html_many`: Renders many projects (such as those of a monorepo) under one output directory
+- `portray as_html_versions`: Renders several versions of the project, one for each given git ref, under one output directory
+- `portray as_archive`: Renders the project as HTML straight into a `.tar.gz`, `.tar.zst` or `.zip` archive
+- `portray rollback`: Restores the documentation generated before the last `portray as_html`
 - `portray in_browser`: Runs a server with the rendered documentation pointing a browser to it
 - `portray server`: Starts a local development server (by default at localhost:8000)
+- `portray daemon`: Runs a build daemon `portray as_html` uses to skip warming up on every call
 - `portray project_configuration`: Returns back the project configuration as determined by` portray`
 """
 from pprint import pprint
 
 import hug
-from portray import api, logo
+from portray import api, daemon, logo
 
 cli = hug.cli(api=hug.API(__name__, doc=logo.ascii_art))
-cli(api.as_html)
+cli(daemon.forwarded(api.as_html))
+cli(daemon.forwarded(api.as_html_many))
+cli(daemon.forwarded(api.as_html_versions))
+cli(daemon.forwarded(api.as_archive))
+cli(api.rollback)
 cli.output(pprint)(api.project_configuration)
 cli(api.server)
 cli(api.in_browser)
 cli(api.on_github_pages)
+cli(api.daemon)
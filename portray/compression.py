@@ -0,0 +1,149 @@
+"""Defines the optional precompression `portray` can do to generated websites (see the
+`precompress` setting), writing a compressed sibling next to every text asset, such as
+`index.html.gz` next to `index.html`, for web servers to serve as is (for instance using
+nginx's `gzip_static` and `brotli_static`).
+
+- *gzip*: Writes `.gz` siblings, compressed at the highest level.
+- *brotli*: Writes `.br` siblings, compressed at the highest quality.
+  Requires the [brotli](https://pypi.org/project/Brotli/) package to be installed.
+
+Siblings are only written when they are smaller than the file they compress.
+"""
+import filecmp
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from portray import cache, staging
+
+ENCODINGS = {"gzip": ".gz", "brotli": ".br"}
+
+EXTENSIONS = (".html", ".css", ".js", ".json", ".xml", ".svg", ".txt", ".map")
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def validate(encodings: Iterable[str]) -> List[str]:
+    """Returns the given precompression encodings if they are all known (and available),
+    otherwise raising a `ValueError` (or an `ImportError` if brotli isn't installed).
+    """
+    encodings = [encodings] if isinstance(encodings, str) else list(encodings)
+    for encoding in encodings:
+        if encoding not in ENCODINGS:
+            raise ValueError(
+                f"Unknown precompression encoding '{encoding}'. "
+                f"Expected any of: {', '.join(ENCODINGS)}"
+            )
+    if "brotli" in encodings:
+        try:
+            import brotli  # noqa: F401
+        except ImportError as error:
+            raise ImportError(
+                "Precompressing using brotli requires the brotli package: pip install brotli"
+            ) from error
+    return encodings
+
+
+def precompress(
+    directory: str, encodings: Iterable[str], previous_directory: str = "", workers: int = 0
+) -> int:
+    """Writes a compressed sibling for every text asset within directory using each of the
+    given encodings, split across workers threads (`0` uses one per CPU). Returns the number of
+    siblings written.
+
+    Siblings that are newer than the file they compress are left as they are, and if the same
+    file (with the same contents) within previous_directory has an up to date sibling,
+    that sibling is reused rather than compressing the file again.
+    """
+    encodings = validate(encodings)
+    tasks = []
+    for relative_path in cache.files(directory):
+        if not relative_path.endswith(EXTENSIONS):
+            continue
+
+        path = os.path.join(directory, relative_path)
+        previous_path = (
+            os.path.join(previous_directory, relative_path) if previous_directory else ""
+        )
+        for encoding in encodings:
+            sibling = path + ENCODINGS[encoding]
+            if _up_to_date(path, sibling):
+                continue
+            if previous_path and _reusable(path, previous_path, ENCODINGS[encoding]):
+                staging.place_file(previous_path + ENCODINGS[encoding], sibling, "hardlink")
+                os.utime(sibling)  # as up to date as the file it compresses
+                continue
+            tasks.append((path, encoding))
+
+    if not tasks:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        return sum(pool.map(_compress, tasks))
+
+
+def clear_timestamp(path: str) -> None:
+    """Clears the modification time recorded within the header of the gzip file at path (if it
+    exists), as `_compressed` never records one, so that the same contents always produce the
+    same file. MkDocs records the time it writes `sitemap.xml.gz` at, for instance.
+    """
+    try:
+        with open(path, "r+b") as compressed:
+            header = compressed.read(8)
+            if header[:2] == GZIP_MAGIC and header[4:8] != bytes(4):
+                compressed.seek(4)
+                compressed.write(bytes(4))
+    except FileNotFoundError:
+        pass
+
+
+def _compress(task: Tuple[str, str]) -> bool:
+    """Writes the compressed sibling of a single file, returning `True` if one was written
+    (and removing any outdated one otherwise).
+    """
+    path, encoding = task
+    sibling = path + ENCODINGS[encoding]
+    with open(path, "rb") as source_file:
+        contents = source_file.read()
+
+    compressed = _compressed(contents, encoding)
+    if len(compressed) >= len(contents):
+        if os.path.lexists(sibling):
+            os.remove(sibling)
+        return False
+
+    temporary_sibling = f"{sibling}.{os.getpid()}.tmp"
+    with open(temporary_sibling, "wb") as sibling_file:
+        sibling_file.write(compressed)
+    os.replace(temporary_sibling, sibling)
+    return True
+
+
+def _compressed(contents: bytes, encoding: str) -> bytes:
+    if encoding == "brotli":
+        import brotli
+
+        return brotli.compress(contents, quality=11)
+    return gzip.compress(contents, compresslevel=9, mtime=0)
+
+
+def _up_to_date(path: str, sibling: str, source_stat: Optional[os.stat_result] = None) -> bool:
+    """Returns `True` if sibling exists and is no older than the file at path."""
+    try:
+        return os.stat(sibling).st_mtime_ns >= (source_stat or os.stat(path)).st_mtime_ns
+    except OSError:
+        return False
+
+
+def _reusable(path: str, previous_path: str, suffix: str) -> bool:
+    """Returns `True` if previous_path has an up to date sibling and the same contents as path."""
+    try:
+        previous_stat = os.stat(previous_path)
+        if not _up_to_date(previous_path, previous_path + suffix, previous_stat):
+            return False
+        return os.path.samefile(path, previous_path) or filecmp.cmp(
+            path, previous_path, shallow=False
+        )
+    except OSError:
+        return False
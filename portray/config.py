@@ -1,15 +1,16 @@
 """Defines the configuration defaults and load functions used by `portray`"""
 import _ast
 import ast
+import builtins
+import json
 import os
 import re
 import warnings
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-import mkdocs.config as _mkdocs_config  # noqa
-import mkdocs.exceptions as _mkdocs_exceptions  # noqa
-from git import Repo
+from portray import cache
+from portray._version import __version__
 from portray.exceptions import NoProjectFound
 from toml import load as toml_load
 
@@ -23,6 +24,18 @@ PORTRAY_DEFAULTS = {
     "include_reference_documentation": True,
     "labels": {"Cli": "CLI", "Api": "API", "Http": "HTTP", "Pypi": "PyPI"},
     "extra_markdown_extensions": [],
+    "incremental": False,
+    "cache_dir": ".portray-cache",
+    "reference_cache_dir": "",
+    "workers": 1,
+    "staging": "copy",
+    "keep_previous_output": False,
+    "precompress": [],
+    "search_index": "mkdocs",
+    "reference_streaming": False,
+    "reference_memory_limit": 0,
+    "reference_backend": "pdocs",
+    "only": [],
 }
 
 MKDOCS_DEFAULTS: Dict[str, Any] = {
@@ -44,10 +57,18 @@ MKDOCS_DEFAULTS: Dict[str, Any] = {
 
 PDOCS_DEFAULTS: Dict = {"overwrite": True, "exclude_source": False}
 
+PROJECT_CACHE_VERSION = 7
+
+GIT_CONFIG_SECTION = re.compile(r'\[\s*([\w.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\](?:\s*[#;].*)?$')
+
 
 def project(directory: str, config_file: str, **overrides) -> dict:
     """Returns back the complete configuration - including all sub configuration components
     defined below that `portray` was able to determine for the project
+
+    The resolved configuration is cached on disk (see `project_cache_directory`), keyed on the
+    contents of the project's config file, `setup.py` and `.git/config`, so that resolving an
+    unchanged project skips parsing them and introspecting its git repository.
     """
     if not (
         os.path.isfile(os.path.join(directory, config_file))
@@ -56,6 +77,166 @@ def project(directory: str, config_file: str, **overrides) -> dict:
     ):
         raise NoProjectFound(directory)
 
+    cache_file = _project_cache_file(directory, config_file, overrides)
+    cached_project = _load_cached_project(cache_file)
+    if cached_project is not None:
+        _replay_warnings(cached_project["warnings"])
+        return cached_project["config"]
+
+    sources: Dict[str, Optional[dict]] = {}
+    for source in _project_sources(directory, config_file):
+        if os.path.isfile(source):
+            cache.cached_file_hash(source, sources)
+        else:
+            sources[source] = None
+
+    with warnings.catch_warnings(record=True) as caught_warnings:
+        warnings.simplefilter("always")
+        project_config = _resolve_project(directory, config_file, **overrides)
+    resolution_warnings = [
+        [caught.category.__name__, str(caught.message)] for caught in caught_warnings
+    ]
+    _replay_warnings(resolution_warnings)
+
+    _save_cached_project(
+        cache_file,
+        {"sources": sources, "warnings": resolution_warnings, "config": project_config},
+    )
+    return project_config
+
+
+def project_cache_directory() -> str:
+    """Returns the directory resolved project configurations are cached within:
+    `$PORTRAY_CACHE_HOME` if set, otherwise `portray` within the user's cache directory.
+    """
+    if os.environ.get("PORTRAY_CACHE_HOME"):
+        return os.environ["PORTRAY_CACHE_HOME"]
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+        "portray",
+    )
+
+
+def find_projects(root: str, config_file: str = "pyproject.toml") -> List[str]:
+    """Returns the directories of every Python project (any directory with a config_file or
+    `setup.py`) nested within root, in sorted order, without looking within the projects found
+    or within hidden directories, virtual environments and `node_modules`.
+    """
+    projects = []
+    for current_root, directories, files in os.walk(root):
+        if current_root != root and (config_file in files or "setup.py" in files):
+            projects.append(current_root)
+            directories.clear()
+            continue
+
+        directories[:] = sorted(
+            directory
+            for directory in directories
+            if not directory.startswith(".")
+            and directory != "node_modules"
+            and not os.path.isfile(os.path.join(current_root, directory, "pyvenv.cfg"))
+        )
+    return sorted(projects)
+
+
+def _project_sources(directory: str, config_file: str) -> tuple:
+    """Returns the files whose content determines the resolved configuration of a project,
+    including any `.git` file pointing to the git directory of a worktree or submodule.
+    """
+    return (
+        os.path.abspath(os.path.join(directory, config_file)),
+        os.path.abspath(os.path.join(directory, "setup.py")),
+        os.path.abspath(os.path.join(directory, ".git")),
+        os.path.abspath(_git_config_location_or_default(directory)),
+    )
+
+
+def _git_config_location_or_default(directory: str) -> str:
+    """Returns the location of the git config for the project at directory, defaulting to
+    where it would be if the project isn't (yet) a git repository.
+    """
+    try:
+        return _git_config_location(directory) or os.path.join(directory, ".git", "config")
+    except (OSError, UnicodeDecodeError, ValueError):
+        return os.path.join(directory, ".git", "config")
+
+
+def _project_cache_file(directory: str, config_file: str, overrides: dict) -> str:
+    """Returns the location of the cached configuration for the given project and overrides.
+
+    Everything else project resolution depends on (the working directory, portray's
+    version and install location) forms part of the key.
+    """
+    key = cache.text_hash(
+        str(PROJECT_CACHE_VERSION),
+        __version__,
+        os.path.dirname(os.path.abspath(__file__)),
+        os.getcwd(),
+        os.path.abspath(directory),
+        config_file,
+        json.dumps(overrides, sort_keys=True, default=repr),
+    )
+    return os.path.join(project_cache_directory(), "projects", f"{key}.json")
+
+
+def _load_cached_project(cache_file: str) -> Optional[dict]:
+    """Returns the cached project resolution stored in cache_file, or `None` if there isn't one
+    or any of the files it was resolved from have since changed.
+    """
+    try:
+        with open(cache_file) as cached_file:
+            cached_project = json.load(cached_file)
+        sources = cached_project["sources"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    stats_changed = False
+    for source, entry in sources.items():
+        if entry is None:
+            if os.path.isfile(source):
+                return None
+            continue
+        if not os.path.isfile(source):
+            return None
+
+        previous = dict(entry)
+        if cache.cached_file_hash(source, sources) != previous["hash"]:
+            return None
+        stats_changed = stats_changed or sources[source] != previous
+
+    if stats_changed:
+        _save_cached_project(cache_file, cached_project)
+    return cached_project
+
+
+def _save_cached_project(cache_file: str, cached_project: dict) -> None:
+    """Atomically writes a project resolution into cache_file, skipping configurations that
+    would not survive a round trip through JSON unchanged. Failing to write is not an error.
+    """
+    try:
+        serialized = json.dumps(cached_project, sort_keys=True)
+        if json.loads(serialized) != cached_project:
+            return
+
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(f"{cache_file}.{os.getpid()}.tmp", "w") as cached_file:
+            cached_file.write(serialized)
+        os.replace(f"{cache_file}.{os.getpid()}.tmp", cache_file)
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+def _replay_warnings(recorded_warnings: list) -> None:
+    """Re-issues warnings recorded while resolving a project configuration."""
+    for category_name, message in recorded_warnings:
+        category = getattr(builtins, category_name, UserWarning)
+        if not (isinstance(category, type) and issubclass(category, Warning)):
+            category = UserWarning
+        warnings.warn(message, category, stacklevel=3)
+
+
+def _resolve_project(directory: str, config_file: str, **overrides) -> dict:
+    """Resolves the complete configuration for a project without consulting the cache."""
     project_config: Dict[str, Any] = {**PORTRAY_DEFAULTS, "directory": directory}
     if os.path.isfile(os.path.join(directory, "setup.py")):
         project_config.update(setup_py(os.path.join(directory, "setup.py")))
@@ -155,7 +336,7 @@ def repository(
     """
     try:
         if repo_url is None:
-            repo_url = Repo(directory).remotes.origin.url
+            repo_url = _git_remote_url(directory)
         if repo_name is None:
             match = re.search(r"(:(//)?)([\w\.@\:/\-~]+)(\.git)?(/)?", repo_url)
             if match:
@@ -196,10 +377,122 @@ def repository(
         return {}
 
 
+def _git_remote_url(directory: str, remote: str = "origin") -> str:
+    """Returns the URL of the given remote of the git repository rooted at directory.
+
+    The repository's config is read directly, only falling back to GitPython when it can't
+    be interpreted without git's help (for instance when the remote may be defined within
+    an included config file).
+    """
+    try:
+        config_location = _git_config_location(directory)
+        if config_location is None:
+            raise LookupError(f"{directory} is not the root of a git repository")
+        return _git_config_remote_url(config_location, remote)
+    except (OSError, UnicodeDecodeError, ValueError):
+        from git import Repo
+
+        return Repo(directory).remote(remote).url
+
+
+def _git_config_location(directory: str) -> Optional[str]:
+    """Returns the location of the config file of the git repository rooted at directory
+    (following the `gitdir:` files used by worktrees and submodules), or `None` if
+    directory isn't the root of a git repository.
+    """
+    git_dir = os.path.join(directory, ".git")
+    if os.path.isfile(git_dir):
+        with open(git_dir, encoding="utf-8") as git_file:
+            git_file_contents = git_file.read().strip()
+        if not git_file_contents.startswith("gitdir:"):
+            raise ValueError(f"Unable to interpret git file: {git_dir}")
+        git_dir = os.path.join(directory, git_file_contents[len("gitdir:") :].strip())
+    elif not os.path.isdir(git_dir):
+        return None
+
+    # linked worktrees keep their config within the repository they were created from
+    common_dir = os.path.join(git_dir, "commondir")
+    if os.path.isfile(common_dir):
+        with open(common_dir, encoding="utf-8") as common_dir_file:
+            git_dir = os.path.join(git_dir, common_dir_file.read().strip())
+
+    return os.path.normpath(os.path.join(git_dir, "config"))
+
+
+def _git_config_remote_url(location: str, remote: str) -> str:
+    """Returns the URL of the given remote defined within the git config file at location.
+
+    Raises a `LookupError` if the remote isn't defined within the file, or a `ValueError`
+    if the file can't be interpreted (or includes others the remote may be defined within).
+    """
+    section = None
+    includes = False
+    url = None
+    with open(location, encoding="utf-8") as git_config:
+        for line in git_config:
+            line = line.strip()
+            if not line or line[0] in "#;":
+                continue
+
+            if line.startswith("["):
+                header = GIT_CONFIG_SECTION.match(line)
+                if not header:
+                    raise ValueError(f"Unable to interpret git config section: {line}")
+                name, subsection = header.groups()
+                if subsection is None:
+                    name, _, subsection = name.partition(".")
+                else:
+                    subsection = re.sub(r"\\(.)", r"\1", subsection)
+                section = (name.lower(), subsection)
+                includes = includes or section[0] in ("include", "includeif")
+            elif section == ("remote", remote):
+                key, _, value = line.partition("=")
+                if key.strip().lower() == "url":
+                    url = _git_config_string(value)
+
+    if url is None:
+        if includes:
+            raise ValueError(f"Remote {remote} may be defined within a file included by {location}")
+        raise LookupError(f"No {remote} remote is defined within {location}")
+    return url
+
+
+def _git_config_string(value: str) -> str:
+    """Returns the string a raw git config value represents, interpreting quotes, escape
+    sequences and trailing comments.
+    """
+    escapes = {"n": "\n", "t": "\t", "b": "\b", "\\": "\\", '"': '"'}
+    string: List[str] = []
+    preserved = 0  # quoted or escaped characters are never stripped
+    quoted = False
+    characters = iter(value.strip())
+    for character in characters:
+        if character == "\\":
+            escaped = next(characters, "")
+            if escaped not in escapes:
+                raise ValueError(f"Unable to interpret git config value: {value}")
+            string.append(escapes[escaped])
+            preserved = len(string)
+        elif character == '"':
+            quoted = not quoted
+        elif character in "#;" and not quoted:
+            break
+        else:
+            string.append(character)
+            if quoted:
+                preserved = len(string)
+
+    if quoted:
+        raise ValueError(f"Unable to interpret git config value: {value}")
+    return "".join(string[:preserved]) + "".join(string[preserved:]).rstrip()
+
+
 def mkdocs(directory: str, **overrides) -> dict:
     """Returns back the configuration that will be used when running mkdocs"""
     mkdocs_config: Dict[str, Any] = {
         **MKDOCS_DEFAULTS,
+        "site_name": os.path.basename(os.getcwd()),
+        "config_file_path": os.getcwd(),
         **repository(directory, **overrides),
         **overrides,
     }
@@ -0,0 +1,308 @@
+"""Defines the `portray daemon`: a long lived process that keeps MkDocs, pdocs, the theme and
+its compiled templates loaded, building documentation on behalf of `portray` commands so that
+they don't each pay to warm all of that up.
+
+Requests are newline terminated JSON documents sent over a Unix socket (`daemon.sock` within
+the directory `portray.config.project_cache_directory` returns, unless `$PORTRAY_DAEMON_SOCKET`
+is set), each answered with a single JSON document. Builds are run one at a time, from the
+working directory and with the environment variables and `sys.path` of the requesting process.
+
+Connections time out (after `TIMEOUT` seconds, or `RESPONSE_TIMEOUT` seconds while waiting for a
+build), so a stalled client can't block the daemon, and a hung daemon can't block commands.
+Commands that can't reach the daemon build in-process, but once a build was requested they
+fail with `DaemonNotResponding` instead, as the daemon may still be building it.
+
+The `portray` CLI commands (not `portray.api`) use a running daemon automatically (see
+`forwarded`) whenever it runs the same version of `portray` from the same Python interpreter,
+unless `$PORTRAY_NO_DAEMON` is set.
+"""
+import inspect
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import warnings
+from contextlib import ExitStack, redirect_stderr, redirect_stdout
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+from portray import exceptions
+from portray._version import __version__
+
+COMMANDS = ("as_html", "as_html_many", "as_html_versions", "as_archive")
+
+TIMEOUT = 10
+RESPONSE_TIMEOUT = 600
+
+WARM_UP_MODULE = '''"""A module documented while warming up the portray daemon."""
+
+
+def warm_up(value: int = 0) -> int:
+    """Returns the given value."""
+    return value
+'''
+
+_serving = False
+_warm = False
+
+
+def socket_path() -> str:
+    """Returns the location of the Unix socket the build daemon listens on."""
+    if os.environ.get("PORTRAY_DAEMON_SOCKET"):
+        return os.environ["PORTRAY_DAEMON_SOCKET"]
+
+    from portray import config
+
+    return os.path.join(config.project_cache_directory(), "daemon.sock")
+
+
+def request(command: str, path: str = "", **arguments: Any) -> Optional[dict]:
+    """Sends a request to the build daemon listening at path (by default `socket_path()`),
+    returning its response or `None` if no compatible daemon is running there.
+
+    Raises `DaemonNotResponding` if the request was sent but no response was received in time.
+    """
+    path = path or socket_path()
+    if _serving or os.environ.get("PORTRAY_NO_DAEMON") or not hasattr(socket, "AF_UNIX"):
+        return None
+    if not os.path.exists(path):
+        return None
+
+    message = {
+        "command": command,
+        "arguments": arguments,
+        "cwd": os.getcwd(),
+        "environment": dict(os.environ),
+        "path": sys.path,
+        "version": __version__,
+        "executable": sys.executable,
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.settimeout(TIMEOUT)
+            connection.connect(path)
+            connection.sendall(json.dumps(message).encode("utf8") + b"\n")
+        except OSError:
+            return None
+
+        # the daemon may be running the request, so it must not be run elsewhere as well
+        try:
+            connection.settimeout(RESPONSE_TIMEOUT)
+            response = json.loads(connection.makefile("rb").readline() or b"null")
+        except (OSError, ValueError) as error:
+            raise exceptions.DaemonNotResponding(path) from error
+
+    if not isinstance(response, dict) or response.get("rejected"):
+        return None
+    return response
+
+
+def forward(command: str, **arguments: Any) -> bool:
+    """Runs the given `portray.api` command within the running build daemon (if there is one),
+    printing its output and raising any error it raised.
+
+    Returns `False`, without doing anything, if no compatible daemon is running.
+    """
+    response = request(command, **arguments)
+    if response is None:
+        return False
+
+    sys.stdout.write(response.get("output", ""))
+    error = response.get("error")
+    if error:
+        error_type = getattr(exceptions, error["type"], None)
+        if error.get("directory") is not None and error_type in (
+            exceptions.NoProjectFound,
+            exceptions.DocumentationAlreadyExists,
+            exceptions.NoPreviousDocumentation,
+        ):
+            raise error_type(error["directory"])
+        raise exceptions.DaemonBuildFailed(error["type"], error["message"])
+    return True
+
+
+def forwarded(function: Callable[..., None]) -> Callable[..., None]:
+    """Returns the given `portray.api` command wrapped to run within the running build daemon
+    (see `forward`) if there is one, and in-process otherwise.
+    """
+    signature = inspect.signature(function)
+
+    @wraps(function)
+    def forwarding_command(*args: Any, **kwargs: Any) -> None:
+        arguments = signature.bind(*args, **kwargs).arguments
+        if not forward(function.__name__, **arguments):
+            function(**arguments)
+
+    forwarding_command.original = function  # type: ignore  # introspected by hug instead
+    return forwarding_command
+
+
+def serve(path: str = "", warm: bool = True) -> None:
+    """Runs the build daemon, listening on the Unix socket at path (by default `socket_path()`)
+    until a `stop` request is received.
+    """
+    global _serving
+    path = path or socket_path()
+    if request("ping", path) is not None:
+        raise exceptions.DaemonAlreadyRunning(path)
+    if os.path.lexists(path):  # left behind by a daemon that didn't exit cleanly
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    _serving = True
+    if warm:
+        warm_up()
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        umask = os.umask(0o177)  # only the user running the daemon may send it builds
+        try:
+            listener.bind(path)
+        finally:
+            os.umask(umask)
+        listener.listen()
+        print(f"portray daemon {__version__} listening on `{path}`", flush=True)
+        try:
+            while True:
+                connection, _ = listener.accept()
+                with connection:
+                    if not _handle(connection):
+                        break
+        finally:
+            _serving = False
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def warm_up() -> None:
+    """Loads everything a documentation build needs by building a tiny project, and keeps
+    the theme's templates compiled between builds (see `keep_templates_compiled`).
+    """
+    global _warm
+    if _warm:
+        return
+
+    from portray import config, render
+
+    keep_templates_compiled()
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "README.md"), "w") as readme:
+            readme.write("# Warming up\n")
+        with open(os.path.join(directory, "portray_daemon_warm_up.py"), "w") as module:
+            module.write(WARM_UP_MODULE)
+
+        with render.isolated_imports(directory):
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                project_config = config.project(
+                    directory, "pyproject.toml", modules=["portray_daemon_warm_up"]
+                )
+                with render.documentation_in_temp_folder(project_config):
+                    pass
+    _warm = True
+
+
+def keep_templates_compiled() -> None:
+    """Keeps the theme's Jinja templates compiled (within the project configuration cache
+    directory) between the builds made by this process: MkDocs creates a new Jinja environment,
+    and so recompiles every template, for each one.
+    """
+    import jinja2
+    import mkdocs.theme
+    from portray import config
+
+    get_env = mkdocs.theme.Theme.get_env
+    if getattr(get_env, "keeps_templates_compiled", False):
+        return
+
+    templates_directory = os.path.join(config.project_cache_directory(), "templates")
+    os.makedirs(templates_directory, exist_ok=True)
+    bytecode_cache = jinja2.FileSystemBytecodeCache(templates_directory)
+
+    def get_env_with_bytecode_cache(theme: mkdocs.theme.Theme) -> jinja2.Environment:
+        environment = get_env(theme)
+        environment.bytecode_cache = bytecode_cache
+        return environment
+
+    get_env_with_bytecode_cache.keeps_templates_compiled = True  # type: ignore
+    mkdocs.theme.Theme.get_env = get_env_with_bytecode_cache  # type: ignore
+
+
+def _handle(connection: socket.socket) -> bool:
+    """Answers a single request, returning `False` if the daemon was asked to stop."""
+    connection.settimeout(TIMEOUT)
+    try:
+        message = json.loads(connection.makefile("rb").readline() or b"null")
+        command = message["command"]
+    except (OSError, ValueError, TypeError, KeyError):
+        return True
+
+    if message.get("version") != __version__ or message.get("executable") != sys.executable:
+        response: Dict[str, Any] = {"rejected": "incompatible portray version or interpreter"}
+    elif command == "ping":
+        response = {"version": __version__, "pid": os.getpid()}
+    elif command == "stop":
+        response = {"stopped": True}
+    elif command in COMMANDS:
+        response = _run(
+            command,
+            message.get("arguments", {}),
+            message["cwd"],
+            message.get("environment"),
+            message.get("path"),
+        )
+    else:
+        response = {"rejected": f"unknown command {command}"}
+
+    try:
+        connection.sendall(json.dumps(response).encode("utf8") + b"\n")
+    except OSError:
+        pass
+    return command != "stop" or "rejected" in response
+
+
+def _run(
+    command: str,
+    arguments: dict,
+    cwd: str,
+    environment: Optional[Dict[str, str]] = None,
+    path: Optional[List[str]] = None,
+) -> dict:
+    """Runs a `portray.api` command as if from within cwd, with the given environment variables
+    and `sys.path` (those of the requesting process), capturing everything it outputs.
+    Modules imported from the project, or from any directory on path that isn't on this
+    process's own `sys.path`, are forgotten afterwards.
+    """
+    from portray import api, render
+
+    output = io.StringIO()
+    previous_cwd = os.getcwd()
+    previous_environment = dict(os.environ)
+    response: Dict[str, Any] = {}
+    try:
+        with ExitStack() as isolated:
+            for directory in [os.path.join(cwd, arguments.get("directory") or "")] + [
+                os.path.join(cwd, entry) for entry in path or () if entry not in sys.path
+            ]:
+                isolated.enter_context(render.isolated_imports(directory))
+            os.chdir(cwd)
+            if environment is not None:
+                os.environ.clear()
+                os.environ.update(environment)
+            if path is not None:
+                sys.path[:] = path
+            with redirect_stdout(output), redirect_stderr(output), warnings.catch_warnings():
+                getattr(api, command)(**arguments)
+    except (Exception, SystemExit) as error:  # pdocs exits when modules fail to import
+        response["error"] = {
+            "type": type(error).__name__,
+            "message": str(error),
+            "directory": getattr(error, "directory", None),
+        }
+    finally:
+        os.chdir(previous_cwd)
+        os.environ.clear()
+        os.environ.update(previous_environment)
+
+    response["output"] = output.getvalue()
+    return response
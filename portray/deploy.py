@@ -0,0 +1,213 @@
+"""Defines how `portray on_github_pages --incremental` deploys a generated website to the
+branch GitHub pages is served from, only writing what changed since the last deploy.
+
+Rather than importing the whole website into a new commit (as MkDocs' `gh-deploy` does),
+the git blob id of every generated file is computed and compared with the tree of the
+branch's last commit. Only new and changed files are written into the repository, the new tree
+is assembled from the previous one within a temporary index, and if it is identical to the
+previous tree nothing is committed or pushed.
+
+The branch is the local one, if it exists, or otherwise the remote's (as fetched).
+Deploys only use git's plumbing commands, so they work against any remote git accepts,
+including a local bare repository. Like MkDocs' `gh-deploy`, deploys made with an older version
+of MkDocs than the branch's last one are refused (see `check_version`).
+"""
+import hashlib
+import os
+import re
+import subprocess  # nosec
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from portray.exceptions import NewerVersionDeployed
+
+FILE_MODE = "100644"
+EMPTY_BLOB = "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+
+
+def github_pages(
+    site_dir: str,
+    directory: str,
+    message: str,
+    remote: str = "origin",
+    branch: str = "gh-pages",
+    force: bool = False,
+    nojekyll: bool = True,
+) -> Optional[str]:
+    """Commits the website generated into site_dir onto branch of the git repository the
+    project at directory is within, as a child of the branch's last commit, and pushes the
+    branch to remote (forcefully, if force is set).
+
+    Returns the commit deployed, or `None` if the website is unchanged since the last deploy,
+    in which case nothing is committed or pushed. Unless told otherwise, an empty `.nojekyll`
+    file is added so GitHub pages serves the website as is.
+    """
+    parent = _last_commit(directory, remote, branch)
+    deployed = _tree(directory, parent) if parent else {}
+    generated = _site_files(site_dir)
+    if nojekyll and ".nojekyll" not in generated:
+        generated[".nojekyll"] = ""
+
+    blobs = {path: blob_id(source) if source else EMPTY_BLOB for path, source in generated.items()}
+    changed = {
+        path: blob for path, blob in blobs.items() if deployed.get(path) != (FILE_MODE, blob)
+    }
+    removed = [path for path in deployed if path not in generated]
+    if parent and not changed and not removed:
+        return None
+
+    _write_blobs(directory, [generated[path] for path in changed])
+    tree = _write_tree(directory, parent, changed, removed)
+
+    commit = _git(
+        directory,
+        "commit-tree",
+        tree,
+        *(("-p", parent) if parent else ()),
+        "-m",
+        message,
+    )
+    _git(directory, "update-ref", f"refs/heads/{branch}", commit)
+    _git(
+        directory,
+        "push",
+        *(("--force",) if force else ()),
+        remote,
+        f"refs/heads/{branch}:refs/heads/{branch}",
+    )
+    return commit
+
+
+def check_version(
+    directory: str, mkdocs_version: str, remote: str = "origin", branch: str = "gh-pages"
+) -> None:
+    """Raises `NewerVersionDeployed` if the last commit of branch (see `github_pages`) within
+    the git repository the project at directory is within was deployed by a newer version of
+    MkDocs than mkdocs_version, as read from its commit message.
+    """
+    parent = _last_commit(directory, remote, branch)
+    if not parent:
+        return
+
+    deployed_version = _version(_git(directory, "show", "-s", "--format=%s", parent))
+    if deployed_version > _version(mkdocs_version):
+        raise NewerVersionDeployed(
+            branch, ".".join(str(part) for part in deployed_version), mkdocs_version
+        )
+
+
+def current_sha(directory: str) -> str:
+    """Returns the abbreviated id of the commit checked out within directory, or an empty string
+    if there's none.
+    """
+    try:
+        return _git(directory, "rev-parse", "--short", "HEAD")
+    except subprocess.CalledProcessError:
+        return ""
+
+
+def blob_id(path: str) -> str:
+    """Returns the id git gives the contents of the file at path when stored as a blob."""
+    digest = hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode("ascii"))  # nosec
+    with open(path, "rb") as blob_file:
+        for chunk in iter(lambda: blob_file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _git(directory: str, *arguments: str, text: str = "", env: Optional[dict] = None) -> str:
+    """Runs a git command within directory, returning its output with trailing whitespace
+    removed and raising a `CalledProcessError` if it fails.
+    """
+    return (
+        subprocess.run(  # nosec
+            ["git", *arguments],
+            cwd=directory,
+            input=text.encode("utf8"),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env={**os.environ, **(env or {})},
+            check=True,
+        )
+        .stdout.decode("utf8")
+        .rstrip()
+    )
+
+
+def _version(text: str) -> Tuple[int, ...]:
+    """Returns the release numbers of the first version mentioned within text
+    (an empty tuple if there's none).
+    """
+    match = re.search(r"\d+(\.\d+)+", text)
+    return tuple(int(part) for part in match.group().split(".")) if match else ()
+
+
+def _last_commit(directory: str, remote: str, branch: str) -> str:
+    """Returns the last commit of the local branch, if it exists, otherwise that of the remote's,
+    or an empty string if there's neither.
+    """
+    for ref in (f"refs/heads/{branch}", f"refs/remotes/{remote}/{branch}"):
+        try:
+            return _git(directory, "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}")
+        except subprocess.CalledProcessError:
+            continue
+    return ""
+
+
+def _tree(directory: str, commit: str) -> Dict[str, Tuple[str, str]]:
+    """Returns the mode and object id of every entry within the tree of commit, by path."""
+    listing = _git(directory, "ls-tree", "-r", "-z", "--full-tree", commit)
+    entries = {}
+    for entry in listing.split("\0"):
+        if entry:
+            details, path = entry.split("\t", 1)
+            mode, _, object_id = details.split()
+            entries[path] = (mode, object_id)
+    return entries
+
+
+def _site_files(site_dir: str) -> Dict[str, str]:
+    """Returns the location of every file within site_dir by its path relative to site_dir
+    (using `/` as separator, as git does).
+    """
+    files = {}
+    for root, _, file_names in os.walk(site_dir):
+        for file_name in file_names:
+            source = os.path.join(root, file_name)
+            files[os.path.relpath(source, site_dir).replace(os.sep, "/")] = source
+    return files
+
+
+def _write_blobs(directory: str, sources: List[str]) -> None:
+    """Stores the contents of each of the given files (or of nothing, for empty sources)
+    as blobs within the repository.
+    """
+    if "" in sources:
+        _git(directory, "hash-object", "-w", "--stdin")
+    sources = [source for source in sources if source]
+    if sources:
+        _git(
+            directory, "hash-object", "-w", "--no-filters", "--stdin-paths", text="\n".join(sources)
+        )
+
+
+def _write_tree(directory: str, parent: str, changed: Dict[str, str], removed: List[str]) -> str:
+    """Writes the tree of parent (or an empty tree) with the changed blobs (by path) added
+    and the removed paths left out, returning its id.
+    """
+    # removed first, so that files can be replaced by directories of the same name
+    entries: List[Tuple[str, str, str]] = [("0", "0" * 40, path) for path in removed] + [
+        (FILE_MODE, blob, path) for path, blob in sorted(changed.items())
+    ]
+    with tempfile.TemporaryDirectory() as index_directory:
+        index = {"GIT_INDEX_FILE": os.path.join(index_directory, "index")}
+        _git(directory, "read-tree", *((parent,) if parent else ("--empty",)), env=index)
+        _git(
+            directory,
+            "update-index",
+            "-z",
+            "--index-info",
+            text="".join(f"{mode} {blob}\t{path}\0" for mode, blob, path in entries),
+            env=index,
+        )
+        return _git(directory, "write-tree", env=index)
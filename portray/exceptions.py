@@ -27,3 +27,63 @@ class DocumentationAlreadyExists(PortrayError):
             self, f"Documentation already exists in '{directory}'. Use --overwrite to ignore"
         )
         self.directory = directory
+
+
+class NoPreviousDocumentation(PortrayError):
+    """Thrown when portray is asked to roll back documentation but no previous generation exists"""
+
+    def __init__(self, directory: str):
+        super().__init__(
+            self,
+            f"No previous documentation generation exists for '{directory}'."
+            + " Set keep_previous_output = true to keep one on each build",
+        )
+        self.directory = directory
+
+
+class DaemonAlreadyRunning(PortrayError):
+    """Thrown when a portray daemon is started where one is already listening"""
+
+    def __init__(self, socket_path: str):
+        super().__init__(self, f"A portray daemon is already listening on '{socket_path}'")
+        self.socket_path = socket_path
+
+
+class DaemonBuildFailed(PortrayError):
+    """Thrown when a build ran by the portray daemon fails with a non portray exception"""
+
+    def __init__(self, error_type: str, message: str):
+        super().__init__(self, f"The portray daemon's build failed with {error_type}: {message}")
+        self.error_type = error_type
+
+
+class DaemonNotResponding(PortrayError):
+    """Thrown when the portray daemon accepted a request to build but didn't respond in time"""
+
+    def __init__(self, socket_path: str):
+        super().__init__(
+            self,
+            f"The portray daemon listening on '{socket_path}' didn't respond."
+            + " It may still be building, so the build wasn't retried",
+        )
+        self.socket_path = socket_path
+
+
+class NewerVersionDeployed(PortrayError):
+    """Thrown when deploying to GitHub pages with an older version of MkDocs than the last deploy"""
+
+    def __init__(self, branch: str, deployed_version: str, version: str):
+        super().__init__(
+            self,
+            f"The last deploy to '{branch}' was made with MkDocs {deployed_version}, newer than"
+            + f" {version}. Use --ignore_version to deploy anyway",
+        )
+        self.branch = branch
+
+
+class ModuleNotFound(PortrayError):
+    """Thrown when the source of a module to generate reference documentation for can't be found"""
+
+    def __init__(self, module: str):
+        super().__init__(self, f"Unable to find the source of module '{module}'")
+        self.module = module
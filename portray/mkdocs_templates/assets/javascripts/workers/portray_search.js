@@ -0,0 +1,244 @@
+/*
+ * The search worker of portray's Material templates. It answers the theme's search queries
+ * using the sharded search index written by `portray.search`, only fetching the shards of the
+ * terms searched for and the documents shown as results, rather than the whole index up front.
+ *
+ * It speaks the theme's worker protocol: a SETUP message (0) carrying the index manifest,
+ * answered with READY (1), and QUERY messages (2) answered with their RESULT (3).
+ */
+"use strict"
+
+var SETUP = 0
+var READY = 1
+var QUERY = 2
+var RESULT = 3
+
+// must match `portray.search.terms`
+var TERM = /[\p{L}\p{N}]+/gu
+var MIN_TERM_LENGTH = 2
+
+var MAX_RESULTS = 100
+var PREFIX_MATCH_WEIGHT = 0.5
+
+var SEARCH_DIRECTORY = new URL("../../../search/", self.location.href)
+
+var index = null
+var latestQuery = 0
+var loaded = {}
+
+function load(fileName) {
+  if (!(fileName in loaded)) {
+    loaded[fileName] = fetch(new URL(fileName, SEARCH_DIRECTORY)).then(function (response) {
+      if (!response.ok) {
+        delete loaded[fileName]
+        throw new Error("Unable to load " + fileName + ": " + response.status)
+      }
+      return response.json()
+    })
+  }
+  return loaded[fileName]
+}
+
+function terms(text) {
+  var found = (text.toLowerCase().match(TERM) || []).filter(function (term) {
+    return Array.from(term).length >= MIN_TERM_LENGTH
+  })
+  return found.filter(function (term, position) {
+    return found.indexOf(term) === position
+  })
+}
+
+// Resolves to the score of every document containing a term starting with term
+function matches(term) {
+  var prefix = Array.from(term).slice(0, index.prefix_length).join("")
+  var shardFiles = Object.keys(index.shards)
+    .filter(function (shardPrefix) {
+      return shardPrefix.indexOf(prefix) === 0
+    })
+    .map(function (shardPrefix) {
+      return index.shards[shardPrefix]
+    })
+
+  return Promise.all(shardFiles.map(load)).then(function (shards) {
+    var scores = {}
+    shards.forEach(function (shard) {
+      Object.keys(shard).forEach(function (candidate) {
+        if (candidate.indexOf(term) !== 0) {
+          return
+        }
+        var postings = shard[candidate]
+        var inverseFrequency = Math.log(1 + index.documents / (postings.length / 2))
+        var exactness = candidate === term ? 1 : PREFIX_MATCH_WEIGHT
+        var documentId = 0
+        for (var position = 0; position < postings.length; position += 2) {
+          documentId += postings[position]
+          var weight = postings[position + 1]
+          var score = (inverseFrequency * exactness * weight) / (weight + 1.2)
+          if (!(documentId in scores) || scores[documentId] < score) {
+            scores[documentId] = score
+          }
+        }
+      })
+    })
+    return scores
+  })
+}
+
+// Resolves to the record of every given document
+function records(documentIds) {
+  var files = {}
+  documentIds.forEach(function (documentId) {
+    files[Math.floor(documentId / index.documents_per_shard)] = true
+  })
+  return Promise.all(
+    Object.keys(files).map(function (shardNumber) {
+      return load(index.document_shards[shardNumber]).then(function (shard) {
+        return [Number(shardNumber), shard]
+      })
+    })
+  ).then(function (shards) {
+    var found = {}
+    shards.forEach(function (numberedShard) {
+      var start = numberedShard[0] * index.documents_per_shard
+      numberedShard[1].forEach(function (record, offset) {
+        found[start + offset] = record
+      })
+    })
+    return found
+  })
+}
+
+function escapeHTML(text) {
+  return text.replace(/[&<>"']/g, function (character) {
+    return "&#" + character.charCodeAt(0) + ";"
+  })
+}
+
+function highlighter(queryTerms) {
+  var pattern = new RegExp(
+    "(^|[^\\p{L}\\p{N}])((?:" + queryTerms.join("|") + ")[\\p{L}\\p{N}]*)",
+    "giu"
+  )
+  return function (text) {
+    var highlighted = ""
+    var position = 0
+    var match
+    pattern.lastIndex = 0
+    while ((match = pattern.exec(text))) {
+      var start = match.index + match[1].length
+      highlighted +=
+        escapeHTML(text.slice(position, start)) +
+        "<mark data-md-highlight>" +
+        escapeHTML(match[2]) +
+        "</mark>"
+      position = pattern.lastIndex
+    }
+    return highlighted + escapeHTML(text.slice(position))
+  }
+}
+
+function search(query) {
+  var queryTerms = terms(query)
+  if (!index || !queryTerms.length) {
+    return Promise.resolve({ items: [] })
+  }
+
+  return Promise.all(queryTerms.map(matches)).then(function (termScores) {
+    var ranked = {}
+    termScores.forEach(function (scores, position) {
+      Object.keys(scores).forEach(function (documentId) {
+        var result = ranked[documentId] || (ranked[documentId] = { score: 0, terms: {} })
+        result.score += scores[documentId]
+        result.terms[queryTerms[position]] = true
+      })
+    })
+    var results = Object.keys(ranked)
+      .map(function (documentId) {
+        var result = ranked[documentId]
+        var found = Object.keys(result.terms).length
+        queryTerms.forEach(function (term) {
+          result.terms[term] = !!result.terms[term]
+        })
+        result.id = Number(documentId)
+        result.score *= found / queryTerms.length // documents containing every term first
+        return result
+      })
+      .sort(function (first, second) {
+        return second.score - first.score
+      })
+      .slice(0, MAX_RESULTS)
+
+    return records(results.map(function (result) {
+      return result.id
+    })).then(function (found) {
+      var pageIds = results.map(function (result) {
+        var record = found[result.id]
+        return record.length > 3 ? record[3] : result.id
+      })
+      return records(pageIds).then(function (pages) {
+        return { items: grouped(results, pageIds, found, pages, highlighter(queryTerms)) }
+      })
+    })
+  })
+}
+
+// Groups results by page, each page first followed by its sections, as the theme renders them
+function grouped(results, pageIds, found, pages, highlight) {
+  var groups = []
+  var pageGroups = {}
+  results.forEach(function (result, position) {
+    var pageId = pageIds[position]
+    var page = pages[pageId]
+    var group = pageGroups[pageId]
+    if (!group) {
+      group = pageGroups[pageId] = {
+        page: { location: page[0], title: highlight(page[1]), text: highlight(page[2]) },
+        pageResult: null,
+        best: result,
+        sections: [],
+      }
+      groups.push(group)
+    }
+
+    if (result.id === pageId) {
+      group.pageResult = result
+      return
+    }
+    var record = found[result.id]
+    group.sections.push({
+      location: page[0] + record[0],
+      title: highlight(record[1]),
+      text: highlight(record[2]),
+      score: result.score,
+      terms: result.terms,
+    })
+  })
+
+  return groups.map(function (group) {
+    var pageResult = group.pageResult || group.best
+    group.page.score = group.best.score
+    group.page.terms = pageResult.terms
+    return [group.page].concat(group.sections)
+  })
+}
+
+addEventListener("message", function (event) {
+  var message = event.data
+  if (message.type === SETUP) {
+    index = message.data.docs
+    postMessage({ type: READY })
+  } else if (message.type === QUERY) {
+    var queryNumber = ++latestQuery
+    search(message.data).then(
+      function (data) {
+        if (queryNumber === latestQuery) {
+          postMessage({ type: RESULT, data: data })
+        }
+      },
+      function (error) {
+        console.warn(error)
+        postMessage({ type: RESULT, data: { items: [] } })
+      }
+    )
+  }
+})
@@ -0,0 +1,372 @@
+"""Defines the optional build profiling `portray` can do (see `as_html --profile`), recording
+the wall time, CPU time and memory usage of every phase of a documentation build.
+
+Work is measured by wrapping it in `phase`, which does nothing unless phases are being
+recorded (see `recording` and `profiled`). Recorded phases can be written as a JSON report
+(`write_report`) and as a [Chrome trace](https://ui.perfetto.dev/) (`write_trace`).
+
+CPU time includes that of finished child processes (such as reference documentation workers).
+Memory is recorded as the resident set size of the recording process at the end of each phase
+(`rss`) and as how much the phase raised the process's high-water mark (`peak_rss_increase`),
+which is zero for phases that never used more memory than an earlier one did. The high-water
+mark itself, which covers every phase before as well, is kept as `process_peak_rss`.
+
+Within `imports_measured` (which wraps reference documentation generation), the import of every
+module is recorded as a phase of its own, named `import MODULE`, much like `python -X importtime`
+but also measuring how much the resident set size grew. Imports are reported separately from
+other phases, slowest first, along with their self time and memory (excluding that of the imports
+they triggered).
+"""
+import json
+import os
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+SUMMARIZED_IMPORTS = 10
+
+_phases: Optional[List[dict]] = None
+_open_phases: List[dict] = []
+_open_imports: List[dict] = []
+
+
+def enabled() -> bool:
+    """Returns `True` if phases are currently being recorded."""
+    return _phases is not None
+
+
+@contextmanager
+def recording() -> Iterator[List[dict]]:
+    """Records every phase entered until exiting, yielding the list phases are recorded into
+    (in the order they were entered).
+    """
+    global _phases, _open_phases
+    previous_phases, previous_open_phases = _phases, _open_phases
+    _phases, _open_phases = [], []
+    try:
+        yield _phases
+    finally:
+        _phases, _open_phases = previous_phases, previous_open_phases
+
+
+@contextmanager
+def phase(name: str, **details) -> Iterator[None]:
+    """Measures the work done within as a phase of the given name (along with any details)
+    nested within the currently open phase, if phases are being recorded.
+    """
+    if _phases is None:
+        yield
+        return
+
+    record = {
+        "name": name,
+        "parent": _open_phases[-1]["name"] if _open_phases else None,
+        "depth": len(_open_phases),
+        "pid": os.getpid(),
+        "start": time.time(),
+        **({"details": details} if details else {}),
+    }
+    _phases.append(record)
+    _open_phases.append(record)
+    start_wall_time, start_cpu_time, start_peak_rss = time.perf_counter(), _cpu_time(), _peak_rss()
+    try:
+        yield
+    finally:
+        _open_phases.remove(record)
+        peak_rss = _peak_rss()
+        record.update(
+            wall_time=time.perf_counter() - start_wall_time,
+            cpu_time=_cpu_time() - start_cpu_time,
+            rss=current_rss(),
+            process_peak_rss=peak_rss,
+            peak_rss_increase=(
+                peak_rss - start_peak_rss
+                if peak_rss is not None and start_peak_rss is not None
+                else None
+            ),
+        )
+
+
+def adopt(phases: List[dict]) -> None:
+    """Records phases recorded elsewhere (for instance within a worker process) as if they were
+    entered within the currently open phase.
+    """
+    if _phases is None:
+        return
+
+    parent = _open_phases[-1]["name"] if _open_phases else None
+    for record in phases:
+        _phases.append(
+            {
+                **record,
+                "parent": record["parent"] or parent,
+                "depth": record["depth"] + len(_open_phases),
+            }
+        )
+
+
+@contextmanager
+def imports_measured() -> Iterator[None]:
+    """Records the import of every module imported within as a phase, if phases are being
+    recorded (and the imports of this process aren't already being measured).
+    """
+    if _phases is None or any(isinstance(finder, _ImportMeasurer) for finder in sys.meta_path):
+        yield
+        return
+
+    finder = _ImportMeasurer()
+    sys.meta_path.insert(0, finder)
+    try:
+        yield
+    finally:
+        sys.meta_path.remove(finder)
+
+
+def imports(phases: List[dict]) -> List[dict]:
+    """Returns the imports recorded among phases, slowest (by self time) first."""
+    return sorted(
+        (
+            {
+                "module": record["details"]["imported"],
+                "phase": record["details"]["within"],
+                "pid": record["pid"],
+                "wall_time": record.get("wall_time", 0),
+                "self_time": record.get("self_time", 0),
+                "rss_increase": record.get("rss_increase"),
+                "self_rss_increase": record.get("self_rss_increase"),
+            }
+            for record in phases
+            if _is_import(record)
+        ),
+        key=lambda measured_import: measured_import["self_time"],
+        reverse=True,
+    )
+
+
+@contextmanager
+def profiled(enabled: bool, report_file: str, trace_file: str = "") -> Iterator[Callable[[], None]]:
+    """Records phases while enabled, yielding a function that writes the JSON report (and
+    Chrome trace, if a trace_file is given) of every phase recorded so far. It is called again
+    on exit, after which a summary of the phases is printed.
+    """
+    if not enabled:
+        yield lambda: None
+        return
+
+    with recording() as phases:
+
+        def save() -> None:
+            write_report(phases, report_file)
+            if trace_file:
+                write_trace(phases, trace_file)
+
+        try:
+            yield save
+        finally:
+            save()
+
+    print(summary(phases))
+    print(f"Build profile written to `{os.path.abspath(report_file)}`")
+    if trace_file:
+        print(f"Chrome trace written to `{os.path.abspath(trace_file)}`")
+
+
+def write_report(phases: List[dict], report_file: str) -> None:
+    """Writes the recorded phases as a JSON report into report_file, with any imports
+    recorded among them listed separately (see `imports`).
+    """
+    with open(report_file, "w") as report:
+        json.dump(
+            {
+                "phases": [record for record in phases if not _is_import(record)],
+                "imports": imports(phases),
+            },
+            report,
+            indent=2,
+        )
+
+
+def write_trace(phases: List[dict], trace_file: str) -> None:
+    """Writes the recorded phases into trace_file in the Chrome trace event format,
+    viewable using `chrome://tracing` or [Perfetto](https://ui.perfetto.dev/).
+    """
+    events = [
+        {
+            "name": record["name"],
+            "cat": "portray",
+            "ph": "X",
+            "ts": record["start"] * 1_000_000,
+            "dur": record.get("wall_time", 0) * 1_000_000,
+            "pid": record["pid"],
+            "tid": record["pid"],
+            "args": {
+                "cpu_time": record.get("cpu_time"),
+                "rss": record.get("rss"),
+                "peak_rss_increase": record.get("peak_rss_increase"),
+                **record.get("details", {}),
+            },
+        }
+        for record in phases
+    ]
+    with open(trace_file, "w") as trace:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace)
+
+
+def summary(phases: List[dict]) -> str:
+    """Returns a human readable table of the recorded phases, followed by one of the
+    `SUMMARIZED_IMPORTS` slowest imports recorded among them (if any).
+    """
+    lines = [f"{'phase':<60} {'wall (s)':>9} {'cpu (s)':>9} {'rss (MB)':>9} {'peak +(MB)':>10}"]
+    for record in phases:
+        if _is_import(record):
+            continue
+        lines.append(
+            f"{'  ' * record['depth'] + record['name']:<60.60} {record.get('wall_time', 0):>9.3f}"
+            f" {record.get('cpu_time', 0):>9.3f}"
+            f" {_megabytes(record.get('rss')):>9.1f}"
+            f" {_megabytes(record.get('peak_rss_increase')):>10.1f}"
+        )
+
+    slowest_imports = imports(phases)[:SUMMARIZED_IMPORTS]
+    if slowest_imports:
+        lines.append("")
+        lines.append(
+            f"{'slowest imports':<40} {'self (s)':>9} {'total (s)':>9}"
+            f" {'self rss (MB)':>14} {'total rss (MB)':>14}"
+        )
+        for measured_import in slowest_imports:
+            lines.append(
+                f"{measured_import['module']:<40.40} {measured_import['self_time']:>9.3f}"
+                f" {measured_import['wall_time']:>9.3f}"
+                f" {_megabytes(measured_import['self_rss_increase']):>14.1f}"
+                f" {_megabytes(measured_import['rss_increase']):>14.1f}"
+            )
+    return "\n".join(lines)
+
+
+def current_rss() -> Optional[int]:
+    """Returns the current resident set size of this process in bytes, falling back to its
+    peak resident set size where the current one isn't available.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return _peak_rss()
+
+
+def _cpu_time() -> float:
+    """Returns the user and system CPU time used by this process and its finished children."""
+    return sum(os.times()[:4])
+
+
+def _peak_rss() -> Optional[int]:
+    """Returns the peak resident set size of this process in bytes, if the platform tells."""
+    if resource is None:  # pragma: no cover
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def _megabytes(size: Optional[int]) -> float:
+    return size / 1024 / 1024 if size is not None else float("nan")
+
+
+def _is_import(record: dict) -> bool:
+    return "imported" in record.get("details", {})
+
+
+class _ImportMeasurer:
+    """A meta path finder finding modules using the finders after it, wrapping their loaders
+    so that executing each module is recorded as a phase.
+    """
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, "find_spec", None)
+            if finder is self or find_spec is None:
+                continue
+            spec = find_spec(name, path, target)
+            if spec is None:
+                continue
+            if hasattr(spec.loader, "exec_module"):
+                spec.loader = _MeasuredLoader(spec.loader)
+            return spec
+        return None
+
+    def invalidate_caches(self) -> None:
+        pass
+
+
+class _MeasuredLoader:
+    """Wraps a loader, recording the creation and execution of the module it loads as an import
+    phase. The module is handed back to the wrapped loader before it is executed.
+    """
+
+    def __init__(self, loader) -> None:
+        self.loader = loader
+        self.measurement: Optional[ExitStack] = None
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        if _phases is not None:
+            self.measurement = ExitStack()
+            self.measurement.enter_context(_measured_import(spec.name))
+        create_module = getattr(self.loader, "create_module", None)
+        try:
+            return create_module(spec) if create_module is not None else None
+        except BaseException:
+            self.finish()
+            raise
+
+    def exec_module(self, module) -> None:
+        if module.__spec__.loader is self:
+            module.__spec__.loader = self.loader
+        if getattr(module, "__loader__", None) is self:
+            module.__loader__ = self.loader
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.finish()
+
+    def finish(self) -> None:
+        measurement, self.measurement = self.measurement, None
+        if measurement is not None:
+            measurement.close()
+
+
+@contextmanager
+def _measured_import(name: str) -> Iterator[None]:
+    """Records the import of the named module as a phase, along with the time spent and memory
+    used by it excluding that of the imports made within.
+    """
+    enclosing = [record for record in _open_phases if not _is_import(record)]
+    measured = {"child_time": 0.0, "child_rss_increase": 0}
+    start_rss = current_rss()
+    with phase(
+        f"import {name}", imported=name, within=enclosing[-1]["name"] if enclosing else None
+    ):
+        record = _open_phases[-1]
+        _open_imports.append(measured)
+        try:
+            yield
+        finally:
+            _open_imports.pop()
+            end_rss = current_rss()
+    rss_increase = end_rss - start_rss if end_rss is not None and start_rss is not None else 0
+    record.update(
+        self_time=max(record["wall_time"] - measured["child_time"], 0.0),
+        rss_increase=rss_increase,
+        self_rss_increase=rss_increase - measured["child_rss_increase"],
+    )
+    if _open_imports:
+        _open_imports[-1]["child_time"] += record["wall_time"]
+        _open_imports[-1]["child_rss_increase"] += rss_increase
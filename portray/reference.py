@@ -0,0 +1,860 @@
+"""Defines the static reference documentation backend (see the `reference_backend` setting),
+which documents modules by parsing their source with `ast` instead of importing them, so
+generating reference documentation never runs any of the documented code.
+
+Modules, classes, functions, variables and their docstrings are gathered as pdocs gathers
+them and rendered by pdocs' own Markdown template, producing the same layout. Without running
+any code:
+
+- Only names bound within a module are documented, along with those listed in its `__all__`.
+- Classes only inherit members and docstrings from classes whose source can be found
+  (and from builtins), and only list the subclasses defined within the same module.
+- Default values that aren't literals are shown as written.
+- Modules without Python source (such as extension modules) are listed, but not documented.
+"""
+import ast
+import builtins
+import importlib.machinery
+import importlib.util
+import inspect
+import io
+import os
+import pkgutil
+import re
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from pdocs import doc as pdocs_doc
+from pdocs.extract import split_module_spec as pdocs_split_module_spec
+from pdocs.render import text as pdocs_text
+from pdocs.render import tpl_lookup as pdocs_template_lookup
+from pdocs.static import module_to_path as pdocs_module_to_path
+from portray.exceptions import DocumentationAlreadyExists, ModuleNotFound
+
+BACKENDS = ("pdocs", "static")
+
+SOURCE_CACHE_SIZE = 128
+MAX_RESOLUTION_DEPTH = 16
+
+LINE_BREAK = re.compile(r"\s*\n\s*")
+
+
+def validate(reference_backend: str) -> str:
+    """Returns the given reference backend if it is known, otherwise raising a `ValueError`."""
+    if reference_backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown reference backend '{reference_backend}'. Expected one of: "
+            f"{', '.join(BACKENDS)}"
+        )
+    return reference_backend
+
+
+def as_markdown(
+    modules: List[str],
+    output_dir: str,
+    overwrite: bool = False,
+    exclude_source: bool = False,
+    template_dir: str = "",
+    recursive: bool = True,
+) -> str:
+    """Statically documents every given module (and, if recursive, its public submodules) as
+    Markdown within output_dir, taking the same arguments as `pdocs.as_markdown`. Each page is
+    written as soon as its module is parsed. Returns the `output_dir`.
+    """
+    if template_dir and template_dir not in pdocs_template_lookup.directories:
+        pdocs_template_lookup.directories.insert(0, template_dir)
+
+    for module_spec in modules:
+        for module in islice(documented_modules(module_spec), None if recursive else 1):
+            destination = Path(output_dir) / pdocs_module_to_path(module, extension="md")
+            if not overwrite and destination.exists():
+                raise DocumentationAlreadyExists(str(destination))
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            destination.write_text(pdocs_text(module, source=not exclude_source), encoding="utf-8")
+    return output_dir
+
+
+def documented_modules(module_spec: str) -> Iterator["Module"]:
+    """Yields the documentation of the given module (an import path or a file path, as accepted
+    by pdocs) followed by that of each of its public submodules, one at a time.
+    """
+    dname, mname = pdocs_split_module_spec(module_spec)
+    root_path = (os.path.abspath(dname),) if dname else None
+    spec = _find_spec(mname, root_path)
+    if spec is None:
+        raise ModuleNotFound(module_spec)
+    yield from _documented_modules(mname, spec, root_path)
+
+
+class Module(pdocs_doc.Module):
+    """The documentation of a module, gathered from its source."""
+
+    def __init__(
+        self,
+        name: str,
+        source: Optional["_Source"],
+        submodules: List[str],
+        is_namespace: bool = False,
+    ):
+        pdocs_doc.Doc.__init__(self, name, None, source.docstring if source else "")
+        self.parent = None
+        self.doc: Dict[str, pdocs_doc.Doc] = {}
+        self.refdoc: Dict[str, pdocs_doc.Doc] = {}
+        self.submodules = [SimpleNamespace(name=submodule) for submodule in submodules]
+        self._source = source
+        self._is_namespace = is_namespace
+        if source is None:
+            return
+
+        exported = (
+            source.all
+            if source.all is not None
+            else [name for name in source.definitions if pdocs_doc._is_exported(name)]
+        )
+        for name in exported:
+            if name in source.definitions:
+                definition: Optional[Tuple[_Source, ast.AST]] = (source, source.definitions[name])
+            elif name in source.imports:
+                definition = _resolve(source, name)
+            else:
+                continue
+
+            if definition and isinstance(definition[1], ast.ClassDef):
+                self.doc[name] = Class(name, self, definition[0], definition[1])
+            elif definition and isinstance(definition[1], (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.doc[name] = Function(name, self, definition[0], definition[1])
+            else:
+                self.doc[name] = pdocs_doc.Variable(name, self, source.docstrings.get(name, ""))
+
+    @property
+    def source(self) -> List[str]:
+        return self._source.lines if self._source else []
+
+    @property
+    def is_namespace(self) -> bool:
+        return self._is_namespace
+
+
+class Class(pdocs_doc.Class):
+    """The documentation of a class, gathered from its definition (and those of its ancestors)."""
+
+    def __init__(self, name: str, module: Module, source: "_Source", node: ast.ClassDef):
+        self._source = source
+        self._node = node
+        self._linearization = _linearization(_ClassRef(_refname(source, node), source, node))
+        pdocs_doc.Doc.__init__(self, name, module, _class_docstring(self._linearization))
+        self.cls = None
+        self.doc: Dict[str, pdocs_doc.Doc] = {}
+        self.doc_init: Dict[str, pdocs_doc.Doc] = {}
+
+        for member_name, member in _class_members(self._linearization).items():
+            if member.kind in ("property", "slot"):
+                self.doc_init[member_name] = pdocs_doc.Variable(
+                    member_name, module, member.docstring, cls=self
+                )
+            elif member.value is not None:
+                self.doc[member_name] = pdocs_doc.Function(
+                    member_name, module, member.value, cls=self, method=member.kind == "method"
+                )
+            elif member.source is None or not isinstance(
+                member.node, (ast.FunctionDef, ast.AsyncFunctionDef)
+            ):
+                self.doc[member_name] = pdocs_doc.Variable(
+                    member_name, module, member.docstring, cls=self
+                )
+            else:
+                self.doc[member_name] = Function(
+                    member_name,
+                    module,
+                    member.source,
+                    member.node,
+                    cls=self,
+                    method=member.kind == "method",
+                    docstring=member.docstring,
+                )
+
+    @property
+    def source(self) -> List[str]:
+        return _source_lines(self._source, self._node)
+
+    @property
+    def refname(self) -> str:
+        return f"{self.module.refname}.{self.name}"
+
+    def params(self) -> List[str]:
+        params = _init_params(self._linearization)
+        return params[1:] if params and params[0] == "self" else params
+
+    def mro(self) -> List[pdocs_doc.External]:
+        return [pdocs_doc.External(ancestor.refname) for ancestor in self._linearization[1:]]
+
+    def subclasses(self) -> List[pdocs_doc.External]:
+        refname = self._linearization[0].refname
+        return [
+            pdocs_doc.External(_refname(self._source, node))
+            for node in self._source.definitions.values()
+            if isinstance(node, ast.ClassDef)
+            and any(
+                base is not None and base.refname == refname
+                for base in (_base_ref(self._source, expression) for expression in node.bases)
+            )
+        ]
+
+
+class Function(pdocs_doc.Function):
+    """The documentation of a function or method, gathered from its definition."""
+
+    def __init__(
+        self,
+        name: str,
+        module: Module,
+        source: "_Source",
+        node: Union[ast.FunctionDef, ast.AsyncFunctionDef],
+        cls: Optional[Class] = None,
+        method: bool = False,
+        docstring: Optional[str] = None,
+    ):
+        if docstring is None:
+            docstring = ast.get_docstring(node) or ""
+        pdocs_doc.Doc.__init__(self, name, module, docstring)
+        self.func = None
+        self.cls = cls
+        self.method = method
+        self._source = source
+        self._node = node
+
+    @property
+    def source(self) -> List[str]:
+        return _source_lines(self._source, self._node)
+
+    def _is_async(self) -> bool:
+        return isinstance(self._node, ast.AsyncFunctionDef)
+
+    def return_annotation(self) -> str:
+        return _annotation(self._source, self._node.returns) if self._node.returns else ""
+
+    def params(self) -> List[str]:
+        bound = self.cls is not None and "classmethod" in _decorators(self._node)
+        return _params(self._source, self._node.args, bound)
+
+
+class _Source:
+    """A parsed module: its syntax tree along with the names it binds at the top level."""
+
+    def __init__(self, name: str, path: str, is_package: bool, root_path: Optional[tuple]):
+        self.name = name
+        self.is_package = is_package
+        self.root_path = root_path
+        with open(path, "rb") as source_file:
+            self.text = importlib.util.decode_source(source_file.read())
+        self.lines = io.StringIO(self.text).readlines()
+        self.tree = ast.parse(self.text, path)
+        self.definitions: Dict[str, ast.AST] = {}
+        self.imports: Dict[str, Tuple[str, str]] = {}  # name: (module, attribute)
+        self.docstrings = _variable_docstrings(self.tree)
+        self.all: Optional[List[str]] = None
+        self.docstring = ast.get_docstring(self.tree, clean=False) or ""
+
+        self._bind(self.tree.body)
+
+    def _bind(self, body: List[ast.stmt], fallback: bool = False) -> None:
+        """Records the names bound by the statements of body, where fallbacks (the `else` of
+        conditions and handlers of exceptions) only bind names that aren't bound already.
+        """
+        for statement in body:
+            if isinstance(statement, ast.If):
+                self._bind(statement.body, fallback)
+                self._bind(statement.orelse, True)
+                continue
+            if isinstance(statement, ast.Try):
+                self._bind(statement.body, fallback)
+                for handler in statement.handlers:
+                    self._bind(handler.body, True)
+                self._bind(statement.orelse, fallback)
+                self._bind(statement.finalbody, fallback)
+                continue
+
+            if isinstance(statement, (ast.Import, ast.ImportFrom)):
+                module = (
+                    self._absolute(statement.module, statement.level)
+                    if isinstance(statement, ast.ImportFrom)
+                    else ""
+                )
+                bindings: List[Tuple[str, Optional[Tuple[str, str]]]] = []
+                for alias in statement.names:
+                    if alias.name == "*":
+                        continue
+                    if isinstance(statement, ast.ImportFrom):
+                        bindings.append((alias.asname or alias.name, (module, alias.name)))
+                    elif alias.asname:
+                        bindings.append((alias.asname, (alias.name, "")))
+                    else:
+                        bindings.append((alias.name.split(".")[0], (alias.name.split(".")[0], "")))
+            else:
+                bindings = [(bound, None) for bound in _bound_names(statement)]
+
+            for bound, imported in bindings:
+                if fallback and (bound in self.definitions or bound in self.imports):
+                    continue
+                if imported:
+                    self.imports[bound] = imported
+                    self.definitions.pop(bound, None)
+                    continue
+                if bound == "__all__":
+                    self.all = _literal_names(statement, self.all)
+                elif bound == "__doc__" and isinstance(statement, ast.Assign):
+                    docstring = _literal(statement.value)
+                    self.docstring = docstring if isinstance(docstring, str) else self.docstring
+                self.definitions[bound] = statement
+                self.imports.pop(bound, None)
+
+    def _absolute(self, module: Optional[str], level: int) -> str:
+        """Returns the absolute name of a module imported from this one."""
+        if not level:
+            return module or ""
+        package = self.name if self.is_package else self.name.rpartition(".")[0]
+        parts = package.split(".")
+        base = ".".join(parts[: len(parts) - (level - 1)])
+        return f"{base}.{module}" if module else base
+
+
+class _ClassRef(NamedTuple):
+    refname: str
+    source: Optional[_Source] = None
+    node: Optional[ast.ClassDef] = None
+    builtin: Optional[type] = None
+
+
+class _Member(NamedTuple):
+    kind: str  # method, function, property, slot or variable
+    docstring: str
+    source: Optional[_Source] = None
+    node: Optional[ast.AST] = None
+    value: Any = None  # the member itself, for members of builtin classes
+
+
+def _documented_modules(
+    name: str, spec: importlib.machinery.ModuleSpec, root_path: Optional[tuple]
+) -> Iterator[Module]:
+    search_locations = list(spec.submodule_search_locations or ())
+    submodules = sorted(
+        submodule.name
+        for submodule in pkgutil.iter_modules(search_locations, prefix=f"{name}.")
+        if pdocs_doc._is_exported(submodule.name.split(".")[-1])
+    )
+    source = None
+    if spec.origin and spec.origin.endswith(tuple(importlib.machinery.SOURCE_SUFFIXES)):
+        source = _parsed_source(spec.origin, name, bool(search_locations), root_path)
+    yield Module(name, source, submodules, spec.origin in (None, "namespace"))
+
+    for submodule in submodules:
+        submodule_spec = importlib.machinery.PathFinder.find_spec(
+            submodule.split(".")[-1], search_locations
+        )
+        if submodule_spec is not None:
+            yield from _documented_modules(submodule, submodule_spec, root_path)
+
+
+def _find_spec(name: str, root_path: Optional[tuple]) -> Optional[importlib.machinery.ModuleSpec]:
+    """Finds the spec of the given module without importing it or any of its parent packages."""
+    search_path = list(root_path) if root_path else None
+    spec = None
+    try:
+        for part in name.split("."):
+            if spec is not None:
+                search_path = list(spec.submodule_search_locations or ())
+                if not search_path:
+                    return None
+            spec = importlib.machinery.PathFinder.find_spec(part, search_path)
+            if spec is None:
+                return None
+    except (ImportError, ValueError):
+        return None
+    return spec
+
+
+def _parsed_source(path: str, name: str, is_package: bool, root_path: Optional[tuple]) -> _Source:
+    stat = os.stat(path)
+    return _cached_source(path, stat.st_mtime_ns, stat.st_size, name, is_package, root_path)
+
+
+@lru_cache(maxsize=SOURCE_CACHE_SIZE)
+def _cached_source(
+    path: str,
+    modified: int,
+    size: int,
+    name: str,
+    is_package: bool,
+    root_path: Optional[tuple],
+) -> _Source:
+    return _Source(name, path, is_package, root_path)
+
+
+def _load(name: str, root_path: Optional[tuple]) -> Optional[_Source]:
+    """Returns the parsed source of the given module, or `None` if it can't be found or parsed."""
+    spec = _find_spec(name, root_path)
+    if (
+        spec is None
+        or not spec.origin
+        or not spec.origin.endswith(tuple(importlib.machinery.SOURCE_SUFFIXES))
+    ):
+        return None
+    try:
+        return _parsed_source(spec.origin, name, bool(spec.submodule_search_locations), root_path)
+    except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+        return None
+
+
+def _resolve(
+    source: _Source, dotted_name: str, depth: int = 0
+) -> Optional[Tuple[_Source, ast.AST]]:
+    """Returns the module and statement defining dotted_name as seen from source (following
+    imports), or `None` if it isn't defined within source that can be found.
+    """
+    if depth > MAX_RESOLUTION_DEPTH:
+        return None
+
+    name, _, rest = dotted_name.partition(".")
+    if name in source.definitions:
+        return None if rest else (source, source.definitions[name])
+    if name not in source.imports:
+        return None
+
+    module, attribute = source.imports[name]
+    if attribute:
+        target = _load(module, source.root_path)
+        if target is not None and (attribute in target.definitions or attribute in target.imports):
+            return _resolve(target, f"{attribute}.{rest}" if rest else attribute, depth + 1)
+        submodule = _load(f"{module}.{attribute}", source.root_path) if rest else None
+        return _resolve(submodule, rest, depth + 1) if submodule else None
+
+    parts = f"{module}.{rest}".split(".") if rest else [module]
+    for split in range(len(parts) - 1, 0, -1):
+        target = _load(".".join(parts[:split]), source.root_path)
+        if target is not None:
+            return _resolve(target, ".".join(parts[split:]), depth + 1)
+    return None
+
+
+def _qualified_name(source: _Source, dotted_name: str) -> str:
+    """Returns the fully qualified form of dotted_name as seen from source."""
+    name, _, rest = dotted_name.partition(".")
+    if name in source.imports:
+        module, attribute = source.imports[name]
+        qualified = f"{module}.{attribute}" if attribute else module
+    elif name in source.definitions:
+        qualified = f"{source.name}.{name}"
+    else:
+        qualified = name
+    return f"{qualified}.{rest}" if rest else qualified
+
+
+def _refname(source: _Source, node: ast.ClassDef) -> str:
+    return f"{source.name}.{node.name}"
+
+
+def _base_ref(source: _Source, expression: ast.expr) -> Optional[_ClassRef]:
+    """Returns a reference to the base class given by expression, or `None` for `object`."""
+    if isinstance(expression, ast.Subscript):  # such as Generic[T]
+        expression = expression.value
+    dotted_name = _dotted_name(expression)
+    if dotted_name is None:
+        return _ClassRef(_segment(source, expression))
+    if dotted_name == "object":
+        return None
+
+    resolved = _resolve(source, dotted_name)
+    if resolved is not None and isinstance(resolved[1], ast.ClassDef):
+        return _ClassRef(_refname(resolved[0], resolved[1]), resolved[0], resolved[1])
+
+    builtin = getattr(builtins, dotted_name, None)
+    if (
+        dotted_name not in source.definitions
+        and dotted_name not in source.imports
+        and isinstance(builtin, type)
+    ):
+        return _builtin_ref(builtin)
+    return _ClassRef(_qualified_name(source, dotted_name))
+
+
+def _builtin_ref(builtin: type) -> _ClassRef:
+    return _ClassRef(f"{builtin.__module__}.{builtin.__name__}", builtin=builtin)
+
+
+def _linearization(class_ref: _ClassRef, _seen: frozenset = frozenset()) -> List[_ClassRef]:
+    """Returns the method resolution order of the referenced class (without `object`)."""
+    if class_ref.builtin is not None:
+        return [_builtin_ref(base) for base in class_ref.builtin.__mro__ if base is not object]
+    if class_ref.node is None or class_ref.source is None or class_ref.refname in _seen:
+        return [class_ref]
+
+    bases = [
+        base
+        for base in (_base_ref(class_ref.source, expression) for expression in class_ref.node.bases)
+        if base is not None
+    ]
+    sequences = [_linearization(base, _seen | {class_ref.refname}) for base in bases] + [bases]
+    linearization = [class_ref]
+    sequences = [sequence for sequence in sequences if sequence]
+    while sequences:
+        tails = {ref.refname for sequence in sequences for ref in sequence[1:]}
+        head = next(
+            (sequence[0] for sequence in sequences if sequence[0].refname not in tails),
+            sequences[0][0],  # an inconsistent hierarchy falls back to depth first order
+        )
+        linearization.append(head)
+        sequences = [
+            [ref for ref in sequence if ref.refname != head.refname] for sequence in sequences
+        ]
+        sequences = [sequence for sequence in sequences if sequence]
+    return linearization
+
+
+def _class_docstring(linearization: List[_ClassRef]) -> str:
+    """Returns the docstring of the first class of linearization to have one."""
+    for class_ref in linearization:
+        if class_ref.builtin is not None:
+            return class_ref.builtin.__doc__ or ""
+        if class_ref.node is not None:
+            docstring = ast.get_docstring(class_ref.node)
+            if docstring:
+                return docstring
+    return ""
+
+
+def _class_members(linearization: List[_ClassRef]) -> Dict[str, _Member]:
+    """Returns the public members of the first class of linearization, including those it
+    inherits from classes whose source can be found.
+    """
+    members: Dict[str, _Member] = {}
+    for class_ref in reversed(linearization):
+        if class_ref.builtin is not None:
+            members.update(_builtin_members(class_ref.builtin))
+            continue
+        if class_ref.node is None or class_ref.source is None:
+            continue
+        own = class_ref is linearization[0]
+        docstrings = _variable_docstrings(class_ref.node) if own else {}
+        slots: List[str] = []
+        for statement in _statements(class_ref.node.body):
+            if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                name = statement.name
+                decorators = _decorators(statement)
+                if not pdocs_doc._is_exported(name) or any(
+                    decorator.endswith((".setter", ".deleter")) for decorator in decorators
+                ):
+                    continue
+                docstring = ast.get_docstring(statement) or ""
+                if {"property", "abc.abstractproperty", "abstractproperty"} & decorators:
+                    kind = "property"
+                elif any(decorator.endswith("cached_property") for decorator in decorators):
+                    kind, docstring = "variable", ""
+                else:
+                    kind = "function" if {"staticmethod", "classmethod"} & decorators else "method"
+                    if not docstring and name in members:  # inherited, as `inspect.getdoc` does
+                        docstring = members[name].docstring
+                members[name] = _Member(kind, docstring, class_ref.source, statement)
+                continue
+
+            for name in _bound_names(statement):
+                if name == "__slots__":
+                    slots = _literal_names(statement, slots) or []
+                elif pdocs_doc._is_exported(name):
+                    members[name] = _Member("variable", docstrings.get(name, ""))
+        for slot in slots:
+            if pdocs_doc._is_exported(slot):
+                members[slot] = _Member("slot", "")
+    return members
+
+
+def _builtin_members(builtin: type) -> Dict[str, _Member]:
+    """Returns the public members of a builtin class, as pdocs finds them."""
+    members = {}
+    for name, value in inspect.getmembers(builtin):
+        if not pdocs_doc._is_exported(name):
+            continue
+        if inspect.isroutine(value):
+            kind = "method" if pdocs_doc._is_method(builtin, name) else "function"
+            members[name] = _Member(kind, inspect.getdoc(value) or "", value=value)
+        elif isinstance(value, property):
+            members[name] = _Member("property", value.__doc__ or "")
+        else:
+            members[name] = _Member("variable", "")
+    return members
+
+
+def _init_params(linearization: List[_ClassRef]) -> List[str]:
+    """Returns the parameters of the `__init__` method the first class of linearization uses."""
+    for class_ref in linearization:
+        if class_ref.builtin is not None:
+            return pdocs_doc.Function._params(class_ref.builtin.__init__)  # type: ignore
+        if class_ref.node is None or class_ref.source is None:
+            return ["..."]
+
+        for statement in _statements(class_ref.node.body):
+            if (
+                isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and statement.name == "__init__"
+            ):
+                return _params(class_ref.source, statement.args)
+        if any(decorator.endswith("dataclass") for decorator in _decorators(class_ref.node)):
+            return ["self"] + _dataclass_params(linearization)
+    return pdocs_doc.Function._params(object.__init__)
+
+
+def _dataclass_params(linearization: List[_ClassRef]) -> List[str]:
+    fields: Dict[str, str] = {}
+    for class_ref in reversed(linearization):
+        if class_ref.node is None or class_ref.source is None:
+            continue
+        for statement in class_ref.node.body:
+            if not isinstance(statement, ast.AnnAssign) or not isinstance(
+                statement.target, ast.Name
+            ):
+                continue
+            annotation = _annotation(class_ref.source, statement.annotation)
+            if annotation.startswith("ClassVar"):
+                continue
+            default = statement.value
+            if isinstance(default, ast.Call) and _dotted_name(default.func) in (
+                "field",
+                "dataclasses.field",
+            ):
+                keywords = {keyword.arg: keyword.value for keyword in default.keywords}
+                if "default_factory" in keywords:
+                    fields[statement.target.id] = f"{statement.target.id}: {annotation} = <factory>"
+                    continue
+                default = keywords.get("default")
+            fields[statement.target.id] = (
+                f"{statement.target.id}: {annotation} = {_default(class_ref.source, default)}"
+                if default is not None
+                else f"{statement.target.id}: {annotation}"
+            )
+    return list(fields.values())
+
+
+def _params(source: _Source, arguments: ast.arguments, bound: bool = False) -> List[str]:
+    """Returns the formatted parameters of a function as `pdocs.doc.Function.params` does,
+    leaving out the first positional one if the function is bound (as class methods are).
+    """
+    positional = [*arguments.posonlyargs, *arguments.args]
+    defaults: List[Optional[ast.expr]] = [None] * (len(positional) - len(arguments.defaults))
+    defaults.extend(arguments.defaults)
+    parameters: List[Tuple[str, str]] = []
+    for position, argument in enumerate(positional):
+        if bound and position == 0:
+            continue
+        kind = "positional_only" if position < len(arguments.posonlyargs) else "positional"
+        parameters.append((kind, _param(source, argument, defaults[position])))
+    if arguments.vararg:
+        parameters.append(("var_positional", "*" + _param(source, arguments.vararg)))
+    for position, argument in enumerate(arguments.kwonlyargs):
+        parameters.append(
+            ("keyword_only", _param(source, argument, arguments.kw_defaults[position]))
+        )
+    if arguments.kwarg:
+        parameters.append(("var_keyword", "**" + _param(source, arguments.kwarg)))
+
+    params = []
+    render_pos_only_separator = False
+    render_kw_only_separator = True
+    for kind, param in parameters:
+        if kind == "positional_only":
+            render_pos_only_separator = True
+        elif render_pos_only_separator:
+            params.append("/")
+            render_pos_only_separator = False
+
+        if kind == "var_positional":
+            render_kw_only_separator = False
+        elif kind == "keyword_only" and render_kw_only_separator:
+            params.append("*")
+            render_kw_only_separator = False
+        params.append(param)
+
+    if render_pos_only_separator:
+        params.append("/")
+    return params
+
+
+def _param(source: _Source, argument: ast.arg, default: Optional[ast.expr] = None) -> str:
+    param = argument.arg
+    if argument.annotation is not None:
+        param = f"{param}: {_annotation(source, argument.annotation)}"
+    if default is not None:
+        param += f"{' = ' if argument.annotation is not None else '='}{_default(source, default)}"
+    return param
+
+
+def _default(source: _Source, expression: ast.expr) -> str:
+    """Returns the representation of a default value: its `repr` if it is a literal,
+    otherwise its source.
+    """
+    try:
+        return repr(ast.literal_eval(expression))
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return _segment(source, expression)
+
+
+def _annotation(source: _Source, expression: ast.expr, nested: bool = False) -> str:
+    """Returns an annotation formatted as `inspect.formatannotation` formats it once evaluated:
+    classes by their qualified name (except those of `typing`) and strings quoted.
+    """
+    if isinstance(expression, ast.Constant):
+        if expression.value is Ellipsis:
+            return "..."
+        if isinstance(expression.value, str) and nested:
+            return f"ForwardRef({expression.value!r})"
+        if expression.value is None and nested:
+            return "NoneType"
+        return repr(expression.value)
+    if isinstance(expression, (ast.Name, ast.Attribute)):
+        dotted_name = _dotted_name(expression)
+        if dotted_name is None:
+            return _segment(source, expression)
+        resolved = _resolve(source, dotted_name)
+        if resolved is None:
+            qualified_name = _qualified_name(source, dotted_name)
+        elif isinstance(resolved[1], ast.ClassDef):
+            qualified_name = _refname(resolved[0], resolved[1])
+        else:
+            qualified_name = dotted_name
+        if qualified_name.startswith("typing."):
+            qualified_name = qualified_name[len("typing.") :]
+        return qualified_name
+    if isinstance(expression, ast.Subscript):
+        subscript = expression.slice
+        if isinstance(subscript, ast.Index):  # pragma: no cover (Python 3.8)
+            subscript = subscript.value  # type: ignore
+        elements = subscript.elts if isinstance(subscript, ast.Tuple) else [subscript]
+        arguments = ", ".join(_annotation(source, element, True) for element in elements)
+        return f"{_annotation(source, expression.value, True)}[{arguments}]"
+    if isinstance(expression, ast.List):
+        return f"[{', '.join(_annotation(source, element, True) for element in expression.elts)}]"
+    return _segment(source, expression)
+
+
+def _segment(source: _Source, node: ast.AST) -> str:
+    """Returns the source of node (with line breaks collapsed), as `ast.get_source_segment`
+    does without splitting the whole module into lines again.
+    """
+    lines = [
+        line.encode("utf-8")
+        for line in source.lines[node.lineno - 1 : node.end_lineno]  # type: ignore
+    ]
+    if not lines:
+        return ""
+    if len(lines) == 1:
+        segment = lines[0][node.col_offset : node.end_col_offset]  # type: ignore
+    else:
+        segment = b"".join(
+            [lines[0][node.col_offset :], *lines[1:-1], lines[-1][: node.end_col_offset]]  # type: ignore
+        )
+    return LINE_BREAK.sub(" ", segment.decode("utf-8"))
+
+
+def _source_lines(source: _Source, node: ast.stmt) -> List[str]:
+    first_line = min(
+        [node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", ())]
+    )
+    return source.lines[first_line - 1 : node.end_lineno]
+
+
+def _statements(body: List[ast.stmt]) -> Iterator[ast.stmt]:
+    """Yields the statements of body, including those within conditional and `try` blocks."""
+    for statement in body:
+        if isinstance(statement, ast.If):
+            yield from _statements(statement.body)
+            yield from _statements(statement.orelse)
+        elif isinstance(statement, ast.Try):
+            yield from _statements(statement.body)
+            for handler in statement.handlers:
+                yield from _statements(handler.body)
+            yield from _statements(statement.orelse)
+            yield from _statements(statement.finalbody)
+        else:
+            yield statement
+
+
+def _bound_names(statement: ast.stmt) -> List[str]:
+    """Returns the names statement binds (ignoring imports)."""
+    if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return [statement.name]
+    if isinstance(statement, ast.Assign):
+        return [name for target in statement.targets for name in _target_names(target)]
+    if isinstance(statement, (ast.AnnAssign, ast.AugAssign)) and isinstance(
+        statement.target, ast.Name
+    ):
+        if isinstance(statement, ast.AnnAssign) and statement.value is None:
+            return []
+        return [statement.target.id]
+    return []
+
+
+def _target_names(target: ast.expr) -> List[str]:
+    if isinstance(target, ast.Name):
+        return [target.id]
+    if isinstance(target, (ast.Tuple, ast.List)):
+        return [name for element in target.elts for name in _target_names(element)]
+    if isinstance(target, ast.Starred):
+        return _target_names(target.value)
+    return []
+
+
+def _literal_names(statement: ast.stmt, names: Optional[List[str]]) -> Optional[List[str]]:
+    """Returns the names given by an assignment (or augmented assignment) of a literal
+    sequence of strings (such as `__all__`), or names unchanged if it can't be evaluated.
+    """
+    value = _literal(getattr(statement, "value", None))
+    if not isinstance(value, (list, tuple)) or not all(isinstance(name, str) for name in value):
+        return names
+    if isinstance(statement, ast.AugAssign):
+        return [*(names or ()), *value]
+    return list(value)
+
+
+def _literal(expression: Optional[ast.expr]) -> Any:
+    """Returns the value of a literal expression, or `None` if it isn't one."""
+    try:
+        return ast.literal_eval(expression)  # type: ignore
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def _variable_docstrings(node: ast.AST) -> Dict[str, str]:
+    """Returns the docstrings given to variables by a string directly following their
+    assignment, as `pdocs` finds them.
+    """
+    docstrings = {}
+    children = list(ast.iter_child_nodes(node))
+    for position, child in enumerate(children[:-1]):
+        following = children[position + 1]
+        if (
+            isinstance(child, ast.Assign)
+            and len(child.targets) == 1
+            and isinstance(child.targets[0], ast.Name)
+            and isinstance(following, ast.Expr)
+            and isinstance(following.value, ast.Constant)
+            and isinstance(following.value.value, str)
+        ):
+            docstrings[child.targets[0].id] = following.value.value
+    return docstrings
+
+
+def _decorators(node: ast.AST) -> set:
+    return {
+        _dotted_name(decorator.func if isinstance(decorator, ast.Call) else decorator) or ""
+        for decorator in getattr(node, "decorator_list", ())
+    }
+
+
+def _dotted_name(expression: ast.expr) -> Optional[str]:
+    if isinstance(expression, ast.Name):
+        return expression.id
+    if isinstance(expression, ast.Attribute):
+        value = _dotted_name(expression.value)
+        return f"{value}.{expression.attr}" if value else None
+    return None
@@ -1,22 +1,30 @@
 """Defines how to render the current project and project_config using the
 included documentation generation utilities.
 """
+import copy
+import ctypes
+import fnmatch
+import html
+import importlib.machinery
+import json
 import os
+import pkgutil
 import shutil
 import sys
 import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
 from glob import glob
-from typing import Dict, Iterator, Tuple
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
 
-import mkdocs.config as mkdocs_config
-import mkdocs.exceptions as _mkdocs_exceptions
-from mkdocs.commands.build import build as mkdocs_build
-from mkdocs.config.defaults import get_schema as mkdocs_schema
-from mkdocs.utils import is_markdown_file
-from pdocs import as_markdown as pdocs_as_markdown
-from portray.exceptions import DocumentationAlreadyExists
-from yaspin import yaspin
+from portray import cache, compression, profiling, staging
+from portray.exceptions import DocumentationAlreadyExists, NoPreviousDocumentation
+
+# MkDocs, pdocs and yaspin are imported by the functions that use them, keeping them out of
+# the startup time of every `portray` command that doesn't render documentation.
 
 NO_HOME_PAGE = """
 # Nothing here
@@ -25,6 +33,40 @@ NO_HOME_PAGE = """
 It appears you do not yet have a README.md file created.
 """
 
+LEFT_OUT_PAGE = """
+# {title}
+
+This page is left out of this preview build, which only renders the pages and modules matching
+`{patterns}`.
+"""
+
+INDEX_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; max-width: 50rem; margin: 2rem auto; padding: 0 1rem; }}
+h1 {{ color: #4caf50; }}
+li {{ margin: 0.75rem 0; }}
+a {{ color: #2e7d32; font-weight: bold; text-decoration: none; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<ul>
+{sites}
+</ul>
+</body>
+</html>
+"""
+
+MKDOCS_CONFIG_CACHE_SIZE = 8
+
+_rendered_module_fingerprints: Dict[str, str] = {}
+_validated_mkdocs_configs: Dict[str, tuple] = {}
+
 
 def documentation(config: dict, overwrite: bool = False) -> None:
     """Renders the entire project given the project config into the config's
@@ -36,82 +78,481 @@ def documentation(config: dict, overwrite: bool = False) -> None:
     - pdoc is ran over your code with the output sent into the temporary directory
         as Markdown documents
     - MkDocs is ran over all of your projects Markdown documents including those
-        generated py pdoc. MkDocs outputs an HTML representation to a new temporary
-        directory.
-    - The html temporary directory is copied into your specified output location
-    - Both temporary directories are deleted.
+        generated py pdoc. MkDocs outputs an HTML representation into a new directory
+        alongside your specified output location.
+    - If `precompress` is enabled, a compressed sibling of every text asset is written
+        (see `portray.compression`).
+    - That directory is atomically swapped into your specified output location, and the
+        previous documentation is deleted (or kept as `OUTPUT_DIR.previous` if
+        `keep_previous_output` is enabled, see `rollback`).
+    - The temporary directory is deleted.
+
+    If `incremental` is enabled the persistent build cache (`cache_dir`) is used in place of
+    the temporary directory, so that only the parts of the website whose inputs changed are
+    regenerated, and the new output directory is assembled from hard links into the cache
+    (or, when the cache is on another filesystem, from copies of the files that changed and hard
+    links to the unchanged files of the current output directory).
+    """
+    from portray import reference, search
+
+    output_dir = os.path.abspath(config["output_dir"])
+    if os.path.lexists(output_dir) and not overwrite:
+        raise DocumentationAlreadyExists(config["output_dir"])
+    compression.validate(config["precompress"])
+    search.validate(config["search_index"])
+    reference.validate(config["reference_backend"])
+
+    if config["incremental"]:
+        with documentation_in_cache_folder(config) as (_, documentation_output):
+            _precompress(config, documentation_output, output_dir)
+            generation = _new_generation(output_dir)
+            try:
+                if _same_filesystem(documentation_output, generation):
+                    staging.place_tree(documentation_output, generation, "hardlink")
+                else:
+                    _place_copied_generation(config, documentation_output, generation, output_dir)
+            except BaseException:
+                shutil.rmtree(generation, ignore_errors=True)
+                raise
+    else:
+        generation = _new_generation(output_dir)
+        try:
+            with documentation_in_temp_folder(config, output_dir=generation):
+                pass
+            _precompress(config, generation, output_dir)
+        except BaseException:
+            shutil.rmtree(generation, ignore_errors=True)
+            raise
+
+    with profiling.phase("swap into place"):
+        _swap_into_place(generation, output_dir, config["keep_previous_output"])
+
+
+def rollback(config: dict) -> None:
+    """Restores the documentation generation kept from before the last build
+    (see `keep_previous_output`) into the config's specified output directory, atomically
+    swapping it with the current documentation, which in turn becomes the kept generation.
+    """
+    output_dir = os.path.abspath(config["output_dir"])
+    previous = f"{output_dir}.previous"
+    if not os.path.lexists(previous):
+        raise NoPreviousDocumentation(config["output_dir"])
+
+    if not os.path.lexists(output_dir):
+        os.rename(previous, output_dir)
+    elif not _exchange(previous, output_dir):
+        retired = f"{previous}.retired"
+        os.rename(output_dir, retired)
+        os.rename(previous, output_dir)
+        os.rename(retired, previous)
+
+
+def index(output_dir: str, sites: List[dict], title: str = "Documentation") -> None:
+    """Writes an `index.html` page into output_dir linking to each of the given sites: dicts
+    giving the `path` of the site relative to output_dir, its `name` and its `description`.
     """
-    if os.path.exists(config["output_dir"]):
-        if overwrite:
-            shutil.rmtree(config["output_dir"])
-        else:
-            raise DocumentationAlreadyExists(config["output_dir"])
+    links = "\n".join(
+        f'<li><a href="{html.escape(site["path"])}/">{html.escape(site["name"])}</a>'
+        + (f"<br>{html.escape(site['description'])}" if site.get("description") else "")
+        + "</li>"
+        for site in sites
+    )
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "index.html"), "w", encoding="utf-8") as index_file:
+        index_file.write(INDEX_PAGE.format(title=html.escape(title), sites=links))
 
-    with documentation_in_temp_folder(config) as (_, documentation_output):
-        shutil.copytree(documentation_output, config["output_dir"])
 
+@contextmanager
+def isolated_imports(directory: str) -> Iterator[None]:
+    """Restores `sys.path` on exit and removes every module imported from within directory
+    from the import cache, so that documenting a project leaves nothing behind for the next
+    project documented by the same process.
+    """
+    python_path = list(sys.path)
+    try:
+        yield
+    finally:
+        sys.path[:] = python_path
+        directory = os.path.join(os.path.realpath(directory), "")
+        for name, module in list(sys.modules.items()):
+            module_file = getattr(module, "__file__", None)
+            if module_file and os.path.realpath(module_file).startswith(directory):
+                del sys.modules[name]
 
-def pdocs(config: dict) -> None:
+
+def pdocs(
+    config: dict,
+    workers: int = 1,
+    streaming: bool = False,
+    memory_limit: int = 0,
+    backend: str = "pdocs",
+    tasks: Optional[List[Tuple[str, bool]]] = None,
+) -> None:
     """Render this project using the specified pdoc config passed into pdoc.
 
     This rendering is from code definition to Markdown so that
     it will be compatible with MkDocs.
+
+    If more than one worker is requested, rendering is split across a pool of that many
+    processes: one task for every module and, for packages, one for each of their direct
+    subpackages and submodules. Passing `0` uses one worker per available CPU.
+
+    If streaming, packages are instead rendered one submodule at a time (ignoring workers),
+    writing each page as soon as it is generated and releasing the submodules it imported
+    before moving on, so the whole module tree is never held in memory at once. A memory_limit
+    (in MB) renders within a worker process that is replaced whenever its memory use grows by
+    more than the limit.
+
+    The `static` backend (see `portray.reference`) parses the source of every module instead of
+    importing it, rendering modules one at a time within this process.
+
+    When profiling (see `portray.profiling`), each module is rendered (and measured) separately.
+
+    If tasks are given, only those `(module, recursive)` pages of the configured modules are
+    rendered (see `_streamed_pdocs_tasks`), each page on its own unless recursive.
     """
-    pdocs_as_markdown(**config)
+    from pdocs import as_markdown as pdocs_as_markdown
+
+    if backend == "static":
+        from portray import reference
+
+        for module, recursive in tasks or [(module, True) for module in config["modules"]]:
+            with profiling.phase(f"static reference {module}"):
+                reference.as_markdown(**{**config, "modules": [module]}, recursive=recursive)
+        return
+
+    if streaming:
+        _streamed_pdocs(config, memory_limit, tasks)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    if tasks is None:
+        tasks = (
+            [task for module in config["modules"] for task in _pdocs_tasks(module)]
+            if workers > 1
+            else []
+        )
+        if len(tasks) <= 1:
+            if not profiling.enabled():
+                pdocs_as_markdown(**config)
+                return
+
+            for module in config["modules"]:
+                with profiling.phase(f"pdocs {module}"), profiling.imports_measured():
+                    pdocs_as_markdown(**{**config, "modules": [module]})
+            return
 
+    if workers == 1 or len(tasks) == 1:
+        for module, recursive in tasks:
+            with profiling.phase(f"pdocs {module}"), profiling.imports_measured():
+                _render_pdocs_task(config, module, recursive)
+        return
 
-def mkdocs(config: dict):
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(tasks)), initializer=_pdocs_worker, initargs=(sys.path,)
+    ) as pool:
+        for task_phases in pool.map(
+            _pdocs_task, ((config, *task, profiling.enabled()) for task in tasks)
+        ):
+            profiling.adopt(task_phases)
+
+
+def mkdocs(config: dict, dirty: bool = False, search_index: str = "mkdocs"):
     """Render the project's associated Markdown documentation using the specified
     MkDocs config passed into the MkDocs `build` command.
 
     This rendering is from `.md` Markdown documents into HTML
+
+    If `dirty` is set, only pages whose Markdown is newer than their HTML are rendered again.
+    The search index entries of every other page are carried over from the previous build.
+
+    `search_index` selects the search index written for the website (see `portray.search`).
     """
-    config_instance = _mkdocs_config(config)
-    return mkdocs_build(config_instance)
+    from mkdocs.commands.build import build as mkdocs_build
+    from portray import search
+
+    config_instance = _mkdocs_config(config, search_index)
+    sitemap_path = os.path.join(config_instance["site_dir"], "sitemap.xml.gz")
+    if not dirty:
+        with profiling.phase("mkdocs build"):
+            result = mkdocs_build(config_instance)
+        compression.clear_timestamp(sitemap_path)
+        return result
+
+    search_index_path = os.path.join(config_instance["site_dir"], "search", "search_index.json")
+    previous_search_index = _read_search_index(search_index_path)
+    with profiling.phase("mkdocs build", dirty=True), search.unrendered_pages_kept(config_instance):
+        result = mkdocs_build(config_instance, dirty=True)
+    compression.clear_timestamp(sitemap_path)
+    if previous_search_index:
+        _merge_search_index(search_index_path, previous_search_index)
+    return result
 
 
 @contextmanager
-def documentation_in_temp_folder(config: dict) -> Iterator[Tuple[str, str]]:
-    """Build documentation within a temp folder, returning that folder name before it is deleted."""
-    if config["append_directory_to_python_path"] and config["directory"] not in sys.path:
-        sys.path.append(config["directory"])
+def documentation_in_temp_folder(config: dict, output_dir: str = "") -> Iterator[Tuple[str, str]]:
+    """Build documentation within a temp folder, returning that folder name before it is deleted.
+
+    If an output_dir is given the website is rendered directly into it (and left in place),
+    rather than into a temporary folder.
+    """
+    _append_directory_to_python_path(config)
 
     with tempfile.TemporaryDirectory() as input_dir:
         input_dir = os.path.join(input_dir, "input")
         os.mkdir(input_dir)
+        if output_dir:
+            _build(config, input_dir, output_dir)
+            yield input_dir, output_dir
+            return
+
         with tempfile.TemporaryDirectory() as temp_output_dir:
+            _build(config, input_dir, temp_output_dir)
+            yield input_dir, temp_output_dir
 
-            with yaspin(
-                text="Copying source documentation to temporary compilation directory"
-            ) as spinner:
-                for root_file in os.listdir(config["directory"]):
-                    root_file_absolute = os.path.join(config["directory"], root_file)
-                    if os.path.isfile(root_file_absolute) and is_markdown_file(root_file_absolute):
-                        shutil.copyfile(root_file_absolute, os.path.join(input_dir, root_file))
-
-                for source_directory in [config["docs_dir"]] + config["extra_dirs"]:
-                    directory_absolute = os.path.join(config["directory"], source_directory)
-                    if os.path.isdir(directory_absolute):
-                        shutil.copytree(
-                            directory_absolute, os.path.join(input_dir, source_directory)
-                        )
 
-                spinner.ok("Done")
+@contextmanager
+def documentation_in_cache_folder(config: dict) -> Iterator[Tuple[str, str]]:
+    """Build documentation within the projects persistent build cache (`cache_dir`),
+    returning the cached input and output folder names.
+
+    Only the parts of the build whose inputs changed since the last build are redone:
+    unchanged sources are not restaged, reference documentation is only regenerated if the
+    documented modules or pdocs configuration changed, and MkDocs is skipped entirely if
+    nothing that feeds it changed.
+    """
+    _append_directory_to_python_path(config)
+
+    cache_directory = cache.directory(config)
+    input_dir = os.path.join(cache_directory, "input")
+    output_dir = os.path.join(cache_directory, "site")
+    os.makedirs(input_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = cache.load_manifest(cache_directory)
+    _build(config, input_dir, output_dir, manifest)
+    cache.save_manifest(cache_directory, manifest)
+    yield input_dir, output_dir
+
+
+@contextmanager
+def documentation_in_reloadable_folder(
+    config: dict,
+) -> Iterator[Tuple[str, str, Callable[[Optional[dict]], None]]]:
+    """Build documentation within a temp folder, returning that folder name along with a
+    `rebuild` function that brings it back up to date with the project before it is deleted.
+
+    Each rebuild only redoes the work invalidated by what changed since the previous build:
+
+    - only added, changed or removed sources are restaged
+    - reference documentation is only regenerated for modules whose source changed
+    - only pages whose Markdown changed are rendered to HTML again, unless pages were added or
+      removed (changing the nav) or the MkDocs configuration changed
+
+    `rebuild` optionally takes a freshly loaded project config to use from then on,
+    for when the project configuration itself has changed.
+    """
+    with tempfile.TemporaryDirectory() as session_dir:
+        input_dir = os.path.join(session_dir, "input")
+        output_dir = os.path.join(session_dir, "site")
+        os.mkdir(input_dir)
+        os.mkdir(output_dir)
+        manifest = cache.load_manifest(session_dir)
+
+        def session_config(project_config: dict) -> dict:
+            _append_directory_to_python_path(project_config)
+            if not project_config["incremental"]:
+                # reference documentation is still cached per module, but only for this session
+                project_config["cache_dir"] = os.path.join(session_dir, "cache")
+            return project_config
+
+        config = session_config(config)
+        _build(config, input_dir, output_dir, manifest)
+
+        def rebuild(new_config: Optional[dict] = None) -> None:
+            nonlocal config
+            if new_config is not None:
+                config = session_config(new_config)
+            _build(config, input_dir, output_dir, manifest, dirty=True)
+
+        yield input_dir, output_dir, rebuild
 
-            if "docs_dir" not in config["mkdocs"]:
-                config["mkdocs"]["docs_dir"] = input_dir
-            if "site_dir" not in config["mkdocs"]:
-                config["mkdocs"]["site_dir"] = temp_output_dir
+
+def _precompress(config: dict, directory: str, previous_directory: str) -> None:
+    """Writes compressed siblings for the website in directory if `precompress` is enabled
+    (see `portray.compression`), reusing any up to date ones from previous_directory.
+    """
+    encodings = compression.validate(config["precompress"])
+    if not encodings:
+        return
+
+    from yaspin import yaspin
+
+    with yaspin(
+        text=f"Precompressing website using {', '.join(encodings)}"
+    ) as spinner, profiling.phase("precompress"):
+        compression.precompress(directory, encodings, previous_directory)
+        spinner.ok("Done")
+
+
+def _new_generation(output_dir: str) -> str:
+    """Creates an empty directory alongside output_dir (and so on the same filesystem) that a
+    new generation of documentation can be written to before being swapped into place.
+    """
+    parent_dir, output_name = os.path.split(output_dir)
+    os.makedirs(parent_dir, exist_ok=True)
+    generation = tempfile.mkdtemp(prefix=f".{output_name}.", dir=parent_dir)
+
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(generation, 0o777 & ~umask)
+    return generation
+
+
+def _swap_into_place(generation: str, output_dir: str, keep_previous: bool = False) -> None:
+    """Moves a new generation of documentation into output_dir, either deleting whatever was
+    there before or keeping it as `OUTPUT_DIR.previous`.
+
+    Where the platform supports it, the two directories are exchanged atomically. Otherwise,
+    output_dir is renamed away and the generation renamed into its place, so output_dir is only
+    missing for the instant between two renames and never partially written.
+    """
+    if not os.path.lexists(output_dir):
+        os.rename(generation, output_dir)
+        return
+
+    if _exchange(generation, output_dir):
+        retired = generation
+    else:
+        retired = f"{generation}.retired"
+        os.rename(output_dir, retired)
+        os.rename(generation, output_dir)
+
+    if keep_previous:
+        previous = f"{output_dir}.previous"
+        if os.path.lexists(previous):
+            _remove(previous)
+        os.rename(retired, previous)
+    else:
+        _remove(retired)
+
+
+def _place_copied_generation(
+    config: dict, documentation_output: str, generation: str, output_dir: str
+) -> None:
+    """Places the website built into documentation_output (within a build cache on another
+    filesystem than output_dir, which hard links can't span) into generation, only copying the
+    files that changed since the documentation currently in output_dir was built and hard linking
+    every other file from output_dir.
+    """
+    cache_directory = cache.directory(config)
+    manifest = cache.load_manifest(cache_directory)
+    entries = manifest["html"].get(output_dir, {})
+    placed = {}
+    for relative_path in cache.files(documentation_output):
+        source = os.path.join(documentation_output, relative_path)
+        current = os.path.join(output_dir, relative_path)
+        stat = os.stat(source)
+        entry = entries.get(relative_path)
+        unchanged = (
+            entry is not None
+            and os.path.isfile(current)
+            and (
+                (entry["size"], entry["mtime"]) == (stat.st_size, stat.st_mtime_ns)
+                or entry["hash"] == cache.file_hash(source)
+            )
+        )
+        staging.place_file(
+            current if unchanged else source,
+            os.path.join(generation, relative_path),
+            "hardlink" if unchanged else "copy",
+        )
+        placed[relative_path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": entry["hash"] if unchanged and entry else cache.file_hash(source),
+        }
+    manifest["html"][output_dir] = placed
+    cache.save_manifest(cache_directory, manifest)
+
+
+def _exchange(first: str, second: str) -> bool:
+    """Atomically exchanges two paths using `renameat2(RENAME_EXCHANGE)`,
+    returning `False` if that isn't supported by the platform or filesystem.
+    """
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (AttributeError, OSError, TypeError):  # pragma: no cover
+        return False
+
+    at_fdcwd, rename_exchange = -100, 2
+    return (
+        renameat2(at_fdcwd, os.fsencode(first), at_fdcwd, os.fsencode(second), rename_exchange) == 0
+    )
+
+
+def _same_filesystem(path: str, other_path: str) -> bool:
+    return os.stat(path).st_dev == os.stat(os.path.dirname(other_path) or ".").st_dev
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def _append_directory_to_python_path(config: dict) -> None:
+    if config["append_directory_to_python_path"] and config["directory"] not in sys.path:
+        sys.path.append(config["directory"])
+
+
+def _build(
+    config: dict,
+    input_dir: str,
+    output_dir: str,
+    manifest: Optional[dict] = None,
+    dirty: bool = False,
+) -> None:
+    """Stages, generates and renders the documentation website for config from input_dir into
+    output_dir. If a build manifest is given only the work invalidated since the build that
+    produced it is redone, otherwise everything is built from scratch.
+
+    If `dirty` is also set and neither the nav nor the MkDocs configuration changed,
+    only the pages whose Markdown changed are rendered to HTML again.
+    """
+    from yaspin import yaspin
+
+    with profiling.phase("rebuild" if dirty else "build", output_dir=output_dir):
+        generated_nav = "nav" not in config["mkdocs"]
+        with yaspin(
+            text="Staging source documentation in temporary compilation directory"
+        ) as spinner, profiling.phase("stage"):
+            staged = _stage(config, input_dir, manifest)
+            spinner.ok("Done")
+
+        if "docs_dir" not in config["mkdocs"]:
+            config["mkdocs"]["docs_dir"] = input_dir
+        if "site_dir" not in config["mkdocs"]:
+            config["mkdocs"]["site_dir"] = output_dir
+        with profiling.phase("nav"):
             if "nav" not in config["mkdocs"]:
                 nav = config["mkdocs"]["nav"] = []
 
                 root_docs = sorted(glob(os.path.join(input_dir, "*.md")))
+                if manifest is not None:  # files left by previous builds are pruned below
+                    root_docs = [
+                        doc for doc in root_docs if os.path.relpath(doc, input_dir) in staged
+                    ]
                 readme_doc = os.path.join(input_dir, "README.md")
                 if readme_doc in root_docs:
                     root_docs.remove(readme_doc)
-                else:
+                elif manifest is None:
                     with open(readme_doc, "w") as readme_doc_file:
                         readme_doc_file.write(NO_HOME_PAGE)
+                else:
+                    cache.sync_text(NO_HOME_PAGE, readme_doc, manifest["inputs"], "README.md")
+                    staged.add("README.md")
 
                 nav.append({"Home": "README.md"})
 
@@ -133,7 +574,19 @@ def documentation_in_temp_folder(config: dict) -> Iterator[Tuple[str, str]]:
                     if index_page:
 
                         destination_index_page = os.path.join(input_dir, "index.md")
-                        if (
+                        if manifest is not None:
+                            if (
+                                index_page not in ("README.md", "index.md")
+                                and "index.md" not in staged
+                            ):
+                                cache.sync_file(
+                                    os.path.join(input_dir, index_page),
+                                    destination_index_page,
+                                    manifest["inputs"],
+                                    "index.md",
+                                )
+                                staged.add("index.md")
+                        elif (
                             index_page != "README.md"
                             and index_page != "index.md"
                             and not os.path.exists(destination_index_page)
@@ -142,42 +595,721 @@ def documentation_in_temp_folder(config: dict) -> Iterator[Tuple[str, str]]:
                                 os.path.join(input_dir, index_page), destination_index_page
                             )
 
-            if config["include_reference_documentation"] and (
-                config["include_reference_documentation"] not in ("false", "False")
-                or config["include_reference_documentation"]
-            ):
-                with yaspin(text="Auto generating reference documentation using pdocs") as spinner:
-                    if "output_dir" not in config["pdocs"]:
-                        config["pdocs"]["output_dir"] = os.path.join(input_dir, "reference")
-                    pdocs(config["pdocs"])
+        if config["include_reference_documentation"] and (
+            config["include_reference_documentation"] not in ("false", "False")
+            or config["include_reference_documentation"]
+        ):
+            with yaspin(
+                text="Auto generating reference documentation using pdocs"
+            ) as spinner, profiling.phase("reference documentation"):
+                if "output_dir" not in config["pdocs"]:
+                    config["pdocs"]["output_dir"] = os.path.join(input_dir, "reference")
+                reference_config, left_out_pages = _only_reference(config)
+                if manifest is not None:
+                    reference_prefix = os.path.relpath(config["pdocs"]["output_dir"], input_dir)
+                    staged.update(
+                        os.path.join(reference_prefix, reference_file)
+                        for reference_file in _reference_documentation(
+                            reference_config,
+                            manifest,
+                            manifest["markdown"],
+                            reference_prefix,
+                            left_out_pages,
+                        )
+                    )
+                elif config["incremental"]:
+                    cache_directory = cache.directory(config)
+                    reference_manifest = cache.load_manifest(cache_directory)
+                    _reference_documentation(
+                        reference_config, reference_manifest, left_out_pages=left_out_pages
+                    )
+                    cache.save_manifest(cache_directory, reference_manifest)
+                else:
+                    if reference_config["pdocs"].get("modules") or not left_out_pages:
+                        pdocs(
+                            reference_config["pdocs"],
+                            config["workers"],
+                            config["reference_streaming"],
+                            config["reference_memory_limit"],
+                            config["reference_backend"],
+                        )
+                    for left_out_path, title in left_out_pages.items():
+                        _place_left_out_page(
+                            title,
+                            os.path.join(config["pdocs"]["output_dir"], left_out_path),
+                            config,
+                        )
+                with profiling.phase("reference nav"):
                     reference_docs = _nested_docs(config["pdocs"]["output_dir"], input_dir, config)
-                    nav.append({"Reference": reference_docs})  # type: ignore
-                    spinner.ok("Done")
+                nav.append({"Reference": reference_docs})  # type: ignore
+                spinner.ok("Done")
 
-            with yaspin(text="Rendering complete website from Markdown using MkDocs") as spinner:
-                mkdocs(config["mkdocs"])
+        with yaspin(
+            text="Rendering complete website from Markdown using MkDocs"
+        ) as spinner, profiling.phase("mkdocs"):
+            if manifest is None:
+                mkdocs(config["mkdocs"], search_index=config["search_index"])
                 spinner.ok("Done")
+            else:
+                staged.difference_update(cache.prune(input_dir, staged, manifest["inputs"]))
+                site_fingerprint = _site_fingerprint(config, staged, manifest)
+                mkdocs_fingerprint = cache.config_hash(config["mkdocs"])
+                if manifest["fingerprints"].get("site") == site_fingerprint and os.listdir(
+                    output_dir
+                ):
+                    spinner.ok("Unchanged")
+                else:
+                    mkdocs(
+                        config["mkdocs"],
+                        dirty=dirty
+                        and manifest["fingerprints"].get("mkdocs") == mkdocs_fingerprint
+                        and bool(os.listdir(output_dir)),
+                        search_index=config["search_index"],
+                    )
+                    manifest["fingerprints"].update(
+                        site=site_fingerprint, mkdocs=mkdocs_fingerprint
+                    )
+                    spinner.ok("Done")
+
+        # remove any settings pointing to the temp dirs
+        if config["mkdocs"]["docs_dir"].startswith(input_dir):
+            del config["mkdocs"]["docs_dir"]
+        if config["mkdocs"]["site_dir"].startswith(output_dir):
+            del config["mkdocs"]["site_dir"]
+        if config["pdocs"].get("output_dir") and config["pdocs"]["output_dir"].startswith(
+            input_dir
+        ):
+            del config["pdocs"]["output_dir"]
+        if generated_nav:
+            del config["mkdocs"]["nav"]
+        elif config["include_reference_documentation"]:
+            nav.pop()
+
+
+def _read_search_index(search_index_path: str) -> dict:
+    try:
+        with open(search_index_path) as search_index_file:
+            return json.load(search_index_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _merge_search_index(search_index_path: str, previous_search_index: dict) -> None:
+    """Adds the search index entries of every page not rendered by a dirty MkDocs build
+    (which only indexes the pages it renders) back into the search index it wrote.
+    """
+    search_index = _read_search_index(search_index_path)
+    if "docs" not in search_index:
+        return
+
+    rendered = {entry["location"].split("#")[0] for entry in search_index["docs"]}
+    search_index["docs"] = [
+        entry
+        for entry in previous_search_index.get("docs", ())
+        if entry["location"].split("#")[0] not in rendered
+    ] + search_index["docs"]
+    with open(search_index_path, "w") as search_index_file:
+        json.dump(search_index, search_index_file)
+
+
+def _site_fingerprint(config: dict, staged: Set[str], manifest: dict) -> str:
+    """Returns a hash of everything that feeds MkDocs: its configuration (including the nav)
+    together with the content of every staged input file and generated Markdown file.
+    """
+    staged_hashes = []
+    for path in sorted(staged):
+        entry = manifest["inputs"].get(path) or manifest["markdown"].get(path) or {}
+        staged_hashes.append(f"{path}:{entry.get('hash', '')}")
+    return cache.text_hash(cache.config_hash(config["mkdocs"]), *staged_hashes)
+
+
+def _stage(config: dict, input_dir: str, manifest: Optional[dict] = None) -> Set[str]:
+    """Places the projects root Markdown files, `docs_dir` and `extra_dirs` into input_dir.
+
+    Files are placed using the configured `staging` strategy (see `portray.staging`).
+    When a build manifest is given, only files that changed since they were last staged are
+    written, and the relative paths of every staged file are returned.
+
+    If `only` patterns are configured, Markdown pages that match none of them are staged as
+    placeholders (see `LEFT_OUT_PAGE`), so the nav and links to them are kept.
+    """
+    from mkdocs.utils import is_markdown_file
+
+    strategy = staging.validate(config["staging"])
+    staged: Set[str] = set()
+    with profiling.phase("stage root files"):
+        for root_file in os.listdir(config["directory"]):
+            root_file_absolute = os.path.join(config["directory"], root_file)
+            if os.path.isfile(root_file_absolute) and is_markdown_file(root_file_absolute):
+                if _left_out(root_file, config):
+                    _place_left_out_page(
+                        _label(root_file, config),
+                        os.path.join(input_dir, root_file),
+                        config,
+                        None if manifest is None else manifest["inputs"],
+                        root_file,
+                    )
+                    if manifest is not None:
+                        staged.add(root_file)
+                elif manifest is None:
+                    staging.place_file(
+                        root_file_absolute, os.path.join(input_dir, root_file), strategy
+                    )
+                else:
+                    cache.sync_file(
+                        root_file_absolute,
+                        os.path.join(input_dir, root_file),
+                        manifest["inputs"],
+                        root_file,
+                        strategy,
+                    )
+                    staged.add(root_file)
+
+    for source_directory in [config["docs_dir"]] + config["extra_dirs"]:
+        directory_absolute = os.path.join(config["directory"], source_directory)
+        if not os.path.isdir(directory_absolute):
+            continue
+
+        with profiling.phase(f"stage {source_directory}", strategy=strategy):
+            if manifest is None and not config["only"]:
+                staging.place_tree(
+                    directory_absolute, os.path.join(input_dir, source_directory), strategy
+                )
+                continue
+
+            for relative_path in cache.files(directory_absolute):
+                staged_path = os.path.normpath(os.path.join(source_directory, relative_path))
+                source = os.path.join(directory_absolute, relative_path)
+                destination = os.path.join(input_dir, staged_path)
+                if is_markdown_file(source) and _left_out(staged_path, config):
+                    _place_left_out_page(
+                        _label(staged_path, config),
+                        destination,
+                        config,
+                        None if manifest is None else manifest["inputs"],
+                        staged_path,
+                    )
+                elif manifest is None:
+                    staging.place_file(source, destination, strategy)
+                else:
+                    cache.sync_file(source, destination, manifest["inputs"], staged_path, strategy)
+                if manifest is not None:
+                    staged.add(staged_path)
+
+    return staged
+
+
+def _reference_documentation(
+    config: dict,
+    manifest: dict,
+    entries: Optional[dict] = None,
+    prefix: str = "",
+    left_out_pages: Optional[Dict[str, str]] = None,
+) -> Set[str]:
+    """Generates reference documentation into the pdocs `output_dir`, reusing the Markdown
+    cached (within `cache_dir`) for every page whose source files and pdocs configuration are
+    unchanged, and only running pdocs over the rest. Packages are cached as their own page plus
+    the pages of each of their public submodules (see `_streamed_pdocs_tasks`), so a changed
+    submodule only renders its own page again along with the page of each package containing it.
+
+    If manifest entries are given only reference files whose content changed are written and
+    reference files that no longer exist are removed. Returns the path (relative to the pdocs
+    `output_dir`) of every reference file, including the placeholder pages written for any
+    left_out_pages (titles by path, see `_only_reference`).
+    """
+    pdocs_config = config["pdocs"]
+    output_dir = pdocs_config["output_dir"]
+    reference_cache = cache.reference_directory(config)
+    os.makedirs(reference_cache, exist_ok=True)
+
+    pages = {
+        configured: _streamed_pdocs_tasks(configured)
+        for configured in pdocs_config.get("modules", ())
+    }
+    fingerprints = {
+        page: _module_fingerprint(*page, pdocs_config, manifest, config["reference_backend"])
+        for configured_pages in pages.values()
+        for page in configured_pages
+    }
+    stale = [
+        page
+        for page, fingerprint in fingerprints.items()
+        if not fingerprint or not os.path.isdir(os.path.join(reference_cache, fingerprint))
+    ]
+    if stale:
+        _forget_changed_modules(
+            {module: fingerprints[module, recursive] for module, recursive in stale}
+        )
+        with tempfile.TemporaryDirectory(dir=reference_cache) as generated_dir:
+            pdocs(
+                {
+                    **pdocs_config,
+                    "modules": [
+                        configured
+                        for configured, configured_pages in pages.items()
+                        if any(page in stale for page in configured_pages)
+                    ],
+                    "output_dir": generated_dir,
+                },
+                config["workers"],
+                config["reference_streaming"],
+                config["reference_memory_limit"],
+                config["reference_backend"],
+                stale,
+            )
+            for page in stale:
+                module, recursive = page
+                _rendered_module_fingerprints[module] = fingerprints[page]
+                # pages whose sources can't be located are cached for this build only
+                fingerprints[page] = fingerprints[page] or uuid.uuid4().hex
+                module_dir = tempfile.mkdtemp(dir=reference_cache)
+                for generated_path in _page_reference_paths(module, recursive):
+                    generated = os.path.join(generated_dir, generated_path)
+                    if os.path.exists(generated):
+                        os.makedirs(
+                            os.path.dirname(os.path.join(module_dir, generated_path)),
+                            exist_ok=True,
+                        )
+                        shutil.move(generated, os.path.join(module_dir, generated_path))
+                module_cache = os.path.join(reference_cache, fingerprints[page])
+                try:
+                    os.replace(module_dir, module_cache)
+                except OSError:
+                    if not os.path.isdir(module_cache):  # pragma: no cover
+                        raise
+                    # rendered meanwhile by another build sharing `reference_cache_dir`
+                    shutil.rmtree(module_dir)
+
+    reference_files: Set[str] = set()
+    for fingerprint in fingerprints.values():
+        module_cache = os.path.join(reference_cache, fingerprint)
+        for relative_path in cache.files(module_cache):
+            reference_files.add(relative_path)
+            destination = os.path.join(output_dir, relative_path)
+            if entries is None:
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                shutil.copyfile(os.path.join(module_cache, relative_path), destination)
+            else:
+                cache.sync_file(
+                    os.path.join(module_cache, relative_path),
+                    destination,
+                    entries,
+                    os.path.join(prefix, relative_path),
+                )
+    for relative_path, title in (left_out_pages or {}).items():
+        reference_files.add(relative_path)
+        _place_left_out_page(
+            title,
+            os.path.join(output_dir, relative_path),
+            config,
+            entries,
+            os.path.join(prefix, relative_path),
+        )
+    if entries is not None:
+        cache.prune(output_dir, reference_files, entries, prefix)
+
+    if config.get("reference_cache_dir") or config["only"]:
+        # shared with other builds (or kept for the full build following a partial one),
+        # so only marked as used for whoever prunes it
+        for fingerprint in fingerprints.values():
+            os.utime(os.path.join(reference_cache, fingerprint))
+    else:
+        for cached_reference in os.listdir(reference_cache):
+            if cached_reference not in fingerprints.values():
+                shutil.rmtree(os.path.join(reference_cache, cached_reference), ignore_errors=True)
+
+    return reference_files
+
+
+def _only_reference(config: dict) -> Tuple[dict, Dict[str, str]]:
+    """Returns config with the modules reference documentation is generated for restricted to
+    those matching the `only` patterns, or to the matching submodules of packages that don't match
+    themselves, along with the title of the placeholder page left in place of every configured
+    module that doesn't match, by its path relative to the pdocs `output_dir`.
+    """
+    if not config["only"]:
+        return config, {}
+
+    modules: List[str] = []
+    left_out_pages: Dict[str, str] = {}
+    for module in config["pdocs"].get("modules", ()):
+        if _matches(module, config["only"]):
+            modules.append(module)
+            continue
+
+        matching = [
+            submodule for submodule in _submodules(module) if _matches(submodule, config["only"])
+        ]
+        # submodules of matching packages are rendered along with them
+        modules.extend(
+            submodule
+            for submodule in matching
+            if not any(submodule.startswith(f"{package}.") for package in matching)
+        )
+        search_locations, _ = _module_location(module)
+        module_path, module_file = _module_reference_paths(module)
+        left_out_pages[
+            os.path.join(module_path, "index.md") if search_locations else module_file
+        ] = module
+    return {**config, "pdocs": {**config["pdocs"], "modules": modules}}, left_out_pages
+
+
+def _submodules(module: str) -> List[str]:
+    """Returns the names of every public submodule (at any depth) of the given module,
+    without importing it.
+    """
+    submodules = []
+    for submodule, is_package in _public_submodules(module):
+        submodules.append(submodule)
+        if is_package:
+            submodules.extend(_submodules(submodule))
+    return sorted(submodules)
+
+
+def _matches(name: str, patterns: List[str]) -> bool:
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def _left_out(staged_path: str, config: dict) -> bool:
+    """Returns `True` if the page staged at staged_path is left out of a build restricted to
+    the `only` patterns, which are matched against paths using `/` as separator.
+    """
+    return bool(config["only"]) and not _matches(staged_path.replace(os.sep, "/"), config["only"])
+
+
+def _place_left_out_page(
+    title: str, destination: str, config: dict, entries: Optional[dict] = None, key: str = ""
+) -> None:
+    """Places the placeholder page of a page left out of a build restricted to the `only`
+    patterns at destination, replacing (but never writing through) whatever was placed there.
+    If manifest entries are given it is only written if it differs from what was last written.
+    """
+    text = LEFT_OUT_PAGE.format(title=title, patterns=" ".join(config["only"]))
+    entry = entries.get(key) if entries is not None else None
+    if entry and entry["hash"] == cache.text_hash(text) and os.path.isfile(destination):
+        return
+
+    if entries is not None:
+        cache.sync_text(text, destination, entries, key)
+        return
+
+    if os.path.lexists(destination):
+        os.remove(destination)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    with open(destination, "w") as left_out_file:
+        left_out_file.write(text)
+
+
+def _module_fingerprint(
+    module: str, recursive: bool, pdocs_config: dict, manifest: dict, backend: str = "pdocs"
+) -> str:
+    """Returns a hash of the pdocs configuration and reference backend together with the source
+    of the given module (including every submodule, even when only the module's own page is
+    rendered, as it may document objects they define), or an empty string if the source files of
+    the module could not be located. Source files are identified relative to the module's
+    location, so the same module found elsewhere (such as within another checkout of a project)
+    has the same fingerprint.
+    """
+    from pdocs import __version__ as pdocs_version
+
+    sources = _module_sources(module)
+    if not sources:
+        return ""
+
+    root = os.path.dirname(os.path.commonpath(sources))
+    return cache.text_hash(
+        module,
+        str(recursive),
+        backend,
+        pdocs_version,
+        cache.config_hash({**pdocs_config, "modules": None, "output_dir": None}),
+        *(
+            f"{os.path.relpath(source, root)}:{cache.cached_file_hash(source, manifest['sources'])}"
+            for source in sources
+        ),
+    )
+
+
+def _module_reference_paths(module: str) -> Tuple[str, str]:
+    """Returns the paths (relative to the pdocs `output_dir`) that pdocs may render the given
+    module to: a directory for packages or a single Markdown file for plain modules.
+    """
+    from pdocs.extract import split_module_spec as pdocs_split_module_spec
+
+    module_path = os.path.join(*pdocs_split_module_spec(module)[1].split("."))
+    return module_path, f"{module_path}.md"
+
+
+def _page_reference_paths(module: str, recursive: bool) -> Tuple[str, ...]:
+    """Returns the paths (relative to the pdocs `output_dir`) that pdocs may render the given
+    `(module, recursive)` task to (see `_streamed_pdocs_tasks`).
+    """
+    module_path, module_file = _module_reference_paths(module)
+    return (module_path, module_file) if recursive else (os.path.join(module_path, "index.md"),)
+
+
+def _pdocs_tasks(module: str) -> List[Tuple[str, bool]]:
+    """Splits rendering the given module into independent `(module, recursive)` tasks:
+    the package on its own plus each of its public direct submodules when the module is an
+    importable package, otherwise the module as a whole.
+    """
+    submodules = _public_submodules(module)
+    if not submodules:
+        return [(module, True)]
+    return [(module, False)] + [(submodule, True) for submodule, _ in submodules]
+
+
+def _streamed_pdocs(
+    config: dict, memory_limit: int = 0, tasks: Optional[List[Tuple[str, bool]]] = None
+) -> None:
+    """Renders every streamed task of the configured modules (or only the given tasks) in order,
+    within this process or, given a memory_limit, within worker processes replaced whenever
+    they reach it.
+    """
+    if tasks is None:
+        tasks = [task for module in config["modules"] for task in _streamed_pdocs_tasks(module)]
+    if not memory_limit:
+        _render_streamed_pdocs_tasks(config, tasks)
+        return
+
+    rendered = 0
+    while rendered < len(tasks):
+        with ProcessPoolExecutor(
+            max_workers=1, initializer=_pdocs_worker, initargs=(sys.path,)
+        ) as pool:
+            worker_rendered, worker_phases = pool.submit(
+                _streamed_pdocs_task,
+                (config, tasks[rendered:], memory_limit, profiling.enabled()),
+            ).result()
+        profiling.adopt(worker_phases)
+        rendered += worker_rendered
+
+
+def _streamed_pdocs_tasks(module: str) -> List[Tuple[str, bool]]:
+    """Splits rendering the given module into `(module, recursive)` tasks of a single page each:
+    every importable package on its own followed by the tasks of each of its public submodules,
+    otherwise the module as a whole.
+    """
+    submodules = _public_submodules(module)
+    if not submodules:
+        return [(module, True)]
+    return [(module, False)] + [
+        task for submodule, _ in submodules for task in _streamed_pdocs_tasks(submodule)
+    ]
+
+
+def _public_submodules(module: str) -> List[Tuple[str, bool]]:
+    """Returns the name of every public direct submodule of the given module along with whether
+    it is a package, sorted by name and without importing it. Modules given by path have none.
 
-            # remove any settings pointing to the temp dirs
-            if config["mkdocs"]["docs_dir"].startswith(input_dir):
-                del config["mkdocs"]["docs_dir"]
-            if config["mkdocs"]["site_dir"].startswith(temp_output_dir):
-                del config["mkdocs"]["site_dir"]
-            if config["pdocs"].get("output_dir") and config["pdocs"]["output_dir"].startswith(
-                input_dir
+    Every way of splitting reference documentation into pages is built on this, so that they
+    all render the same pages.
+    """
+    if os.sep in module or (os.altsep and os.altsep in module):
+        return []
+
+    search_locations, _ = _module_location(module)
+    return sorted(
+        (submodule.name, submodule.ispkg)
+        for submodule in pkgutil.iter_modules(search_locations, prefix=f"{module}.")
+        if not submodule.name.split(".")[-1].startswith("_")
+    )
+
+
+def _streamed_pdocs_task(task: Tuple[dict, list, int, bool]) -> Tuple[int, List[dict]]:
+    """Renders streamed tasks within a worker process until its memory use grows by more than
+    memory_limit MB, returning how many were rendered and the phases recorded doing so
+    if profiling was requested.
+    """
+    config, tasks, memory_limit, profile = task
+    if not profile:
+        return _render_streamed_pdocs_tasks(config, tasks, memory_limit), []
+
+    with profiling.recording() as phases:
+        rendered = _render_streamed_pdocs_tasks(config, tasks, memory_limit)
+    return rendered, phases
+
+
+def _render_streamed_pdocs_tasks(
+    config: dict, tasks: List[Tuple[str, bool]], memory_limit: int = 0
+) -> int:
+    """Renders tasks one after the other, removing the modules of the documented packages
+    imported while doing so from the import cache as soon as the next task isn't within them.
+    Stops early once this process' memory use has grown by more than memory_limit MB (if given),
+    returning the number of tasks rendered.
+    """
+    import gc
+    import linecache
+
+    from pdocs.extract import split_module_spec as pdocs_split_module_spec
+
+    roots = [pdocs_split_module_spec(module)[1] for module in config["modules"]]
+    imported = set(sys.modules)
+    initial_rss = profiling.current_rss() or 0
+    for position, (module, recursive) in enumerate(tasks):
+        with profiling.phase(f"pdocs {module}", streamed=True), profiling.imports_measured():
+            _render_pdocs_task(config, module, recursive)
+
+        next_module = tasks[position + 1][0] if position + 1 < len(tasks) else ""
+        for name in set(sys.modules) - imported:
+            if not any(name == root or name.startswith(f"{root}.") for root in roots) or (
+                next_module == name or next_module.startswith(f"{name}.")
             ):
-                del config["pdocs"]["output_dir"]
-            if config["include_reference_documentation"]:
-                nav.pop()
+                continue
+            parent_name, _, attribute = name.rpartition(".")
+            parent = sys.modules.get(parent_name)
+            if parent is not None and getattr(parent, attribute, None) is sys.modules[name]:
+                delattr(parent, attribute)
+            del sys.modules[name]
+        linecache.clearcache()
+        gc.collect()
+
+        if memory_limit and (profiling.current_rss() or 0) - initial_rss > memory_limit * 1024**2:
+            return position + 1
+    return len(tasks)
+
+
+def _pdocs_worker(python_path: List[str]) -> None:
+    """Prepares a reference generation worker process to import modules like its parent does."""
+    sys.path[:] = python_path
+
+
+def _pdocs_task(task: Tuple[dict, str, bool, bool]) -> List[dict]:
+    """Renders a single reference generation task within a worker process, returning the
+    phases recorded doing so if profiling was requested.
+    """
+    config, module, recursive, profile = task
+    if not profile:
+        _render_pdocs_task(config, module, recursive)
+        return []
+
+    with profiling.recording() as phases, profiling.phase(
+        f"pdocs {module}", worker=True
+    ), profiling.imports_measured():
+        _render_pdocs_task(config, module, recursive)
+    return phases
+
+
+def _render_pdocs_task(config: dict, module: str, recursive: bool) -> None:
+    """Renders the reference documentation for module, or only its own page if not recursive."""
+    from pdocs import as_markdown as pdocs_as_markdown
+    from pdocs import doc as pdocs_doc
+    from pdocs.extract import load_module as pdocs_load_module
+    from pdocs.extract import split_module_spec as pdocs_split_module_spec
+    from pdocs.extract import submodules as pdocs_submodules
+    from pdocs.render import text as pdocs_text
+    from pdocs.render import tpl_lookup as pdocs_template_lookup
+    from pdocs.static import module_to_path as pdocs_module_to_path
+
+    if recursive:
+        pdocs_as_markdown(**{**config, "modules": [module]})
+        return
+
+    if config.get("template_dir"):
+        pdocs_template_lookup.directories.insert(0, config["template_dir"])
+    dname, mname = pdocs_split_module_spec(module)
+    package = pdocs_doc.Module(mname, pdocs_load_module(dname, mname)[0], None)
+    # submodules are rendered by tasks of their own, so classes and identifiers found within them
+    # are referred to by name (as pdocs would) rather than by loading their documentation
+    package.submodules = [
+        SimpleNamespace(
+            name=submodule,
+            find_class=lambda cls: pdocs_doc.External(f"{cls.__module__}.{cls.__name__}"),
+            find_ident=lambda name, _seen=None: None,
+        )
+        for submodule in pdocs_submodules(dname, mname)
+        if not submodule.split(".")[-1].startswith("_")
+    ]
+    destination = Path(config["output_dir"]) / pdocs_module_to_path(package, extension="md")
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    destination.write_text(
+        pdocs_text(package, source=not config.get("exclude_source", False)), encoding="utf-8"
+    )
+
+
+def _forget_changed_modules(fingerprints: Dict[str, str]) -> None:
+    """Removes every module this process previously rendered reference documentation for from
+    a different version of its source from the import cache (along with its submodules),
+    so that pdocs documents its current source even within a long running `portray server`.
+    """
+    for module, fingerprint in fingerprints.items():
+        if _rendered_module_fingerprints.get(module, fingerprint) != fingerprint:
+            for imported in list(sys.modules):
+                if imported == module or imported.startswith(f"{module}."):
+                    del sys.modules[imported]
+
+
+def _module_sources(module: str) -> List[str]:
+    """Returns every source file that makes up the given module (and its submodules)
+    without importing it (or any of its parent packages), or an empty list if they could not be
+    determined.
+    """
+    search_locations, origin = _module_location(module)
+    if origin:
+        return [origin] if os.path.isfile(origin) else []
+
+    source_suffixes = tuple(importlib.machinery.all_suffixes())
+    return sorted(
+        os.path.join(location, relative_path)
+        for location in search_locations
+        for relative_path in cache.files(location)
+        if relative_path.endswith(source_suffixes)
+    )
 
-            yield input_dir, temp_output_dir
 
+def _module_location(module: str) -> Tuple[List[str], Optional[str]]:
+    """Returns the submodule search locations of the given module if it is a package,
+    or otherwise the file it originates from, without importing it or its parent packages.
+    """
+    try:
+        if os.sep in module or (os.altsep and os.altsep in module):
+            location = os.path.abspath(module)
+            if os.path.isdir(location):
+                return [location], None
+            return [], location if os.path.isfile(location) else None
+
+        search_path: Optional[List[str]] = None
+        origin = None
+        for name in module.split("."):
+            spec = importlib.machinery.PathFinder.find_spec(name, search_path)
+            if spec is None:
+                return [], None
+            search_path = list(spec.submodule_search_locations or ())
+            origin = spec.origin
+    except Exception:
+        return [], None
+
+    if search_path:
+        return search_path, None
+    return [], origin
 
-def _mkdocs_config(config: dict) -> mkdocs_config.Config:
-    config_instance = mkdocs_config.Config(schema=mkdocs_schema())
-    config_instance.load_dict(config)
 
-    errors, warnings = config_instance.validate()
+def _mkdocs_config(config: dict, search_index: str = "mkdocs"):
+    """Returns the validated `mkdocs.config.Config` instance for the given MkDocs config,
+    writing the given search index (see `portray.search`).
+
+    Validation loads the theme, plugins and every Markdown extension, so validated instances
+    are reused for as long as the given config is unchanged (for instance across the rebuilds
+    of `documentation_in_reloadable_folder`). Each time one is reused it is first restored to
+    the state validation left it in, undoing what the plugins of the previous build changed.
+    """
+    import mkdocs.config as mkdocs_config
+    import mkdocs.exceptions as _mkdocs_exceptions
+    from mkdocs.config.defaults import get_schema as mkdocs_schema
+    from portray import search
+
+    config_key = _mkdocs_config_key(config, search_index)
+    if config_key in _validated_mkdocs_configs:
+        config_instance, validated_state = _validated_mkdocs_configs[config_key]
+        _restore_validated_state(config_instance, validated_state)
+        config_instance.config_file_path = config["config_file_path"]
+        return config_instance
+
+    with profiling.phase("mkdocs config validation"):
+        config_instance = mkdocs_config.Config(schema=mkdocs_schema())
+        config_instance.load_dict(config)
+        errors, warnings = config_instance.validate()
+
     if errors:
         print(errors)
         raise _mkdocs_exceptions.ConfigurationError(
@@ -188,26 +1320,118 @@ def _mkdocs_config(config: dict) -> mkdocs_config.Config:
         raise _mkdocs_exceptions.ConfigurationError(
             f"Aborted with {len(warnings)} Configuration Warnings in 'strict' mode!"
         )
+    search.use(config_instance, search_index)
+
+    if config_key is not None:
+        _validated_mkdocs_configs[config_key] = (
+            config_instance,
+            _validated_state(config_instance),
+        )
+        while len(_validated_mkdocs_configs) > MKDOCS_CONFIG_CACHE_SIZE:
+            del _validated_mkdocs_configs[next(iter(_validated_mkdocs_configs))]
 
     config_instance.config_file_path = config["config_file_path"]
     return config_instance
 
 
+def _mkdocs_config_key(config: dict, search_index: str) -> Optional[str]:
+    """Returns the key validated MkDocs configs are cached under, or `None` for configs that
+    can't be hashed (and so are always validated).
+    """
+    try:
+        return f"{search_index}:{cache.config_hash(config)}"
+    except (TypeError, ValueError):
+        return None
+
+
+def _validated_state(config_instance) -> dict:
+    """Returns a snapshot of the values of a freshly validated MkDocs config and its theme,
+    which MkDocs plugins (including the built-in search plugin) change while building.
+    """
+    return {
+        "config": _copied_values(config_instance.data),
+        "theme": _copied_values(vars(config_instance["theme"])),
+    }
+
+
+def _restore_validated_state(config_instance, validated_state: dict) -> None:
+    """Restores a MkDocs config and its theme to a snapshot taken by `_validated_state`."""
+    config_instance.data.clear()
+    config_instance.data.update(_copied_values(validated_state["config"]))
+    theme_attributes = vars(config_instance["theme"])
+    theme_attributes.clear()
+    theme_attributes.update(_copied_values(validated_state["theme"]))
+
+
+def _copied_values(values: dict) -> dict:
+    """Returns a copy of values, deep copying plain containers but not other objects
+    (such as the loaded theme and plugins).
+    """
+    return {
+        key: copy.deepcopy(value) if type(value) in (dict, list, set) else value
+        for key, value in values.items()
+    }
+
+
 def _nested_docs(directory: str, root_directory: str, config: dict) -> list:
-    nav = [
-        _doc(doc, root_directory, config) for doc in sorted(glob(os.path.join(directory, "*.md")))
-    ]
+    """Returns the nav for every Markdown document within directory (and its subdirectories),
+    with paths relative to root_directory. Subdirectories that contain no Markdown documents
+    (at any depth) are left out.
+    """
+    relative_directory = os.path.relpath(directory, root_directory)
+    return _docs_nav(
+        _docs_tree(directory), "" if relative_directory == "." else relative_directory, config
+    )
 
-    nested_dirs = sorted(glob(os.path.join(directory, "*/")))
-    for nested_dir in nested_dirs:
-        if (
-            len(glob(os.path.join(nested_dir, "*.md")) + glob(os.path.join(nested_dir, "**/*.md")))
-            > 0
-        ):
-            dir_nav = {
-                _label(nested_dir[:-1], config): _nested_docs(nested_dir, root_directory, config)
-            }
-            nav.append(dir_nav)  # type: ignore
+
+def _docs_tree(directory: str, _parents: FrozenSet[Tuple[int, int]] = frozenset()) -> tuple:
+    """Indexes the Markdown documents beneath directory in a single `os.scandir` pass,
+    returning a `(document_names, {subdirectory_name: subdirectory_tree})` tuple that only
+    includes subdirectories containing Markdown documents. Hidden files and directories are
+    skipped, as are symlinks back into a parent directory.
+    """
+    docs: List[str] = []
+    nested: Dict[str, tuple] = {}
+    try:
+        directory_stat = os.stat(directory)
+        entries = list(os.scandir(directory))
+    except OSError:
+        return docs, nested
+
+    parents = _parents | {(directory_stat.st_dev, directory_stat.st_ino)}
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        try:
+            is_dir = entry.is_dir()
+        except OSError:  # pragma: no cover
+            continue
+
+        if is_dir:
+            entry_stat = entry.stat()
+            if (entry_stat.st_dev, entry_stat.st_ino) not in parents:
+                nested_docs, nested_dirs = tree = _docs_tree(entry.path, parents)
+                if nested_docs or nested_dirs:
+                    nested[entry.name] = tree
+        elif entry.name.endswith(".md"):
+            docs.append(entry.name)
+
+    return docs, nested
+
+
+def _docs_nav(tree: tuple, relative_directory: str, config: dict) -> list:
+    docs, nested = tree
+    nav: list = []
+    for doc in sorted(docs):
+        path = os.path.join(relative_directory, doc)
+        nav.append({_label(path, config): path})
+
+    # ordered the same as sorting directory paths that end with a separator
+    for nested_dir in sorted(nested, key=lambda name: name + os.sep):
+        nested_path = os.path.join(relative_directory, nested_dir)
+        nav.append(
+            {_label(nested_path, config): _docs_nav(nested[nested_dir], nested_path, config)}
+        )
 
     return nav
 
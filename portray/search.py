@@ -0,0 +1,284 @@
+"""Defines the compact, sharded search index `portray` writes for the Material theme (see the
+`search_index` setting) in place of the single `search/search_index.json` file MkDocs writes,
+which holds the full text of every page and has to be downloaded in full before the first search:
+
+- `search/manifest.json`: The shards making up the index, loaded alongside every page.
+- `search/shard.HASH.json`: The postings (documents and weights) of every term starting with
+  the same `PREFIX_LENGTH` characters.
+- `search/documents.HASH.json`: The location, title and a short summary of
+  `DOCUMENTS_PER_SHARD` consecutive documents (pages and their sections).
+
+The search worker of `portray`'s templates (`mkdocs_templates/assets/javascripts/workers`)
+only fetches the shards of the terms searched for, and the documents shown as results.
+Shards are named after a hash of their contents, so they can be cached indefinitely.
+
+The templates hand the worker to the Material theme through its internals, so the sharded index
+is only written for the releases of the theme they were tested against (see `THEME_VERSIONS`).
+"""
+import hashlib
+import html
+import json
+import os
+import re
+import warnings
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from mkdocs.contrib.search import SearchPlugin as MkDocsSearchPlugin
+
+INDEXES = ("sharded", "mkdocs")
+
+# the mkdocs-material releases (from, up to but excluding) portray's search worker supports
+THEME_VERSIONS = ((8, 5), (9, 0))
+
+PREFIX_LENGTH = 2
+MIN_TERM_LENGTH = 2
+DOCUMENTS_PER_SHARD = 500
+SUMMARY_LENGTH = 240
+TITLE_WEIGHT = 10
+
+TEMPLATES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mkdocs_templates")
+
+SHARD_FILE = re.compile(r"(shard|documents)\.[0-9a-f]+\.json$")
+TERM = re.compile(r"[^\W_]+")
+HEADING = re.compile(r"<h([1-6])\b([^>]*)>(.*?)</h\1\s*>", re.IGNORECASE | re.DOTALL)
+HEADING_ID = re.compile(r"""\bid\s*=\s*["']([^"']*)["']""")
+IGNORED_ELEMENTS = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+TAG = re.compile(r"<[^>]*>")
+WHITESPACE = re.compile(r"\s+")
+
+Document = Tuple[str, str, str]
+
+
+def validate(search_index: str) -> str:
+    """Returns the given search index kind if it is known, otherwise raising a `ValueError`."""
+    if search_index not in INDEXES:
+        raise ValueError(
+            f"Unknown search index '{search_index}'. Expected one of: {', '.join(INDEXES)}"
+        )
+    return search_index
+
+
+def use(config_instance, search_index: str) -> None:
+    """Replaces MkDocs' search plugin within a validated MkDocs config with `SearchPlugin` when
+    search_index is `sharded` and the config renders `portray`'s Material templates (whose search
+    worker reads the sharded index), keeping the plugin's settings.
+
+    If the installed Material theme isn't one of the supported `THEME_VERSIONS` a warning is
+    given and MkDocs' own search index is kept.
+    """
+    plugins = config_instance["plugins"]
+    search_plugin = plugins.get("search")
+    theme = config_instance["theme"]
+    if (
+        validate(search_index) != "sharded"
+        or not isinstance(search_plugin, MkDocsSearchPlugin)
+        or isinstance(search_plugin, SearchPlugin)
+        or theme.name != "material"
+        or TEMPLATES_DIRECTORY not in (os.path.abspath(directory) for directory in theme.dirs)
+    ):
+        return
+
+    version = theme_version()
+    if version is None or not THEME_VERSIONS[0] <= version < THEME_VERSIONS[1]:
+        warnings.warn(
+            f"The sharded search index isn't supported by mkdocs-material "
+            f"{'.'.join(map(str, version)) if version else '(unknown version)'}, "
+            "so MkDocs' own search index is written instead.",
+            stacklevel=2,
+        )
+        return
+
+    sharded_plugin = SearchPlugin()
+    sharded_plugin.config = search_plugin.config
+    replaced_plugins = type(plugins)()
+    for name, plugin in plugins.items():
+        replaced_plugins[name] = sharded_plugin if name == "search" else plugin
+    config_instance["plugins"] = replaced_plugins
+
+
+def theme_version() -> Optional[Tuple[int, ...]]:
+    """Returns the (major, minor) version of the installed mkdocs-material theme,
+    or `None` if it can't be determined.
+    """
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return tuple(int(part) for part in version("mkdocs-material").split(".")[:2])
+    except (PackageNotFoundError, ValueError):
+        return None
+
+
+@contextmanager
+def unrendered_pages_kept(config_instance) -> Iterator[None]:
+    """Keeps the documents indexed for every page by the previous build of config_instance
+    within the index written by the builds made within (such as dirty MkDocs builds, which
+    only render changed pages).
+    """
+    search_plugin = config_instance["plugins"].get("search")
+    if not isinstance(search_plugin, SearchPlugin):
+        yield
+        return
+
+    search_plugin.keep_pages = True
+    try:
+        yield
+    finally:
+        search_plugin.keep_pages = False
+
+
+class SearchPlugin(MkDocsSearchPlugin):
+    """MkDocs' search plugin, writing `portray`'s sharded search index instead of
+    `search/search_index.json`.
+    """
+
+    sharded_index = True  # read by mkdocs_templates/main.html
+
+    def __init__(self):
+        super().__init__()
+        self.pages: Dict[str, List[Document]] = {}
+        self.keep_pages = False
+
+    def on_pre_build(self, config, **kwargs):
+        if not self.keep_pages:
+            self.pages = {}
+
+    def on_page_context(self, context, **kwargs):
+        page = context["page"]
+        self.pages[page.url] = documents(page, self.config["indexing"])
+
+    def on_post_build(self, config, **kwargs):
+        write(
+            os.path.join(config["site_dir"], "search"),
+            self.pages.values(),
+            {"lang": self.config["lang"], "separator": self.config["separator"]},
+        )
+
+
+def documents(page, indexing: str = "full") -> List[Document]:
+    """Returns the location, title and text of the documents to index for a rendered MkDocs page:
+    the page itself (with the text before its first heading) followed by each of its sections.
+    Section locations are relative to the page (`#anchor`).
+    """
+    content = IGNORED_ELEMENTS.sub(" ", page.content or "")
+    titles = dict(_toc_titles(page.toc))
+    sections: List[Tuple[str, str, List[str]]] = [(page.url, page.title or "", [])]
+    position = 0
+    for heading in HEADING.finditer(content):
+        sections[-1][2].append(content[position : heading.start()])
+        position = heading.end()
+        heading_id = HEADING_ID.search(heading.group(2))
+        anchor = html.unescape(heading_id.group(1)) if heading_id else ""
+        if anchor in titles:
+            sections.append((f"#{anchor}", titles[anchor], []))
+        else:  # headings left out of the table of contents are part of the section's text
+            sections[-1][2].append(f" {heading.group(3)} ")
+    sections[-1][2].append(content[position:])
+
+    if indexing == "titles":
+        return [(page.url, page.title or "", "")]
+    return [
+        (location, title, _text("".join(parts)) if indexing == "full" else "")
+        for location, title, parts in sections
+    ]
+
+
+def write(directory: str, pages: Iterable[List[Document]], config: dict) -> dict:
+    """Writes the sharded search index of the documents of every page into directory
+    (replacing any index previously written there), returning its manifest.
+    """
+    records: List[list] = []
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    for page_documents in pages:
+        page_id = len(records)
+        for location, title, text in page_documents:
+            document_id = len(records)
+            record: list = [location, title, _summary(text)]
+            if document_id != page_id:
+                record.append(page_id)
+            records.append(record)
+
+            weights = Counter(terms(text))
+            for term, count in Counter(terms(title)).items():
+                weights[term] += count * TITLE_WEIGHT
+            for term, weight in weights.items():
+                postings.setdefault(term, []).append((document_id, weight))
+
+    shards: Dict[str, Dict[str, List[int]]] = {}
+    for term in sorted(postings):
+        shards.setdefault(term[:PREFIX_LENGTH], {})[term] = _encoded(postings[term])
+
+    os.makedirs(directory, exist_ok=True)
+    written = set()
+    manifest = {
+        "config": config,
+        # named `docs` as the Material theme hands it to the search worker as is
+        "docs": {
+            "documents": len(records),
+            "documents_per_shard": DOCUMENTS_PER_SHARD,
+            "document_shards": [
+                _write_shard(directory, "documents", records[start : start + DOCUMENTS_PER_SHARD])
+                for start in range(0, len(records), DOCUMENTS_PER_SHARD)
+            ],
+            "prefix_length": PREFIX_LENGTH,
+            "shards": {
+                prefix: _write_shard(directory, "shard", shard) for prefix, shard in shards.items()
+            },
+        },
+    }
+    written.update(manifest["docs"]["document_shards"])
+    written.update(manifest["docs"]["shards"].values())
+    with open(os.path.join(directory, "manifest.json"), "w") as manifest_file:
+        json.dump(manifest, manifest_file, separators=(",", ":"))
+
+    for file_name in os.listdir(directory):
+        if (SHARD_FILE.match(file_name) and file_name not in written) or (
+            file_name == "search_index.json"
+        ):
+            os.remove(os.path.join(directory, file_name))
+    return manifest
+
+
+def terms(text: str) -> List[str]:
+    """Returns the terms text is indexed (and searched) under: its lower cased words and
+    numbers, splitting on punctuation and underscores (so `as_html` is indexed as `as` and `html`).
+    """
+    return [term for term in TERM.findall(text.lower()) if len(term) >= MIN_TERM_LENGTH]
+
+
+def _toc_titles(toc) -> Iterator[Tuple[str, str]]:
+    for toc_item in toc:
+        yield toc_item.id, html.unescape(toc_item.title)
+        yield from _toc_titles(toc_item.children)
+
+
+def _text(fragment: str) -> str:
+    return WHITESPACE.sub(" ", html.unescape(TAG.sub("", fragment))).strip()
+
+
+def _summary(text: str) -> str:
+    if len(text) <= SUMMARY_LENGTH:
+        return text
+    return text[:SUMMARY_LENGTH].rsplit(" ", 1)[0] + " …"
+
+
+def _encoded(postings: List[Tuple[int, int]]) -> List[int]:
+    """Returns postings (sorted by document) flattened, each document relative to the last."""
+    encoded: List[int] = []
+    previous_id = 0
+    for document_id, weight in postings:
+        encoded.extend((document_id - previous_id, weight))
+        previous_id = document_id
+    return encoded
+
+
+def _write_shard(directory: str, kind: str, contents) -> str:
+    """Writes contents into a file of the given kind named after its hash, returning its name."""
+    data = json.dumps(contents, separators=(",", ":"), ensure_ascii=False).encode("utf8")
+    file_name = f"{kind}.{hashlib.sha256(data).hexdigest()[:16]}.json"
+    path = os.path.join(directory, file_name)
+    if not os.path.isfile(path):
+        with open(path, "wb") as shard_file:
+            shard_file.write(data)
+    return file_name
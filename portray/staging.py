@@ -0,0 +1,120 @@
+"""Defines the strategies `portray` can use to place project sources into the directory
+documentation is compiled from.
+
+- *copy*: Copies file contents (the default).
+- *hardlink*: Hard links each file, sharing its contents with the original.
+- *symlink*: Symbolic links each file (or whole directory) to the original.
+- *reflink*: Clones each file using copy-on-write where the filesystem supports it,
+  otherwise copying it within the kernel using `copy_file_range`.
+- *auto*: Uses the cheapest of `hardlink` and `reflink` the filesystem supports.
+
+Every strategy falls back to copying whenever it is not supported for a given file,
+for instance when hard linking across filesystems.
+"""
+import os
+import shutil
+
+STRATEGIES = ("copy", "hardlink", "symlink", "reflink", "auto")
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+
+def validate(strategy: str) -> str:
+    """Returns the given staging strategy if it is known, otherwise raising a `ValueError`."""
+    if strategy not in STRATEGIES:
+        raise ValueError(
+            f"Unknown staging strategy '{strategy}'. Expected one of: {', '.join(STRATEGIES)}"
+        )
+    return strategy
+
+
+def place_file(source: str, destination: str, strategy: str = "copy") -> None:
+    """Places the source file at destination using the given staging strategy, replacing
+    (but never writing through) any file already at destination.
+    """
+    validate(strategy)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    if os.path.lexists(destination):
+        os.remove(destination)
+
+    if strategy in ("hardlink", "auto"):
+        try:
+            os.link(source, destination)
+            return
+        except OSError:
+            pass
+    elif strategy == "symlink":
+        try:
+            os.symlink(os.path.abspath(source), destination)
+            return
+        except OSError:
+            pass
+
+    if strategy in ("reflink", "auto") and _reflink(source, destination):
+        return
+
+    shutil.copyfile(source, destination)
+
+
+def place_tree(source: str, destination: str, strategy: str = "copy") -> None:
+    """Places the source directory at destination using the given staging strategy.
+
+    With the `symlink` strategy the directory as a whole is linked, otherwise every file
+    within it is placed individually.
+    """
+    validate(strategy)
+    if strategy == "symlink":
+        try:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.symlink(os.path.abspath(source), destination, target_is_directory=True)
+            return
+        except OSError:
+            pass
+
+    if strategy == "copy":
+        shutil.copytree(source, destination)
+        return
+
+    for current_root, _, file_names in os.walk(source, followlinks=True):
+        relative_root = os.path.relpath(current_root, source)
+        os.makedirs(os.path.join(destination, relative_root), exist_ok=True)
+        for file_name in file_names:
+            place_file(
+                os.path.join(current_root, file_name),
+                os.path.normpath(os.path.join(destination, relative_root, file_name)),
+                strategy,
+            )
+
+
+def _reflink(source: str, destination: str) -> bool:
+    """Attempts a copy-on-write clone of source into destination, falling back to an in-kernel
+    `copy_file_range` copy (which filesystems may themselves implement as a clone).
+    Returns `True` only if either succeeded.
+    """
+    try:
+        with open(source, "rb") as source_file, open(destination, "wb") as destination_file:
+            try:
+                import fcntl
+
+                fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+                return True
+            except (ImportError, OSError):
+                pass
+
+            if not hasattr(os, "copy_file_range"):  # pragma: no cover
+                raise OSError("copy_file_range is not supported on this platform")
+            remaining = os.fstat(source_file.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(  # type: ignore
+                    source_file.fileno(), destination_file.fileno(), remaining
+                )
+                if not copied:
+                    break
+                remaining -= copied
+            return remaining <= 0
+    except OSError:
+        pass
+
+    if os.path.exists(destination):
+        os.remove(destination)
+    return False
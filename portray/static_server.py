@@ -0,0 +1,175 @@
+"""Defines the static web server `portray server --production` uses to serve generated
+documentation, suitable for more than one person to browse at a time:
+
+- requests are handled concurrently, each in its own thread, over persistent connections
+- every response carries a strong `ETag` (a hash of the file served) and `Last-Modified`
+  header, and conditional requests are answered with `304 Not Modified`
+- assets with a content fingerprint in their name (such as `bundle.8492ddcf.min.js`) are
+  cached by browsers for a year, while everything else is revalidated on every use
+- precompressed siblings (see `portray.compression`) are served to clients that accept them
+- files are sent using `sendfile` where the platform supports it
+"""
+import email.utils
+import os
+import re
+import urllib.parse
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from portray import cache
+from portray._version import __version__
+
+FINGERPRINTED = re.compile(r"[.-][0-9a-f]{8,}(?:\.min)?\.\w+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+ENCODED_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+_etags: Dict[Tuple[str, int, int, int], str] = {}
+
+
+def server(root: str, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    """Returns a (not yet started) threaded web server serving the files within root."""
+    http_server = ThreadingHTTPServer((host, port), partial(StaticFileHandler, directory=root))
+    http_server.daemon_threads = True
+    return http_server
+
+
+def serve(root: str, host: str = "127.0.0.1", port: int = 8000) -> None:
+    """Serves the files within root at host:port until interrupted."""
+    with server(root, host, port) as http_server:
+        print(f"Serving on http://{host}:{http_server.server_address[1]}")
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class StaticFileHandler(SimpleHTTPRequestHandler):
+    """Answers `GET` and `HEAD` requests for the files within `directory`."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = f"portray/{__version__}"
+
+    def do_GET(self) -> None:
+        self._serve(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._serve(send_body=False)
+
+    def _serve(self, send_body: bool) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not url.path.endswith("/"):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header(
+                    "Location", urllib.parse.urlunsplit(url._replace(path=url.path + "/"))
+                )
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            path = os.path.join(path, "index.html")
+
+        status = HTTPStatus.OK
+        if not os.path.isfile(path):
+            status = HTTPStatus.NOT_FOUND
+            path = os.path.join(self.directory, "404.html")
+            if not os.path.isfile(path):
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+
+        encoding, served_path, has_variants = self._variant(path)
+        stat = os.stat(served_path)
+        etag = _etag(served_path, stat)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": email.utils.formatdate(stat.st_mtime, usegmt=True),
+            "Cache-Control": (
+                IMMUTABLE_CACHE_CONTROL
+                if status == HTTPStatus.OK and FINGERPRINTED.search(path)
+                else REVALIDATE_CACHE_CONTROL
+            ),
+        }
+        if has_variants:
+            headers["Vary"] = "Accept-Encoding"
+
+        if status == HTTPStatus.OK and self._not_modified(etag, stat):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for header, value in headers.items():
+                self.send_header(header, value)
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(stat.st_size))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        if send_body:
+            with open(served_path, "rb") as served_file:
+                self.connection.sendfile(served_file)
+
+    def _variant(self, path: str) -> Tuple[Optional[str], str, bool]:
+        """Returns the content encoding (if any) and location of the best variant of the file
+        at path the client accepts, and whether any encoded variant of it exists.
+        """
+        accepted = _accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        has_variants = False
+        for encoding, suffix in ENCODED_VARIANTS:
+            if os.path.isfile(path + suffix):
+                has_variants = True
+                if encoding in accepted:
+                    return encoding, path + suffix, True
+        return None, path, has_variants
+
+    def _not_modified(self, etag: str, stat: os.stat_result) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or etag in (
+                candidate.strip().replace("W/", "", 1) for candidate in if_none_match.split(",")
+            )
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(stat.st_mtime) <= since
+        return False
+
+
+def _etag(path: str, stat: os.stat_result) -> str:
+    """Returns the strong ETag of the file at path, hashing its contents only once per version."""
+    key = (path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    etag = _etags.get(key)
+    if etag is None:
+        etag = _etags[key] = f'"{cache.file_hash(path)[:32]}"'
+    return etag
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Returns the content codings an `Accept-Encoding` header accepts (with a non-zero q)."""
+    accepted = set()
+    for coding in accept_encoding.split(","):
+        name, _, parameters = coding.partition(";")
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            key, _, value = parameter.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip() and quality > 0:
+            accepted.add(name.strip().lower())
+    if "*" in accepted:
+        accepted.update(encoding for encoding, _ in ENCODED_VARIANTS)
+    return accepted
@@ -0,0 +1,217 @@
+"""Defines how `portray as_html_versions` documents several versions of a project under one
+output directory, one for each of the given git refs:
+
+- Every ref is exported (using `git archive`, leaving the repository and its working tree
+  untouched) into `versions/exports/COMMIT` within the project's build cache (`cache_dir`),
+  where it is reused for as long as the ref points to the same commit.
+- Every version is built incrementally with a build cache of its own
+  (`versions/builds/VERSION`), while all of them share a single reference documentation cache,
+  so modules that are the same across versions are only documented once.
+- A `versions.json` listing the versions built is written next to them in the format of
+  [mike](https://github.com/jimporter/mike), which the version selector of the Material theme
+  reads (see `versioned`), along with an `index.html` redirecting to the default version.
+"""
+import html
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import warnings
+from typing import Dict, List, Tuple
+
+from portray import config
+
+EXPORTS_DIRECTORY = os.path.join("versions", "exports")
+BUILDS_DIRECTORY = os.path.join("versions", "builds")
+REFERENCE_DIRECTORY = os.path.join("versions", "reference")
+
+VERSIONS_FILE = "versions.json"
+
+UNSAFE_CHARACTERS = re.compile(r"[^\w.-]+")
+
+REDIRECT_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Redirecting</title>
+<meta http-equiv="refresh" content="0; url={url}">
+<link rel="canonical" href="{url}">
+</head>
+<body>
+<a href="{url}">Redirecting to {url}</a>
+</body>
+</html>
+"""
+
+
+def name(ref: str) -> str:
+    """Returns the name of the version documenting ref: the directory it is placed into within
+    the output directory, with anything but letters, digits, `.`, `-` and `_` replaced by `-`.
+    """
+    version_name = UNSAFE_CHARACTERS.sub("-", ref).strip("-.")
+    if not version_name:
+        raise ValueError(f"Unable to name a version after the git ref '{ref}'")
+    return version_name
+
+
+def export(directory: str, ref: str, cache_directory: str) -> Tuple[str, str]:
+    """Exports the project at directory (the root of, or a directory within, a git repository)
+    as of ref into the exports kept within cache_directory, unless already exported,
+    returning the commit ref points to along with the location of the exported project.
+    """
+    from git import Repo
+
+    repository = Repo(directory, search_parent_directories=True)
+    commit = repository.commit(ref).hexsha
+    project_path = os.path.relpath(
+        os.path.realpath(directory), os.path.realpath(str(repository.working_tree_dir))
+    ).replace(os.sep, "/")
+    exported_project = os.path.join(
+        cache_directory, EXPORTS_DIRECTORY, commit, os.path.basename(os.path.abspath(directory))
+    )
+    if os.path.isdir(exported_project):
+        return commit, exported_project
+
+    os.makedirs(os.path.dirname(exported_project), exist_ok=True)
+    treeish = commit if project_path == os.curdir else f"{commit}:{project_path}"
+    with tempfile.TemporaryFile() as archive_file:
+        repository.archive(archive_file, treeish, format="tar")
+        archive_file.seek(0)
+        exporting = tempfile.mkdtemp(dir=os.path.dirname(exported_project))
+        try:
+            with tarfile.open(fileobj=archive_file) as archive:
+                archive.extractall(exporting, members=_members(archive, exporting))
+            os.replace(exporting, exported_project)
+        except BaseException:
+            shutil.rmtree(exporting, ignore_errors=True)
+            raise
+    return commit, exported_project
+
+
+def prune_exports(cache_directory: str, keep: List[str]) -> None:
+    """Removes every export kept within cache_directory other than those of the given commits."""
+    exports = os.path.join(cache_directory, EXPORTS_DIRECTORY)
+    if not os.path.isdir(exports):
+        return
+
+    for commit in os.listdir(exports):
+        if commit not in keep:
+            shutil.rmtree(os.path.join(exports, commit), ignore_errors=True)
+
+
+def file_system_time(directory: str) -> float:
+    """Returns the current time as recorded by the file system at directory, whose timestamps
+    may lag behind `time.time()`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.TemporaryFile(dir=directory) as marker:
+        return os.fstat(marker.fileno()).st_mtime
+
+
+def prune_reference_cache(cache_directory: str, since: float) -> None:
+    """Removes every entry of the shared reference documentation cache within cache_directory
+    that no build used since the given time (see `file_system_time`).
+    """
+    reference_directory = reference_cache(cache_directory)
+    if not os.path.isdir(reference_directory):
+        return
+
+    for cached_reference in os.listdir(reference_directory):
+        cached_reference = os.path.join(reference_directory, cached_reference)
+        if os.path.getmtime(cached_reference) < since:
+            shutil.rmtree(cached_reference, ignore_errors=True)
+
+
+def repository(directory: str) -> Dict[str, str]:
+    """Returns the repository settings (`repo_url` and `repo_name`) of the git repository the
+    project at directory is within, which the exported versions of the project can't determine
+    for themselves as they aren't git repositories.
+    """
+    from git import Repo
+
+    try:
+        root = str(Repo(directory, search_parent_directories=True).working_tree_dir)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            settings = config.repository(root)
+    except Exception:
+        return {}
+    return {key: str(settings[key]) for key in ("repo_url", "repo_name") if settings.get(key)}
+
+
+def versioned(project_config: dict, repository_settings: Dict[str, str]) -> None:
+    """Configures the project config of an exported version to show the Material theme's
+    version selector (unless it configures its own), taking the repository settings of the
+    project it was exported from wherever it has none of its own.
+    """
+    mkdocs_config = project_config["mkdocs"]
+    for key, value in repository_settings.items():
+        if not mkdocs_config.get(key):
+            mkdocs_config[key] = value
+    if mkdocs_config["theme"]["name"].lower() == "material":
+        extra = mkdocs_config["extra"] = dict(mkdocs_config.get("extra") or {})
+        extra.setdefault("version", {"provider": "mike"})
+
+
+def write(output_dir: str, versions: List[dict], default: str = "") -> None:
+    """Writes `versions.json` listing versions (dicts giving the `version` name of each and its
+    `title`) into output_dir, along with an `index.html` redirecting to the default version
+    (the first one, unless another is named). The directories of versions listed by a previously
+    written `versions.json` but not by versions are removed.
+    """
+    default = default or versions[0]["version"]
+    os.makedirs(output_dir, exist_ok=True)
+    documented = {version["version"] for version in versions}
+    for previous_version in _listed_versions(output_dir):
+        previous_directory = os.path.join(output_dir, previous_version)
+        if previous_version not in documented and os.path.isdir(previous_directory):
+            shutil.rmtree(previous_directory)
+
+    with open(os.path.join(output_dir, VERSIONS_FILE), "w") as versions_file:
+        json.dump(
+            [
+                {"version": version["version"], "title": version["title"], "aliases": []}
+                for version in versions
+            ],
+            versions_file,
+            indent=2,
+        )
+    with open(os.path.join(output_dir, "index.html"), "w", encoding="utf-8") as index_file:
+        index_file.write(REDIRECT_PAGE.format(url=html.escape(f"{default}/")))
+
+
+def build_cache(cache_directory: str, version_name: str) -> str:
+    """Returns the location of the build cache of the named version within cache_directory."""
+    return os.path.join(cache_directory, BUILDS_DIRECTORY, version_name)
+
+
+def reference_cache(cache_directory: str) -> str:
+    """Returns the location of the reference documentation cache shared by every version."""
+    return os.path.join(cache_directory, REFERENCE_DIRECTORY)
+
+
+def _listed_versions(output_dir: str) -> List[str]:
+    """Returns the name of every version listed by the `versions.json` within output_dir."""
+    try:
+        with open(os.path.join(output_dir, VERSIONS_FILE)) as versions_file:
+            listed = json.load(versions_file)
+        return [
+            version["version"]
+            for version in listed
+            if name(version["version"]) == version["version"]
+        ]
+    except (OSError, ValueError, TypeError, KeyError):
+        return []
+
+
+def _members(archive: tarfile.TarFile, destination: str) -> List[tarfile.TarInfo]:
+    """Returns the files, directories and symbolic links of archive extracting within destination."""
+    destination = os.path.join(os.path.realpath(destination), "")
+    return [
+        member
+        for member in archive.getmembers()
+        if (member.isfile() or member.isdir() or member.issym())
+        and os.path.realpath(os.path.join(destination, member.name)).startswith(destination)
+    ]
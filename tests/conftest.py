@@ -27,3 +27,16 @@ def temporary_dir():
 @pytest.fixture()
 def project_dir():
     yield os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def project_cache_home():
+    """Keeps resolved project configurations cached by the test run out of the user's cache."""
+    with tempfile.TemporaryDirectory() as cache_home:
+        previous_cache_home = os.environ.get("PORTRAY_CACHE_HOME")
+        os.environ["PORTRAY_CACHE_HOME"] = cache_home
+        yield cache_home
+        if previous_cache_home is None:
+            del os.environ["PORTRAY_CACHE_HOME"]
+        else:
+            os.environ["PORTRAY_CACHE_HOME"] = previous_cache_home
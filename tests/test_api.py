@@ -1,11 +1,14 @@
+import json
 import os
 import shutil
 import sys
+import tarfile
 import tempfile
 
 import mkdocs.commands.gh_deploy
 import pytest
 import toml
+from git import Repo
 from portray import api, exceptions
 
 CUSTOM_NAV = """
@@ -92,19 +95,44 @@ def test_as_html_custom_nav(temporary_dir, project_dir, chdir):
             api.as_html()
 
 
+def test_as_html_only(temporary_dir, project_dir, chdir):
+    with chdir(temporary_dir):
+        temp_project_dir = os.path.join(temporary_dir, "portray")
+        shutil.copytree(project_dir, temp_project_dir)
+        with chdir(temp_project_dir):
+            with open(os.path.join(temp_project_dir, "pyproject.toml"), "w+") as pyproject:
+                pyproject.write(CUSTOM_NAV)
+
+            api.as_html(only=["docs/contributing/1.*", "portray.api"])
+
+            def page(*path):
+                with open(os.path.join(temp_project_dir, "site", *path, "index.html")) as html:
+                    return html.read()
+
+            assert "left out of this preview" not in page(
+                "docs", "contributing", "1.-contributing-guide"
+            )
+            assert "left out of this preview" in page("docs", "contributing", "2.-coding-standard")
+            assert "left out of this preview" not in page("reference", "portray", "api")
+            assert "left out of this preview" in page("reference", "portray")
+            assert not os.path.exists(
+                os.path.join(temp_project_dir, "site", "reference", "portray", "render")
+            )
+
+
 def test_server(mocker, project_dir, chdir):
     with chdir(project_dir):
-        mocker.patch("portray.api.Server")
+        live_server = mocker.patch("livereload.Server")
         api.server()
-        api.Server.assert_called_once()
-        api.Server.return_value.serve.assert_called_once()
+        live_server.assert_called_once()
+        live_server.return_value.serve.assert_called_once()
 
 
 def test_reloading_server(mocker, project_dir, chdir):
     with chdir(project_dir):
-        mocker.patch("portray.api.Server")
+        live_server = mocker.patch("livereload.Server")
         api.server(reload=True)
-        server_instance = api.Server.return_value
+        server_instance = live_server.return_value
         server_instance.serve.assert_called_once()
         assert len(server_instance.watch.call_args_list) == 5
 
@@ -140,10 +168,10 @@ def project_configuration(project_dir, chdir):
 
 def test_in_browser(mocker, project_dir, chdir):
     with chdir(project_dir):
-        mocker.patch("portray.api.Server")
+        live_server = mocker.patch("livereload.Server")
         mocker.patch("webbrowser.open_new")
         api.in_browser()
-        server_instance = api.Server.return_value
+        server_instance = live_server.return_value
         server_instance.serve.assert_called_once()
 
         server_instance.reset_mock()
@@ -160,6 +188,48 @@ def test_on_github_pages(mocker, project_dir, chdir):
         mkdocs.commands.gh_deploy.gh_deploy.assert_called_once()
 
 
+def test_on_github_pages_incremental(temporary_dir, chdir, capsys):
+    remote = Repo.init(os.path.join(temporary_dir, "remote.git"), bare=True)
+    project_dir = os.path.join(temporary_dir, "project")
+    project = Repo.init(project_dir)
+    with project.config_writer() as git_config:
+        git_config.set_value("user", "name", "portray")
+        git_config.set_value("user", "email", "portray@example.com")
+    project.create_remote("origin", remote.working_dir)
+    with open(os.path.join(project_dir, "pyproject.toml"), "w") as pyproject:
+        pyproject.write(
+            '[tool.portray]\nmodules = ["deployed"]\n\n'
+            '[tool.portray.mkdocs]\nsite_name = "project"\n'
+            'repo_url = "https://github.com/example/project"\n'
+        )
+    with open(os.path.join(project_dir, "deployed.py"), "w") as module:
+        module.write('"""A deployed module."""\n')
+    project.index.add(["pyproject.toml", "deployed.py"])
+    project.index.commit("Initial commit")
+
+    with chdir(project_dir):
+        api.on_github_pages(incremental=True)
+        deployed = remote.commit("gh-pages")
+        assert "reference/deployed/index.html" in {blob.path for blob in deployed.tree.traverse()}
+        assert project.head.commit.hexsha[:7] in deployed.message
+        assert "successfully generated and pushed" in capsys.readouterr().out
+
+    # the project's own repository is used even when deploying from elsewhere
+    with chdir(temporary_dir):
+        api.on_github_pages(project_dir, incremental=True)
+        assert remote.commit("gh-pages") == deployed
+        assert "nothing was pushed" in capsys.readouterr().out
+
+        project.git.update_ref(
+            "refs/heads/gh-pages",
+            project.git.commit_tree(
+                "-p", deployed.hexsha, "-m", "Deployed with MkDocs version: 99.0", "HEAD^{tree}"
+            ),
+        )
+        with pytest.raises(exceptions.NewerVersionDeployed):
+            api.on_github_pages(project_dir, incremental=True)
+
+
 def test_module_no_path(temporary_dir, chdir):
     """Test handling of python modules specified in root project directory but not in path"""
     with chdir(temporary_dir):
@@ -186,3 +256,105 @@ def test_setting_output_dir_in_pyproject_overwrites_default(temporary_dir):
         pyproject.write(FAKE_PYPROJECT_TOML_BASIC)
     config = api.project_configuration(directory=temporary_dir, config_file=config_file)
     assert config["output_dir"] == "docs_output"
+
+
+def test_as_html_profile(temporary_dir, chdir):
+    with chdir(temporary_dir):
+        with open(os.path.join(temporary_dir, "my_module.py"), "w") as profiled_module:
+            profiled_module.write("def my_method():\n    pass\n")
+
+        api.as_html(modules=["my_module"], profile=True, profile_trace="trace.json")
+        with open("portray-profile.json") as report:
+            phases = {phase["name"]: phase for phase in json.load(report)["phases"]}
+        assert {"project configuration", "build", "pdocs my_module", "mkdocs build"} <= set(phases)
+        assert phases["mkdocs build"]["parent"] == "mkdocs"
+        assert os.path.isfile("trace.json")
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_as_html_many(temporary_dir, chdir, workers):
+    for name in ("first", "second"):
+        package_dir = os.path.join(temporary_dir, "packages", name)
+        os.makedirs(package_dir)
+        with open(os.path.join(package_dir, "pyproject.toml"), "w") as pyproject:
+            pyproject.write('[tool.portray]\nmodules = ["shared_name"]\n')
+        with open(os.path.join(package_dir, "shared_name.py"), "w") as module:
+            module.write(f'"""The {name} version of a module name both packages use."""\n')
+
+    with chdir(temporary_dir):
+        api.as_html_many(workers=workers)
+        for name in ("first", "second"):
+            reference_page = os.path.join("site", "packages", name, "reference", "shared_name")
+            with open(os.path.join(reference_page, "index.html")) as page:
+                assert f"The {name} version" in page.read()
+        with open(os.path.join("site", "index.html")) as index:
+            index_page = index.read()
+        assert '<a href="packages/first/">first</a>' in index_page
+        assert '<a href="packages/second/">second</a>' in index_page
+
+        with pytest.raises(exceptions.DocumentationAlreadyExists):
+            api.as_html_many(workers=workers)
+        api.as_html_many([os.path.join("packages", "second")], overwrite=True, workers=workers)
+
+        with pytest.raises(exceptions.NoProjectFound):
+            api.as_html_many(root="site")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_as_html_versions(temporary_dir, chdir, workers):
+    project = os.path.join(temporary_dir, "project")
+    repository = Repo.init(project)
+    with repository.config_writer() as git_config:
+        git_config.set_value("user", "name", "portray")
+        git_config.set_value("user", "email", "portray@example.com")
+    for version in ("1", "2"):
+        with open(os.path.join(project, "pyproject.toml"), "w") as pyproject:
+            pyproject.write('[tool.portray]\nmodules = ["versioned", "unchanged"]\n')
+        with open(os.path.join(project, "versioned.py"), "w") as module:
+            module.write(f'"""Version {version} of a module."""\n')
+        with open(os.path.join(project, "unchanged.py"), "w") as module:
+            module.write('"""A module that is the same in every version."""\n')
+        repository.index.add(["pyproject.toml", "versioned.py", "unchanged.py"])
+        repository.index.commit(f"Version {version}")
+        repository.create_tag(f"v{version}")
+
+    with chdir(project):
+        api.as_html_versions(["v2", "v1"], workers=workers)
+        for version in ("1", "2"):
+            with open(
+                os.path.join("site", f"v{version}", "reference", "versioned", "index.html")
+            ) as page:
+                assert f"Version {version} of a module" in page.read()
+        with open(os.path.join("site", "v1", "index.html")) as page:
+            assert '"provider": "mike"' in page.read()
+        with open(os.path.join("site", "versions.json")) as versions_file:
+            assert [version["version"] for version in json.load(versions_file)] == ["v2", "v1"]
+        reference_cache = os.path.join(".portray-cache", "versions", "reference")
+        assert len(os.listdir(reference_cache)) == 3  # both versions share `unchanged`
+        assert repository.git.status("--porcelain", "--ignored") == "?? .portray-cache/\n?? site/"
+
+        with pytest.raises(exceptions.DocumentationAlreadyExists):
+            api.as_html_versions(["v1"], workers=workers)
+        with pytest.raises(ValueError):
+            api.as_html_versions(["v1", "v2"], default="v3", overwrite=True, workers=workers)
+        api.as_html_versions(["v1"], overwrite=True, workers=workers)
+        assert sorted(os.listdir("site")) == ["index.html", "v1", "versions.json"]
+        assert len(os.listdir(reference_cache)) == 2
+
+
+def test_as_archive(temporary_dir, project_dir, chdir):
+    archive_file = os.path.join(temporary_dir, "docs.tar.gz")
+    with chdir(temporary_dir):
+        api.as_archive(project_dir, archive_file=archive_file, prefix="portray-docs")
+        assert os.listdir(temporary_dir) == ["docs.tar.gz"]  # no output directory was written
+
+        with tarfile.open(archive_file) as tar:
+            names = tar.getnames()
+        assert names == sorted(names, key=lambda name: name.split("/"))
+        assert "portray-docs/index.html" in names
+        assert "portray-docs/reference/portray/api/index.html" in names
+
+        with pytest.raises(exceptions.DocumentationAlreadyExists):
+            api.as_archive(project_dir, archive_file=archive_file)
+        with pytest.raises(ValueError):
+            api.as_archive(project_dir, archive_file="docs.rar")
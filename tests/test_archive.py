@@ -0,0 +1,72 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+from portray import archive
+
+
+def _site(directory):
+    site = os.path.join(directory, "site")
+    os.makedirs(os.path.join(site, "reference", "module"))
+    os.makedirs(os.path.join(site, "assets"))
+    for relative_path, contents in (
+        ("index.html", "<p>Home</p>"),
+        (os.path.join("reference", "module", "index.html"), "<p>Module</p>"),
+        (os.path.join("assets", "style.css"), "a{}"),
+        ("404.html", "<p>Missing</p>"),
+    ):
+        with open(os.path.join(site, relative_path), "w") as site_file:
+            site_file.write(contents)
+    return site
+
+
+@pytest.mark.parametrize("extension", [".tar.gz", ".tgz", ".zip"])
+def test_write(temporary_dir, extension):
+    site = _site(temporary_dir)
+    archive_file = os.path.join(temporary_dir, "site" + extension)
+    assert archive.write(site, archive_file, prefix="docs") == 4
+    with open(archive_file, "rb") as archived:
+        contents = archived.read()
+
+    # archiving the same website again (at another time) produces the exact same bytes
+    os.utime(os.path.join(site, "index.html"), (0, 0))
+    os.chmod(os.path.join(site, "404.html"), 0o600)
+    archive.write(site, archive_file, prefix="docs")
+    with open(archive_file, "rb") as archived:
+        assert archived.read() == contents
+    assert sorted(os.listdir(temporary_dir)) == sorted(["site", os.path.basename(archive_file)])
+
+    expected_names = [
+        "docs/",
+        "docs/404.html",
+        "docs/assets/",
+        "docs/assets/style.css",
+        "docs/index.html",
+        "docs/reference/",
+        "docs/reference/module/",
+        "docs/reference/module/index.html",
+    ]
+    if extension == ".zip":
+        with zipfile.ZipFile(io.BytesIO(contents)) as zip_file:
+            assert zip_file.namelist() == expected_names
+            assert zip_file.read("docs/reference/module/index.html") == b"<p>Module</p>"
+    else:
+        with tarfile.open(fileobj=io.BytesIO(contents)) as tar:
+            assert tar.getnames() == [name.rstrip("/") for name in expected_names]
+            member = tar.getmember("docs/404.html")
+            assert (member.mode, member.mtime, member.uid) == (0o644, 315532800, 0)
+            assert tar.extractfile("docs/index.html").read() == b"<p>Home</p>"
+
+
+def test_format_of():
+    assert archive.format_of("site.TAR.GZ") == "tar.gz"
+    assert archive.format_of("site.zip") == "zip"
+    with pytest.raises(ValueError):
+        archive.format_of("site.rar")
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        with pytest.raises(ImportError):
+            archive.format_of("site.tar.zst")
@@ -0,0 +1,46 @@
+import json
+import os
+
+from portray import config, render
+
+from benchmarks import project, run
+
+ONLY = ["config.project", "render._nested_docs"]
+
+
+def test_generate_project(temporary_dir):
+    size = project.SIZES["small"]
+    project.generate(temporary_dir, size)
+
+    modules = [
+        file_name
+        for _, _, file_names in os.walk(os.path.join(temporary_dir, project.PACKAGE))
+        for file_name in file_names
+        if file_name.startswith("module_")
+    ]
+    assert len(modules) == size.modules
+    assert len(os.listdir(os.path.join(temporary_dir, "assets_0"))) == size.assets
+
+    project_config = config.project(temporary_dir, "pyproject.toml")
+    assert project_config["modules"] == [project.PACKAGE]
+    nav = render._nested_docs(os.path.join(temporary_dir, "docs"), temporary_dir, project_config)
+    assert sum(len(section) for item in nav for section in item.values()) == size.pages
+
+
+def test_run_and_compare_against_baseline(temporary_dir):
+    results_file = os.path.join(temporary_dir, "results.json")
+    assert run.main(["--size", "tiny", "--repeat", "1", "--output", results_file, *_only()]) == 0
+    with open(results_file) as results:
+        baseline = json.load(results)
+    assert sorted(baseline["results"]) == sorted(ONLY)
+
+    baseline["results"]["config.project"]["median"] /= 1000
+    with open(results_file, "w") as results:
+        json.dump(baseline, results)
+    arguments = ["--size", "tiny", "--repeat", "1", "--baseline", results_file, *_only()]
+    assert run.main([*arguments, "--max-regression", "100"]) == 1
+    assert run.compare(baseline, baseline) == dict.fromkeys(ONLY, 1.0)
+
+
+def _only():
+    return [argument for name in ONLY for argument in ("--only", name)]
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+import hug
+
+HEAVY_DEPENDENCIES = ("git", "livereload", "mkdocs", "pdocs", "yaspin")
+
+
+def imported_modules(*arguments: str) -> dict:
+    """Returns the cumulative import time (in microseconds) of every module imported by
+    running `python -X importtime` with the given arguments.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *arguments],
+        cwd=os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)),
+        capture_output=True,
+        text=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line.split("|")
+            if cumulative.strip().isdigit():
+                modules[module.strip()] = int(cumulative)
+    return modules
+
+
+def test_cli_startup_skips_heavy_dependencies():
+    modules = imported_modules("-m", "portray", "--help")
+    assert "portray.cli" in modules
+
+    heavy_imports = sorted(
+        module for module in modules if module.split(".")[0] in HEAVY_DEPENDENCIES
+    )
+    assert not heavy_imports, f"`portray --help` imported {heavy_imports}"
+
+
+def test_cli_builds_through_daemon():
+    from portray import api, cli, daemon
+
+    commands = hug.API(cli.__name__).cli.commands
+    for command in daemon.COMMANDS:
+        assert commands[command].interface._function.__wrapped__ is getattr(api, command)
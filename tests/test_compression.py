@@ -0,0 +1,95 @@
+import gzip
+import os
+import shutil
+
+import pytest
+from portray import compression
+
+PAGE = "<html><body>" + "<p>Compressible documentation</p>" * 200 + "</body></html>"
+
+
+def _site(directory):
+    site = os.path.join(directory, "site")
+    os.makedirs(os.path.join(site, "search"))
+    with open(os.path.join(site, "index.html"), "w") as index:
+        index.write(PAGE)
+    with open(os.path.join(site, "search", "search_index.json"), "w") as search_index:
+        search_index.write('{"docs": []}' * 100)
+    with open(os.path.join(site, "tiny.css"), "w") as tiny:
+        tiny.write("a{}")
+    with open(os.path.join(site, "image.png"), "wb") as image:
+        image.write(b"\x89PNG" * 1024)
+    return site
+
+
+def test_precompress(temporary_dir):
+    site = _site(temporary_dir)
+    assert compression.precompress(site, ["gzip"]) == 2
+    with gzip.open(os.path.join(site, "index.html.gz"), "rt") as compressed:
+        assert compressed.read() == PAGE
+    assert os.path.isfile(os.path.join(site, "search", "search_index.json.gz"))
+    assert not os.path.exists(os.path.join(site, "tiny.css.gz"))  # compressing made it larger
+    assert not os.path.exists(os.path.join(site, "image.png.gz"))
+
+    # up to date siblings are left as they are
+    assert compression.precompress(site, ["gzip"]) == 0
+    with open(os.path.join(site, "index.html"), "w") as index:
+        index.write(PAGE.replace("Compressible", "Changed"))
+    os.utime(os.path.join(site, "index.html"), ns=(2**62, 2**62))
+    assert compression.precompress(site, ["gzip"]) == 1
+    with gzip.open(os.path.join(site, "index.html.gz"), "rt") as compressed:
+        assert "Changed" in compressed.read()
+
+
+def test_precompress_reuses_previous_siblings(temporary_dir):
+    previous_site = _site(temporary_dir)
+    compression.precompress(previous_site, ["gzip"])
+
+    site = os.path.join(temporary_dir, "new_site")
+    shutil.copytree(previous_site, site, ignore=shutil.ignore_patterns("*.gz"))
+    with open(os.path.join(site, "search", "search_index.json"), "w") as search_index:
+        search_index.write('{"docs": ["changed"]}' * 100)
+
+    assert compression.precompress(site, ["gzip"], previous_site) == 1
+    assert os.path.samefile(
+        os.path.join(site, "index.html.gz"), os.path.join(previous_site, "index.html.gz")
+    )
+    with gzip.open(os.path.join(site, "search", "search_index.json.gz"), "rt") as compressed:
+        assert "changed" in compressed.read()
+    assert compression.precompress(site, ["gzip"], previous_site) == 0
+
+
+def test_validate():
+    assert compression.validate("gzip") == ["gzip"]
+    assert compression.validate([]) == []
+    with pytest.raises(ValueError):
+        compression.validate(["zip"])
+
+
+def test_brotli(temporary_dir):
+    try:
+        import brotli
+    except ImportError:
+        with pytest.raises(ImportError):
+            compression.validate(["brotli"])
+        return
+
+    site = _site(temporary_dir)
+    assert compression.precompress(site, ["gzip", "brotli"]) == 4
+    with open(os.path.join(site, "index.html.br"), "rb") as compressed:
+        assert brotli.decompress(compressed.read()).decode() == PAGE
+
+
+def test_clear_timestamp(temporary_dir):
+    sitemaps = []
+    for timestamp in (1234567890, 1234567891):
+        path = os.path.join(temporary_dir, f"sitemap.{timestamp}.xml.gz")
+        with open(path, "wb") as compressed:
+            compressed.write(gzip.compress(b"<urlset></urlset>", mtime=timestamp))
+        compression.clear_timestamp(path)
+        with open(path, "rb") as compressed:
+            sitemaps.append(compressed.read())
+    assert sitemaps[0] == sitemaps[1]
+    assert gzip.decompress(sitemaps[0]) == b"<urlset></urlset>"
+
+    compression.clear_timestamp(os.path.join(temporary_dir, "missing.xml.gz"))
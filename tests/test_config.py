@@ -1,5 +1,6 @@
 import os
 
+import pytest
 from hypothesis_auto import auto_test
 from portray import config, exceptions
 
@@ -138,3 +139,127 @@ def test_repository_custom_config(project_dir):
 
 def test_repository_no_config_no_repository(temporary_dir):
     assert config.repository(temporary_dir) == {}
+
+
+def test_project_configuration_cache(temporary_dir, mocker):
+    config_path = os.path.join(temporary_dir, "pyproject.toml")
+    with open(config_path, "w") as config_file:
+        config_file.write('[tool.portray]\nmodules = ["cached"]\n')
+
+    mocker.spy(config, "_resolve_project")
+    with pytest.warns(UserWarning, match="repo_name"):
+        first = config.project(directory=temporary_dir, config_file="pyproject.toml")
+    assert config._resolve_project.call_count == 1
+
+    # an unchanged project is served from the cache, replaying any warnings resolution raised
+    with pytest.warns(UserWarning, match="repo_name"):
+        assert config.project(directory=temporary_dir, config_file="pyproject.toml") == first
+    assert config._resolve_project.call_count == 1
+
+    # overrides are part of the cache key
+    overridden = config.project(
+        directory=temporary_dir, config_file="pyproject.toml", output_dir="elsewhere"
+    )
+    assert overridden["output_dir"] == "elsewhere"
+    assert config._resolve_project.call_count == 2
+
+    # touching a file without changing it keeps the cache valid
+    os.utime(config_path, ns=(0, 0))
+    assert config.project(directory=temporary_dir, config_file="pyproject.toml") == first
+    assert config._resolve_project.call_count == 2
+
+    with open(config_path, "w") as config_file:
+        config_file.write('[tool.portray]\nmodules = ["changed"]\n')
+    assert config.project(directory=temporary_dir, config_file="pyproject.toml")["modules"] == [
+        "changed"
+    ]
+    assert config._resolve_project.call_count == 3
+
+    # as do the setup.py and git config files, even when they didn't exist before
+    os.makedirs(os.path.join(temporary_dir, ".git"))
+    with open(os.path.join(temporary_dir, ".git", "config"), "w") as git_config:
+        git_config.write('[remote "origin"]\n\turl = https://github.com/example/cached.git\n')
+    config.project(directory=temporary_dir, config_file="pyproject.toml")
+    assert config._resolve_project.call_count == 4
+
+
+def _write(path, contents):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as written_file:
+        written_file.write(contents)
+
+
+def test_repository_reads_git_config(temporary_dir, mocker):
+    main = os.path.join(temporary_dir, "main")
+    _write(
+        os.path.join(main, ".git", "config"),
+        "[core]\n\tbare = false\n"
+        '[remote "upstream"]\n\turl = https://github.com/other/project.git\n'
+        '[remote "origin"]  # the fork\n'
+        '\turl = "git@github.com:timothycrosley/portray.git" ; trailing comment\n'
+        "\tfetch = +refs/heads/*:refs/remotes/origin/*\n",
+    )
+    mocker.patch("git.Repo", side_effect=AssertionError("GitPython should not be needed"))
+    expected = {"edit_uri": "edit/main/", "repo_name": "portray", "repo_url": REPO_URL}
+    assert config.repository(main) == expected
+
+    # linked worktrees share the config of the repository they were created from
+    worktree = os.path.join(temporary_dir, "worktree")
+    _write(os.path.join(main, ".git", "worktrees", "worktree", "commondir"), "../..\n")
+    _write(os.path.join(worktree, ".git"), "gitdir: ../main/.git/worktrees/worktree\n")
+    assert config.repository(worktree) == expected
+
+    # submodules have their own config within the git directory of their parent
+    submodule = os.path.join(main, "submodule")
+    _write(
+        os.path.join(main, ".git", "modules", "submodule", "config"),
+        '[remote "origin"]\n\turl = https://github.com/timothycrosley/examples\n',
+    )
+    _write(os.path.join(submodule, ".git"), "gitdir: ../.git/modules/submodule\n")
+    assert config.repository(submodule)["repo_name"] == "examples"
+
+
+def test_repository_falls_back_to_gitpython(temporary_dir, mocker):
+    _write(
+        os.path.join(temporary_dir, ".git", "config"),
+        "[include]\n\tpath = remotes.gitconfig\n",
+    )
+    repo = mocker.patch("git.Repo")
+    repo.return_value.remote.return_value.url = REPO_URL
+    assert config.repository(temporary_dir)["repo_url"] == REPO_URL
+    repo.assert_called_once_with(temporary_dir)
+
+
+def test_git_config_string():
+    assert config._git_config_string(" value ") == "value"
+    assert config._git_config_string('" quoted # value " # comment') == " quoted # value "
+    assert config._git_config_string(r"escaped\"\\ value") == 'escaped"\\ value'
+    with pytest.raises(ValueError):
+        config._git_config_string('"unterminated')
+
+
+def test_find_projects(temporary_dir):
+    for project_file in (
+        "pyproject.toml",
+        "a/pyproject.toml",
+        "a/nested/pyproject.toml",
+        "b/c/setup.py",
+        "b/d/README.md",
+        "_internal/g/pyproject.toml",
+        ".hidden/pyproject.toml",
+        "node_modules/e/pyproject.toml",
+        "venv/pyvenv.cfg",
+        "venv/f/pyproject.toml",
+    ):
+        os.makedirs(os.path.dirname(os.path.join(temporary_dir, project_file)), exist_ok=True)
+        with open(os.path.join(temporary_dir, project_file), "w"):
+            pass
+
+    assert config.find_projects(temporary_dir) == [
+        os.path.join(temporary_dir, "_internal", "g"),
+        os.path.join(temporary_dir, "a"),
+        os.path.join(temporary_dir, "b", "c"),
+    ]
+    assert config.find_projects(os.path.join(temporary_dir, "b")) == [
+        os.path.join(temporary_dir, "b", "c")
+    ]
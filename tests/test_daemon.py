@@ -0,0 +1,142 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from portray import api, daemon, exceptions, render
+
+PROJECT_ROOT = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+
+
+@pytest.fixture()
+def running_daemon(temporary_dir, monkeypatch):
+    socket_path = os.path.join(temporary_dir, "daemon.sock")
+    monkeypatch.setenv("PORTRAY_DAEMON_SOCKET", socket_path)
+    process = subprocess.Popen(
+        [sys.executable, "-c", "from portray import daemon; daemon.serve()"],
+        env={**os.environ, "PYTHONPATH": PROJECT_ROOT},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while daemon.request("ping") is None:
+            assert process.poll() is None, "the daemon exited before listening"
+            assert time.monotonic() < deadline, "the daemon never started listening"
+            time.sleep(0.1)
+        yield process
+    finally:
+        daemon.request("stop")
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:  # pragma: no cover
+            process.kill()
+
+
+def test_no_daemon(temporary_dir, monkeypatch):
+    monkeypatch.setenv("PORTRAY_DAEMON_SOCKET", os.path.join(temporary_dir, "daemon.sock"))
+    assert daemon.request("ping") is None
+    assert not daemon.forward("as_html")
+    built = []
+
+    def as_html(directory: str = "", output_dir: str = "site") -> None:
+        built.append((directory, output_dir))
+
+    daemon.forwarded(as_html)("project", output_dir="docs")
+    assert built == [("project", "docs")]
+
+    with open(os.path.join(temporary_dir, "daemon.sock"), "w"):
+        pass  # a socket file without a daemon listening on it
+    assert daemon.request("ping") is None
+
+
+def test_daemon_timeouts(temporary_dir, monkeypatch):
+    monkeypatch.setattr(daemon, "TIMEOUT", 0.1)
+    monkeypatch.setattr(daemon, "RESPONSE_TIMEOUT", 0.1)
+
+    # a client that never sends its request doesn't block the daemon
+    daemon_end, client_end = socket.socketpair()
+    with daemon_end, client_end:
+        assert daemon._handle(daemon_end)
+
+    # and a daemon that never answers doesn't block commands, which don't build in-process
+    # either as it may still be building
+    socket_path = os.path.join(temporary_dir, "daemon.sock")
+    monkeypatch.setenv("PORTRAY_DAEMON_SOCKET", socket_path)
+    built = []
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(socket_path)
+        listener.listen()
+        accepted = []
+        accepting = threading.Thread(target=lambda: accepted.append(listener.accept()))
+        accepting.start()
+        with pytest.raises(exceptions.DaemonNotResponding):
+            daemon.forwarded(lambda **arguments: built.append(arguments))(output_dir="site")
+        accepting.join()
+        accepted[0][0].close()
+    assert not built
+
+
+def test_daemon_builds(running_daemon, temporary_dir, chdir, capsys, monkeypatch):
+    assert daemon.request("ping")["pid"] == running_daemon.pid
+    with pytest.raises(exceptions.DaemonAlreadyRunning):
+        daemon.serve(warm=False)
+
+    project_dir = os.path.join(temporary_dir, "project")
+    os.makedirs(project_dir)
+    with open(os.path.join(project_dir, "README.md"), "w") as readme:
+        readme.write("# Daemon built\n")
+    with open(os.path.join(project_dir, "daemon_module.py"), "w") as module:
+        module.write('"""The first version."""\n')
+
+    as_html = daemon.forwarded(api.as_html)
+    with chdir(project_dir):
+        as_html(modules=["daemon_module"])
+        assert "Documentation successfully generated" in capsys.readouterr().out
+        assert "daemon_module" not in sys.modules  # built by the daemon, not in this process
+        with pytest.raises(exceptions.DocumentationAlreadyExists):
+            as_html(modules=["daemon_module"])
+
+        with open(os.path.join(project_dir, "daemon_module.py"), "w") as module:
+            module.write('"""The second version."""\n')
+        as_html(modules=["daemon_module"], overwrite=True)
+        with open(os.path.join("site", "reference", "daemon_module", "index.html")) as page:
+            assert "The second version." in page.read()
+
+    # builds use the environment variables and `sys.path` of the requesting process
+    library_dir = os.path.join(temporary_dir, "library")
+    os.makedirs(library_dir)
+    with open(os.path.join(library_dir, "daemon_library.py"), "w") as module:
+        module.write('"""Found on the caller\'s path."""\n')
+    monkeypatch.syspath_prepend(library_dir)
+    cache_home = os.path.join(temporary_dir, "cache_home")
+    monkeypatch.setenv("PORTRAY_CACHE_HOME", cache_home)
+    with chdir(project_dir):
+        as_html(modules=["daemon_library"], output_dir="library_site")
+        with open(
+            os.path.join("library_site", "reference", "daemon_library", "index.html")
+        ) as page:
+            assert "Found on the caller" in page.read()
+    assert os.listdir(os.path.join(cache_home, "projects"))
+    assert "daemon_library" not in sys.modules
+
+    with pytest.raises(exceptions.NoProjectFound):
+        as_html(os.path.join(temporary_dir, "missing"))
+    with pytest.raises(exceptions.DaemonBuildFailed):
+        as_html(project_dir, modules=["missing_module"], overwrite=True)
+    assert daemon.request("ping")["pid"] == running_daemon.pid
+
+    # the API itself always builds in-process
+    with render.isolated_imports(project_dir):
+        api.as_html(
+            project_dir,
+            modules=["daemon_module"],
+            output_dir=os.path.join(temporary_dir, "api_site"),
+        )
+        assert "daemon_module" in sys.modules
+
+    api.daemon(stop=True)
+    running_daemon.wait(timeout=30)
+    assert not os.path.exists(os.environ["PORTRAY_DAEMON_SOCKET"])
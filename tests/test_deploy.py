@@ -0,0 +1,85 @@
+import os
+
+import pytest
+from git import Repo
+from portray import deploy, exceptions
+
+
+def _site(site_dir, files):
+    for path, contents in files.items():
+        path = os.path.join(site_dir, *path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as site_file:
+            site_file.write(contents)
+
+
+def _deployed(remote):
+    return {
+        blob.path: blob.data_stream.read().decode("utf8")
+        for blob in remote.commit("gh-pages").tree.traverse()
+        if blob.type == "blob"
+    }
+
+
+def test_github_pages(temporary_dir):
+    remote = Repo.init(os.path.join(temporary_dir, "remote.git"), bare=True)
+    project = Repo.init(os.path.join(temporary_dir, "project"))
+    with project.config_writer() as git_config:
+        git_config.set_value("user", "name", "portray")
+        git_config.set_value("user", "email", "portray@example.com")
+    project.create_remote("origin", remote.working_dir)
+    site_dir = os.path.join(temporary_dir, "site")
+    _site(site_dir, {"index.html": "home", "guide": "guide", "assets/style.css": "css"})
+
+    first = deploy.github_pages(site_dir, project.working_tree_dir, "First deploy")
+    assert remote.commit("gh-pages").hexsha == first
+    assert _deployed(remote) == {
+        ".nojekyll": "",
+        "index.html": "home",
+        "guide": "guide",
+        "assets/style.css": "css",
+    }
+    assert deploy.blob_id(os.path.join(site_dir, "index.html")) == (
+        remote.commit("gh-pages").tree["index.html"].hexsha
+    )
+
+    # nothing changed, so nothing is committed or pushed
+    assert deploy.github_pages(site_dir, project.working_tree_dir, "Unchanged") is None
+    assert remote.commit("gh-pages").hexsha == first
+
+    os.remove(os.path.join(site_dir, "guide"))
+    _site(site_dir, {"index.html": "new home", "guide/index.html": "guide"})
+    second = deploy.github_pages(site_dir, project.working_tree_dir, "Second deploy")
+    assert [commit.hexsha for commit in remote.iter_commits("gh-pages")] == [second, first]
+    assert _deployed(remote) == {
+        ".nojekyll": "",
+        "index.html": "new home",
+        "guide/index.html": "guide",
+        "assets/style.css": "css",
+    }
+    assert remote.commit("gh-pages").message.strip() == "Second deploy"
+    assert not project.is_dirty(untracked_files=True)  # the working tree and index are untouched
+
+
+def test_check_version(temporary_dir):
+    remote = Repo.init(os.path.join(temporary_dir, "remote.git"), bare=True)
+    project = Repo.init(os.path.join(temporary_dir, "project"))
+    with project.config_writer() as git_config:
+        git_config.set_value("user", "name", "portray")
+        git_config.set_value("user", "email", "portray@example.com")
+    project.create_remote("origin", remote.working_dir)
+    assert deploy.current_sha(project.working_tree_dir) == ""
+    deploy.check_version(project.working_tree_dir, "1.3.1")  # never deployed
+
+    site_dir = os.path.join(temporary_dir, "site")
+    _site(site_dir, {"index.html": "home"})
+    deploy.github_pages(
+        site_dir, project.working_tree_dir, "Deployed 1a2b3c4 with MkDocs version: 1.3.1"
+    )
+    deploy.check_version(project.working_tree_dir, "1.3.1")
+    deploy.check_version(project.working_tree_dir, "1.10.0")
+    with pytest.raises(exceptions.NewerVersionDeployed):
+        deploy.check_version(project.working_tree_dir, "1.3.0")
+
+    project.index.commit("Initial commit")
+    assert deploy.current_sha(project.working_tree_dir) == project.head.commit.hexsha[:7]
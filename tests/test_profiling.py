@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+
+from portray import profiling
+
+
+def test_phases_are_only_recorded_when_recording():
+    with profiling.phase("ignored"):
+        assert not profiling.enabled()
+
+    with profiling.recording() as phases:
+        assert profiling.enabled()
+        with profiling.phase("build", output_dir="site"):
+            with profiling.phase("stage"):
+                pass
+            profiling.adopt([{"name": "pdocs module", "parent": None, "depth": 0}])
+    assert not profiling.enabled()
+
+    assert [(phase["name"], phase["parent"], phase["depth"]) for phase in phases] == [
+        ("build", None, 0),
+        ("stage", "build", 1),
+        ("pdocs module", "build", 1),
+    ]
+    assert phases[0]["details"] == {"output_dir": "site"}
+    for phase in phases[:2]:
+        assert phase["wall_time"] >= 0 and phase["cpu_time"] >= 0
+        assert phase["rss"] > 0 and phase["process_peak_rss"] > 0
+
+
+def test_phase_memory_is_measured_per_phase():
+    size = 256 * 1024 * 1024
+    with profiling.recording() as phases:
+        with profiling.phase("allocating"):
+            allocated = b"x" * size
+            del allocated
+        with profiling.phase("idle"):
+            pass
+
+    allocating, idle = phases
+    assert allocating["peak_rss_increase"] >= size // 2
+    # the process's peak is still that of the earlier phase, which isn't this phase's doing
+    assert idle["peak_rss_increase"] == 0
+    assert idle["process_peak_rss"] == allocating["process_peak_rss"]
+    assert idle["rss"] < allocating["process_peak_rss"]
+
+
+def test_profiled(temporary_dir, capsys):
+    report_file = os.path.join(temporary_dir, "report.json")
+    trace_file = os.path.join(temporary_dir, "trace.json")
+    with profiling.profiled(False, report_file, trace_file) as save:
+        save()
+    assert not os.path.exists(report_file)
+
+    with profiling.profiled(True, report_file, trace_file) as save:
+        with profiling.phase("first"):
+            pass
+        save()
+        with open(report_file) as report:
+            assert [phase["name"] for phase in json.load(report)["phases"]] == ["first"]
+        with profiling.phase("second"):
+            pass
+
+    with open(report_file) as report:
+        assert [phase["name"] for phase in json.load(report)["phases"]] == ["first", "second"]
+    with open(trace_file) as trace:
+        events = json.load(trace)["traceEvents"]
+    assert [(event["name"], event["ph"]) for event in events] == [("first", "X"), ("second", "X")]
+    assert "second" in capsys.readouterr().out
+
+
+def test_imports_measured(temporary_dir):
+    package_dir = os.path.join(temporary_dir, "measured_package")
+    os.makedirs(package_dir)
+    with open(os.path.join(package_dir, "__init__.py"), "w") as package_init:
+        package_init.write("from measured_package import heavy\n")
+    with open(os.path.join(package_dir, "heavy.py"), "w") as heavy:
+        heavy.write('import time\n\ntime.sleep(0.05)\nDATA = b"x" * 8 * 1024 * 1024\n')
+
+    sys.path.append(temporary_dir)
+    try:
+        with profiling.recording() as phases:
+            with profiling.phase("pdocs measured_package"), profiling.imports_measured():
+                import measured_package
+    finally:
+        sys.path.remove(temporary_dir)
+        for module in ("measured_package", "measured_package.heavy"):
+            sys.modules.pop(module, None)
+    assert measured_package.__loader__ is measured_package.__spec__.loader
+    assert type(measured_package.__loader__).__name__ == "SourceFileLoader"
+
+    heavy_import, package_import = profiling.imports(phases)
+    assert heavy_import["module"] == "measured_package.heavy"
+    assert heavy_import["phase"] == "pdocs measured_package"
+    assert heavy_import["self_time"] >= 0.05
+    assert heavy_import["self_rss_increase"] >= 4 * 1024 * 1024
+    assert package_import["module"] == "measured_package"
+    assert package_import["wall_time"] >= heavy_import["wall_time"]
+    assert package_import["self_time"] < 0.05
+
+    assert "measured_package.heavy" in profiling.summary(phases)
+    assert "import measured_package" not in profiling.summary(phases)
@@ -0,0 +1,163 @@
+import os
+import sys
+
+import pytest
+from portray import cache, config, exceptions, reference, render
+
+PACKAGE_INIT = '''"""A package documented statically.
+
+With a longer description.
+"""
+from .shapes import Shape
+
+__all__ = ["Shape", "VERSION", "area"]
+
+VERSION = "1.0"
+"""The version of the package"""
+
+
+def area(shape: Shape, scale: float = 1.0, *, rounded=False) -> float:
+    """Returns the area of shape.
+
+    Args:
+        shape: The shape to measure.
+        scale: How much to scale it by.
+    """
+    return shape.area() * scale
+
+
+def undocumented():
+    pass
+'''
+
+SHAPES = '''"""Shapes and the errors of measuring them."""
+import dataclasses
+from typing import List
+
+try:
+    import math
+except ImportError:  # pragma: no cover
+    math = None
+
+SIDES = {"square": 4, "triangle": 3}
+"""The number of sides of every shape"""
+
+_PRIVATE = 1
+
+
+class MeasurementError(Exception):
+    pass
+
+
+class Shape:
+    """A shape."""
+
+    kind = "shape"
+    """The kind of shape"""
+
+    def __init__(self, name: str, sides: int = 0, /, *points, **options):
+        self.name = name
+
+    @property
+    def label(self) -> str:
+        """The label of the shape"""
+        return self.name
+
+    def area(self) -> float:
+        """Returns the area of the shape."""
+        return 0.0
+
+    @staticmethod
+    def unit() -> "Shape":
+        """Returns the unit shape."""
+        return Shape("unit")
+
+    @classmethod
+    def named(cls, name: str, *, sides: int = 4) -> "Shape":
+        """Returns a shape with the given name."""
+        return cls(name, sides)
+
+
+class Square(Shape):
+    def area(self) -> float:
+        return 1.0
+
+    def corners(self, rounded: bool = False) -> List[int]:
+        """Returns the corners of the square."""
+        return [1, 2, 3, 4]
+
+
+@dataclasses.dataclass
+class Point:
+    """A point."""
+
+    x: int
+    y: int = 0
+'''
+
+
+def _static_package(directory, name):
+    package_dir = os.path.join(directory, name)
+    os.makedirs(os.path.join(package_dir, "sub"))
+    with open(os.path.join(package_dir, "__init__.py"), "w") as package_init:
+        package_init.write(PACKAGE_INIT)
+    with open(os.path.join(package_dir, "shapes.py"), "w") as shapes:
+        shapes.write(SHAPES)
+    with open(os.path.join(package_dir, "_private.py"), "w") as private:
+        private.write('def private():\n    """A private function"""\n')
+    with open(os.path.join(package_dir, "sub", "__init__.py"), "w") as sub_init:
+        sub_init.write('"""A subpackage"""\n')
+    with open(os.path.join(package_dir, "sub", "nested.py"), "w") as nested:
+        nested.write('def nested(value=(1, "two")):\n    """A nested function"""\n')
+
+
+def test_as_markdown_matches_pdocs(temporary_dir):
+    _static_package(temporary_dir, "static_package")
+    pdocs_dir = os.path.join(temporary_dir, "pdocs")
+    static_dir = os.path.join(temporary_dir, "static")
+    pdocs_config = {**config.PDOCS_DEFAULTS, "modules": ["static_package"]}
+
+    sys.path.append(temporary_dir)
+    try:
+        render.pdocs({**pdocs_config, "output_dir": static_dir}, backend="static")
+        assert "static_package" not in sys.modules
+        render.pdocs({**pdocs_config, "output_dir": pdocs_dir})
+    finally:
+        sys.path.remove(temporary_dir)
+        for module in [module for module in sys.modules if module.startswith("static_package")]:
+            del sys.modules[module]
+
+    pdocs_files = sorted(cache.files(pdocs_dir))
+    assert pdocs_files == sorted(cache.files(static_dir))
+    assert len(pdocs_files) == 4
+    for pdocs_file in pdocs_files:
+        with open(os.path.join(pdocs_dir, pdocs_file)) as pdocs_doc:
+            with open(os.path.join(static_dir, pdocs_file)) as static_doc:
+                assert static_doc.read() == pdocs_doc.read()
+
+
+def test_never_imports(temporary_dir):
+    with open(os.path.join(temporary_dir, "explosive_module.py"), "w") as module:
+        module.write(
+            'raise RuntimeError("imported")\n\n\n'
+            'def documented(value: int = 1) -> int:\n    """Documented, not imported"""\n'
+        )
+
+    output_dir = os.path.join(temporary_dir, "reference")
+    reference.as_markdown([os.path.join(temporary_dir, "explosive_module.py")], output_dir)
+    with open(os.path.join(output_dir, "explosive_module.md")) as module_doc:
+        module_doc = module_doc.read()
+    assert "def documented(\n    value: int = 1\n) -> int" in module_doc
+    assert "Documented, not imported" in module_doc
+    assert "explosive_module" not in sys.modules
+
+    with pytest.raises(exceptions.DocumentationAlreadyExists):
+        reference.as_markdown([os.path.join(temporary_dir, "explosive_module.py")], output_dir)
+    with pytest.raises(exceptions.ModuleNotFound):
+        reference.as_markdown(["missing_static_module"], output_dir, overwrite=True)
+
+
+def test_validate():
+    assert reference.validate("static") == "static"
+    with pytest.raises(ValueError):
+        reference.validate("sphinx")
@@ -1,9 +1,572 @@
+import gzip
+import json
+import os
+import sys
+
+import mkdocs.commands.build
+import mkdocs.config.defaults
+import mkdocs.exceptions
+import pytest
 from hypothesis_auto import auto_test
-from portray import render
+from portray import cache, compression, config, exceptions, profiling, render
 
 
 def test_mkdocs_config():
     auto_test(
         render._mkdocs_config,
-        auto_allow_exceptions_=(render._mkdocs_exceptions.ConfigurationError,),
+        auto_allow_exceptions_=(mkdocs.exceptions.ConfigurationError,),
+    )
+
+
+def _incremental_project(directory):
+    with open(os.path.join(directory, "README.md"), "w") as readme:
+        readme.write("# Incremental Project\n")
+    os.mkdir(os.path.join(directory, "docs"))
+    with open(os.path.join(directory, "docs", "guide.md"), "w") as guide:
+        guide.write("# Guide\n")
+    with open(os.path.join(directory, "incremental_module.py"), "w") as module:
+        module.write('def documented():\n    """Documented function"""\n')
+
+
+def _incremental_config(directory):
+    return config.project(
+        directory=directory,
+        config_file="pyproject.toml",
+        modules=["incremental_module"],
+        output_dir=os.path.join(directory, "site"),
+        incremental=True,
+    )
+
+
+def test_incremental_documentation(temporary_dir, mocker):
+    _incremental_project(temporary_dir)
+    render.documentation(_incremental_config(temporary_dir))
+    assert os.path.isfile(os.path.join(temporary_dir, "site", "index.html"))
+    assert os.path.isfile(os.path.join(temporary_dir, ".portray-cache", "manifest.json"))
+
+    # Without overwrite enabled existing documentation is still protected
+    with pytest.raises(exceptions.DocumentationAlreadyExists):
+        render.documentation(_incremental_config(temporary_dir))
+
+    # A rebuild with no changes does no pdocs or MkDocs work at all
+    mocker.spy(render, "pdocs")
+    mocker.spy(render, "mkdocs")
+    render.documentation(_incremental_config(temporary_dir), overwrite=True)
+    render.pdocs.assert_not_called()
+    render.mkdocs.assert_not_called()
+
+    # Changing a Markdown page reruns MkDocs, but not pdocs
+    with open(os.path.join(temporary_dir, "docs", "guide.md"), "w") as guide:
+        guide.write("# Guide\n\nUpdated guide content\n")
+    render.documentation(_incremental_config(temporary_dir), overwrite=True)
+    render.pdocs.assert_not_called()
+    render.mkdocs.assert_called_once()
+    with open(os.path.join(temporary_dir, "site", "docs", "guide", "index.html")) as guide_html:
+        assert "Updated guide content" in guide_html.read()
+
+    # Changing a documented module regenerates its reference documentation
+    with open(os.path.join(temporary_dir, "incremental_module.py"), "a") as module:
+        module.write('\n\ndef also_documented():\n    """Also documented"""\n')
+    render.documentation(_incremental_config(temporary_dir), overwrite=True)
+    render.pdocs.assert_called_once()
+    assert render.mkdocs.call_count == 2
+
+    # Removed pages are removed from the generated website
+    os.remove(os.path.join(temporary_dir, "docs", "guide.md"))
+    render.documentation(_incremental_config(temporary_dir), overwrite=True)
+    assert not os.path.exists(os.path.join(temporary_dir, "site", "docs", "guide"))
+
+
+def test_incremental_documentation_without_readme(temporary_dir):
+    _incremental_project(temporary_dir)
+    os.remove(os.path.join(temporary_dir, "README.md"))
+    for _ in range(3):
+        render.documentation(_incremental_config(temporary_dir), overwrite=True)
+        with open(os.path.join(temporary_dir, "site", "index.html")) as index_html:
+            assert "Nothing here" in index_html.read()
+
+
+def test_reference_documentation_cache(temporary_dir, mocker):
+    _incremental_project(temporary_dir)
+    with open(os.path.join(temporary_dir, "other_incremental_module.py"), "w") as module:
+        module.write('def other():\n    """Other function"""\n')
+
+    def project_config():
+        return config.project(
+            directory=temporary_dir,
+            config_file="pyproject.toml",
+            modules=["incremental_module", "other_incremental_module"],
+            incremental=True,
+        )
+
+    mocker.spy(render, "pdocs")
+    with render.documentation_in_temp_folder(project_config()) as (input_dir, _):
+        assert os.path.isfile(os.path.join(input_dir, "reference", "incremental_module.md"))
+    render.pdocs.assert_called_once()
+
+    # Unchanged modules are reused from the cache, even for temporary builds
+    with render.documentation_in_temp_folder(project_config()) as (input_dir, _):
+        assert os.path.isfile(os.path.join(input_dir, "reference", "other_incremental_module.md"))
+    render.pdocs.assert_called_once()
+
+    # Only modules whose source changed are rendered again
+    with open(os.path.join(temporary_dir, "other_incremental_module.py"), "a") as module:
+        module.write('\n\ndef changed():\n    """Changed function"""\n')
+    with render.documentation_in_temp_folder(project_config()) as (input_dir, _):
+        with open(os.path.join(input_dir, "reference", "other_incremental_module.md")) as doc:
+            assert "Changed function" in doc.read()
+    assert render.pdocs.call_count == 2
+    assert render.pdocs.call_args[0][0]["modules"] == ["other_incremental_module"]
+
+
+@pytest.mark.parametrize("backend", ("pdocs", "static"))
+def test_reference_documentation_cache_per_page(temporary_dir, mocker, backend):
+    _incremental_project(temporary_dir)
+    package_dir = os.path.join(temporary_dir, "cached_package")
+    os.makedirs(package_dir)
+    with open(os.path.join(package_dir, "__init__.py"), "w") as package_init:
+        package_init.write('"""A package cached page by page"""\n')
+    for name in ("first", "second"):
+        with open(os.path.join(package_dir, f"{name}.py"), "w") as module:
+            module.write(f'def {name}():\n    """The {name} function"""\n')
+
+    def project_config():
+        return config.project(
+            directory=temporary_dir,
+            config_file="pyproject.toml",
+            modules=["cached_package"],
+            incremental=True,
+            reference_backend=backend,
+        )
+
+    mocker.spy(render, "pdocs")
+    with render.isolated_imports(temporary_dir):
+        with render.documentation_in_temp_folder(project_config()) as (input_dir, _):
+            assert os.path.isfile(
+                os.path.join(input_dir, "reference", "cached_package", "first.md")
+            )
+        assert sorted(render.pdocs.call_args[0][5]) == [
+            ("cached_package", False),
+            ("cached_package.first", True),
+            ("cached_package.second", True),
+        ]
+
+        # Only the changed submodule and the package containing it are rendered again
+        with open(os.path.join(package_dir, "second.py"), "a") as module:
+            module.write('\n\ndef changed():\n    """Changed function"""\n')
+        with render.documentation_in_temp_folder(project_config()) as (input_dir, _):
+            reference_dir = os.path.join(input_dir, "reference", "cached_package")
+            with open(os.path.join(reference_dir, "second.md")) as doc:
+                assert "Changed function" in doc.read()
+            with open(os.path.join(reference_dir, "first.md")) as doc:
+                assert "The first function" in doc.read()
+            with open(os.path.join(reference_dir, "index.md")) as doc:
+                assert "A package cached page by page" in doc.read()
+        assert render.pdocs.call_count == 2
+        assert render.pdocs.call_args[0][0]["modules"] == ["cached_package"]
+        assert sorted(render.pdocs.call_args[0][5]) == [
+            ("cached_package", False),
+            ("cached_package.second", True),
+        ]
+
+
+def test_page_tasks(temporary_dir, monkeypatch):
+    package_dir = os.path.join(temporary_dir, "split_package")
+    for directory in ("subpackage", "_private_package", "empty_package"):
+        os.makedirs(os.path.join(package_dir, directory))
+    for path in (
+        "__init__.py",
+        "module.py",
+        "_private.py",
+        "subpackage/__init__.py",
+        "subpackage/nested.py",
+        "_private_package/__init__.py",
+        "empty_package/__init__.py",
+    ):
+        with open(os.path.join(package_dir, path), "w"):
+            pass
+
+    # found without importing anything, as every way of splitting pages sees the same ones
+    monkeypatch.syspath_prepend(temporary_dir)
+    assert render._submodules("split_package") == [
+        "split_package.empty_package",
+        "split_package.module",
+        "split_package.subpackage",
+        "split_package.subpackage.nested",
+    ]
+    assert render._pdocs_tasks("split_package") == [
+        ("split_package", False),
+        ("split_package.empty_package", True),
+        ("split_package.module", True),
+        ("split_package.subpackage", True),
+    ]
+    assert render._streamed_pdocs_tasks("split_package") == [
+        ("split_package", False),
+        ("split_package.empty_package", True),
+        ("split_package.module", True),
+        ("split_package.subpackage", False),
+        ("split_package.subpackage.nested", True),
+    ]
+    assert render._pdocs_tasks(package_dir) == [(package_dir, True)]
+    assert render._submodules(package_dir) == []
+
+
+@pytest.mark.parametrize(
+    "options", ({"workers": 2}, {"streaming": True}, {"streaming": True, "memory_limit": 1})
+)
+def test_parallel_pdocs(temporary_dir, options):
+    package_dir = os.path.join(temporary_dir, "parallel_package")
+    os.makedirs(os.path.join(package_dir, "subpackage"))
+    with open(os.path.join(package_dir, "__init__.py"), "w") as package_init:
+        package_init.write(
+            '"""A package documented in parallel"""\n'
+            "from parallel_package.module import Base\n\n\n"
+            'class Derived(Base):\n    """A class derived from one of a submodule"""\n'
+        )
+    with open(os.path.join(package_dir, "module.py"), "w") as module:
+        module.write(
+            'def function():\n    """A function"""\n\n\nclass Base:\n    """A base class"""\n'
+        )
+    with open(os.path.join(package_dir, "_private.py"), "w") as module:
+        module.write('def private():\n    """A private function"""\n')
+    with open(os.path.join(package_dir, "subpackage", "__init__.py"), "w") as subpackage_init:
+        subpackage_init.write('"""A subpackage"""\n')
+    with open(os.path.join(package_dir, "subpackage", "nested.py"), "w") as module:
+        module.write('class Nested:\n    """A nested class"""\n')
+
+    sys.path.append(temporary_dir)
+    try:
+        serial_dir = os.path.join(temporary_dir, "serial")
+        parallel_dir = os.path.join(temporary_dir, "parallel")
+        pdocs_config = {**config.PDOCS_DEFAULTS, "modules": ["parallel_package"]}
+        render.pdocs({**pdocs_config, "output_dir": parallel_dir}, **options)
+        # streamed modules are released once rendered
+        assert "parallel_package.subpackage.nested" not in sys.modules
+        render.pdocs({**pdocs_config, "output_dir": serial_dir})
+    finally:
+        sys.path.remove(temporary_dir)
+        for module in [module for module in sys.modules if module.startswith("parallel_package")]:
+            del sys.modules[module]
+
+    serial_files = sorted(cache.files(serial_dir))
+    assert serial_files == sorted(cache.files(parallel_dir))
+    assert len(serial_files) == 4
+    for serial_file in serial_files:
+        with open(os.path.join(serial_dir, serial_file)) as serial_doc:
+            with open(os.path.join(parallel_dir, serial_file)) as parallel_doc:
+                assert serial_doc.read() == parallel_doc.read()
+
+
+@pytest.mark.parametrize("incremental", (False, True))
+def test_symlink_staging(temporary_dir, incremental):
+    _incremental_project(temporary_dir)
+    os.mkdir(os.path.join(temporary_dir, "art"))
+    with open(os.path.join(temporary_dir, "art", "logo.svg"), "w") as logo:
+        logo.write("<svg></svg>")
+
+    project_config = _incremental_config(temporary_dir)
+    project_config["incremental"] = incremental
+    project_config["staging"] = "symlink"
+    render.documentation(project_config)
+    with open(os.path.join(temporary_dir, "site", "art", "logo.svg")) as logo:
+        assert logo.read() == "<svg></svg>"
+    with open(os.path.join(temporary_dir, "docs", "guide.md")) as guide:
+        assert guide.read() == "# Guide\n"
+
+    # the placeholder home page replaces the link to a deleted README, not writing through it
+    os.remove(os.path.join(temporary_dir, "README.md"))
+    render.documentation(project_config, overwrite=True)
+    assert not os.path.lexists(os.path.join(temporary_dir, "README.md"))
+    with open(os.path.join(temporary_dir, "site", "index.html")) as index_html:
+        assert "Nothing here" in index_html.read()
+
+
+@pytest.mark.parametrize("incremental", (False, True))
+def test_only_documentation(temporary_dir, incremental):
+    _incremental_project(temporary_dir)
+    with open(os.path.join(temporary_dir, "docs", "other.md"), "w") as other:
+        other.write("# Other\n\nSee [the guide](guide.md)\n")
+    package_dir = os.path.join(temporary_dir, "only_package")
+    os.mkdir(package_dir)
+    with open(os.path.join(package_dir, "__init__.py"), "w") as package_init:
+        package_init.write('"""A package previewed in part"""\n')
+    for module_name in ("previewed", "skipped"):
+        with open(os.path.join(package_dir, f"{module_name}.py"), "w") as module:
+            module.write(f'def {module_name}():\n    """A {module_name} function"""\n')
+
+    def build(only):
+        project_config = config.project(
+            directory=temporary_dir,
+            config_file="pyproject.toml",
+            modules=["incremental_module", "only_package"],
+            output_dir=os.path.join(temporary_dir, "site"),
+            incremental=incremental,
+            staging="hardlink",
+        )
+        project_config["only"] = only
+        with render.isolated_imports(temporary_dir):
+            render.documentation(project_config, overwrite=True)
+
+    def page(*path):
+        with open(os.path.join(temporary_dir, "site", *path, "index.html")) as page_html:
+            return page_html.read()
+
+    build(["docs/other.md", "only_package.previewed"])
+    assert "See " in page("docs", "other")
+    assert "left out of this preview" in page("docs", "guide")
+    assert "left out of this preview" in page()
+    assert "A previewed function" in page("reference", "only_package", "previewed")
+    assert "left out of this preview" in page("reference", "only_package")
+    assert "left out of this preview" in page("reference", "incremental_module")
+    assert not os.path.exists(
+        os.path.join(temporary_dir, "site", "reference", "only_package", "skipped")
+    )
+    # placeholders replace staged pages, rather than writing through links to their source
+    with open(os.path.join(temporary_dir, "docs", "guide.md")) as guide:
+        assert guide.read() == "# Guide\n"
+
+    build([])
+    assert "left out of this preview" not in page("docs", "guide")
+    assert "Incremental Project" in page()
+    assert "A skipped function" in page("reference", "only_package", "skipped")
+    assert "Documented function" in page("reference", "incremental_module")
+
+
+@pytest.mark.parametrize("exchange", (True, False))
+def test_atomic_output_swap_and_rollback(temporary_dir, mocker, exchange):
+    if not exchange:
+        mocker.patch("portray.render._exchange", return_value=False)
+    _incremental_project(temporary_dir)
+    site_dir = os.path.join(temporary_dir, "site")
+
+    def build():
+        project_config = _incremental_config(temporary_dir)
+        project_config["incremental"] = False
+        project_config["keep_previous_output"] = True
+        render.documentation(project_config, overwrite=True)
+        return project_config
+
+    with pytest.raises(exceptions.NoPreviousDocumentation):
+        render.rollback(build())
+
+    with open(os.path.join(temporary_dir, "docs", "guide.md"), "w") as guide:
+        guide.write("# Guide\n\nSecond generation\n")
+    project_config = build()
+
+    guide_html = os.path.join("docs", "guide", "index.html")
+    with open(os.path.join(site_dir, guide_html)) as guide:
+        assert "Second generation" in guide.read()
+    with open(os.path.join(f"{site_dir}.previous", guide_html)) as guide:
+        assert "Second generation" not in guide.read()
+    assert not [name for name in os.listdir(temporary_dir) if name.startswith(".site.")]
+
+    render.rollback(project_config)
+    with open(os.path.join(site_dir, guide_html)) as guide:
+        assert "Second generation" not in guide.read()
+    with open(os.path.join(f"{site_dir}.previous", guide_html)) as guide:
+        assert "Second generation" in guide.read()
+
+
+def test_incremental_output_across_filesystems(temporary_dir, mocker):
+    mocker.patch("portray.render._same_filesystem", return_value=False)
+    _incremental_project(temporary_dir)
+    site_dir = os.path.join(temporary_dir, "site")
+    project_config = _incremental_config(temporary_dir)
+    project_config["keep_previous_output"] = True
+    render.documentation(project_config)
+
+    with open(os.path.join(temporary_dir, "docs", "guide.md"), "w") as guide:
+        guide.write("# Guide\n\nSecond generation\n")
+    mocker.spy(render, "_swap_into_place")
+    render.documentation(project_config, overwrite=True)
+    render._swap_into_place.assert_called_once()
+
+    # changed files are copied into the new generation, unchanged files linked to the previous
+    guide_html = os.path.join("docs", "guide", "index.html")
+    with open(os.path.join(site_dir, guide_html)) as guide:
+        assert "Second generation" in guide.read()
+    with open(os.path.join(f"{site_dir}.previous", guide_html)) as guide:
+        assert "Second generation" not in guide.read()
+    logo = os.path.join("assets", "images", "favicon.png")
+    assert os.path.samefile(
+        os.path.join(site_dir, logo), os.path.join(f"{site_dir}.previous", logo)
+    )
+    cached_guide = os.path.join(temporary_dir, ".portray-cache", "site", guide_html)
+    assert not os.path.samefile(os.path.join(site_dir, guide_html), cached_guide)
+
+    render.rollback(project_config)
+    with open(os.path.join(site_dir, guide_html)) as guide:
+        assert "Second generation" not in guide.read()
+
+
+def _search_locations(site_dir):
+    """Returns the location of every document within a website's search index."""
+    search_dir = os.path.join(site_dir, "search")
+    if os.path.isfile(os.path.join(search_dir, "search_index.json")):
+        with open(os.path.join(search_dir, "search_index.json")) as search_index:
+            return {entry["location"] for entry in json.load(search_index)["docs"]}
+
+    with open(os.path.join(search_dir, "manifest.json")) as manifest_file:
+        manifest = json.load(manifest_file)
+    records = []
+    for document_shard in manifest["docs"]["document_shards"]:
+        with open(os.path.join(search_dir, document_shard)) as document_shard_file:
+            records.extend(json.load(document_shard_file))
+    return {
+        record[0] if len(record) == 3 else records[record[3]][0] + record[0] for record in records
+    }
+
+
+@pytest.mark.parametrize("search_index", ["sharded", "mkdocs"])
+def test_reloadable_documentation(temporary_dir, mocker, search_index):
+    _incremental_project(temporary_dir)
+    project_config = _incremental_config(temporary_dir)
+    project_config.update(incremental=False, search_index=search_index)
+    with render.documentation_in_reloadable_folder(project_config) as (_, site_dir, rebuild):
+        mocker.spy(render, "pdocs")
+        mocker.spy(render, "mkdocs")
+
+        # Nothing changed, nothing to do
+        rebuild()
+        render.pdocs.assert_not_called()
+        render.mkdocs.assert_not_called()
+
+        # Editing a page only renders that page again, keeping every other page searchable
+        with open(os.path.join(temporary_dir, "docs", "guide.md"), "w") as guide:
+            guide.write("# Guide\n\nEdited guide content\n")
+        rebuild()
+        render.pdocs.assert_not_called()
+        assert render.mkdocs.call_args[1]["dirty"]
+        with open(os.path.join(site_dir, "docs", "guide", "index.html")) as guide_html:
+            assert "Edited guide content" in guide_html.read()
+        assert {"", "docs/guide/", "reference/incremental_module/"}.issubset(
+            _search_locations(site_dir)
+        )
+
+        # Adding a page changes the nav, so the whole website is rendered again
+        with open(os.path.join(temporary_dir, "docs", "new.md"), "w") as new_page:
+            new_page.write("# New\n")
+        rebuild()
+        assert not render.mkdocs.call_args[1]["dirty"]
+        with open(os.path.join(site_dir, "index.html")) as index_html:
+            assert "docs/new/" in index_html.read()
+
+        # Editing a module only regenerates its reference documentation
+        with open(os.path.join(temporary_dir, "incremental_module.py"), "a") as module:
+            module.write('\n\ndef reloaded():\n    """Reloaded function"""\n')
+        rebuild()
+        render.pdocs.assert_called_once()
+        assert render.mkdocs.call_args[1]["dirty"]
+        with open(os.path.join(site_dir, "reference", "incremental_module", "index.html")) as ref:
+            assert "Reloaded function" in ref.read()
+
+
+def test_reload_reuses_validated_mkdocs_config(temporary_dir, mocker):
+    _incremental_project(temporary_dir)
+    project_config = _incremental_config(temporary_dir)
+    project_config["incremental"] = False
+    validate = mocker.spy(mkdocs.config.defaults, "get_schema")
+    mkdocs_build = mocker.spy(mkdocs.commands.build, "build")
+    with render.documentation_in_reloadable_folder(project_config) as (_, site_dir, rebuild):
+        validate.assert_called_once()
+        built_config = mkdocs_build.call_args[0][0]
+        theme_dirs = list(built_config["theme"].dirs)
+
+        for edit in ("First", "Second"):
+            # as plugins might while building
+            built_config["extra_javascript"].append("plugin.js")
+            built_config["theme"].dirs.append("plugin_templates")
+
+            with open(os.path.join(temporary_dir, "docs", "guide.md"), "w") as guide:
+                guide.write(f"# Guide\n\n{edit} edit\n")
+            rebuild()
+            with open(os.path.join(site_dir, "docs", "guide", "index.html")) as guide_html:
+                assert f"{edit} edit" in guide_html.read()
+
+            # the validated config is reused, restored to the state validation left it in
+            validate.assert_called_once()
+            assert mkdocs_build.call_args[0][0] is built_config
+            assert "plugin.js" not in built_config["extra_javascript"]
+            assert built_config["theme"].dirs == theme_dirs
+
+        # while changing the MkDocs configuration validates it again
+        project_config["mkdocs"]["site_description"] = "Changed"
+        rebuild(project_config)
+        assert validate.call_count == 2
+
+
+def test_nested_docs(temporary_dir):
+    for path in (
+        "docs/index.md",
+        "docs/a/page.md",
+        "docs/a-b/page.md",
+        "docs/deep/er/est/page.md",
+        "docs/no_docs/image.png",
+        "docs/.hidden/page.md",
+        "docs/.hidden.md",
+    ):
+        os.makedirs(os.path.dirname(os.path.join(temporary_dir, path)), exist_ok=True)
+        with open(os.path.join(temporary_dir, path), "w") as doc:
+            doc.write("# Doc\n")
+    os.symlink(
+        os.path.join(temporary_dir, "docs"), os.path.join(temporary_dir, "docs", "a", "loop")
+    )
+
+    nav = render._nested_docs(
+        os.path.join(temporary_dir, "docs"), temporary_dir, config.PORTRAY_DEFAULTS
     )
+    assert nav == [
+        {"Index": "docs/index.md"},
+        {"A B": [{"Page": "docs/a-b/page.md"}]},
+        {"A": [{"Page": "docs/a/page.md"}]},
+        {"Deep": [{"Er": [{"Est": [{"Page": "docs/deep/er/est/page.md"}]}]}]},
+    ]
+    assert render._nested_docs(os.path.join(temporary_dir, "missing"), temporary_dir, {}) == []
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_profiled_documentation(temporary_dir, workers):
+    _incremental_project(temporary_dir)
+    project_config = _incremental_config(temporary_dir)
+    project_config.update(incremental=False, workers=workers)
+    with profiling.recording() as phases:
+        render.documentation(project_config)
+
+    names = [phase["name"] for phase in phases]
+    for name in (
+        "build",
+        "stage",
+        "stage docs",
+        "nav",
+        "reference documentation",
+        "pdocs incremental_module",
+        "mkdocs config validation",
+        "mkdocs build",
+        "swap into place",
+    ):
+        assert name in names
+    assert all("wall_time" in phase for phase in phases)
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_precompressed_documentation(temporary_dir, mocker, incremental):
+    _incremental_project(temporary_dir)
+    project_config = _incremental_config(temporary_dir)
+    project_config.update(incremental=incremental, precompress=["gzip"])
+    compress = mocker.spy(compression, "_compress")
+    render.documentation(project_config)
+    site_dir = project_config["output_dir"]
+    assert os.path.isfile(os.path.join(site_dir, "index.html.gz"))
+    assert os.path.isfile(os.path.join(site_dir, "search", "search_index.json.gz"))
+    first_build_compressions = compress.call_count
+
+    # rebuilding only compresses what changed
+    with open(os.path.join(temporary_dir, "docs", "guide.md"), "w") as guide:
+        guide.write("# Guide\n\nEdited guide content\n")
+    render.documentation(project_config, overwrite=True)
+    assert 0 < compress.call_count - first_build_compressions < first_build_compressions
+    with gzip.open(os.path.join(site_dir, "docs", "guide", "index.html.gz"), "rt") as guide_html:
+        assert "Edited guide content" in guide_html.read()
+
+    with pytest.raises(ValueError):
+        render.documentation({**project_config, "precompress": ["zip"]}, overwrite=True)
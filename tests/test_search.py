@@ -0,0 +1,129 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+from portray import config, render, search
+
+PAGE_CONTENT = """
+<p>An introduction to <code>as_html</code> &amp; friends.</p>
+<h2 id="installing">Installing<a class="headerlink" href="#installing">&para;</a></h2>
+<p>Install using pip.</p>
+<h3>Not in the table of contents</h3>
+<p>Still part of installing.</p>
+<script>var ignored = "javascript"</script>
+<h2 id="usage">Usage</h2>
+<p>Generate documentation.</p>
+"""
+
+
+def _toc_item(toc_id, title, children=()):
+    return SimpleNamespace(id=toc_id, title=title, children=list(children))
+
+
+def _page(url="guide/", title="Guide", content=PAGE_CONTENT):
+    toc = [_toc_item("installing", "Installing", [_toc_item("usage", "Usage")])]
+    return SimpleNamespace(url=url, title=title, content=content, toc=toc)
+
+
+def test_documents():
+    assert search.documents(_page()) == [
+        ("guide/", "Guide", "An introduction to as_html & friends."),
+        (
+            "#installing",
+            "Installing",
+            "Install using pip. Not in the table of contents Still part of installing.",
+        ),
+        ("#usage", "Usage", "Generate documentation."),
+    ]
+    assert [title for _, title, _ in search.documents(_page(), "sections")] == [
+        "Guide",
+        "Installing",
+        "Usage",
+    ]
+    assert search.documents(_page(), "titles") == [("guide/", "Guide", "")]
+
+
+def test_terms():
+    assert search.terms("Renders as_html() into `site`, 2 times!") == [
+        "renders",
+        "as",
+        "html",
+        "into",
+        "site",
+        "times",
+    ]
+
+
+def test_write(temporary_dir):
+    with open(os.path.join(temporary_dir, "search_index.json"), "w") as search_index:
+        search_index.write("{}")
+    with open(os.path.join(temporary_dir, "shard.0123456789abcdef.json"), "w") as stale_shard:
+        stale_shard.write("{}")
+
+    pages = [
+        search.documents(_page()),
+        search.documents(_page("usage/", "Usage", "<p>Usage, usage and more usage.</p>")),
+    ]
+    manifest = search.write(temporary_dir, pages, {"lang": ["en"], "separator": r"[\s\-]+"})
+    with open(os.path.join(temporary_dir, "manifest.json")) as manifest_file:
+        assert json.load(manifest_file) == manifest
+    index = manifest["docs"]
+    assert index["documents"] == 4
+    assert manifest["config"]["lang"] == ["en"]
+
+    with open(os.path.join(temporary_dir, index["document_shards"][0])) as documents_file:
+        records = json.load(documents_file)
+    assert records[1] == ["#installing", "Installing", pages[0][1][2], 0]
+    assert records[3] == ["usage/", "Usage", "Usage, usage and more usage."]
+
+    # postings list documents (relative to the previous one) with their weights
+    with open(os.path.join(temporary_dir, index["shards"]["us"])) as shard_file:
+        shard = json.load(shard_file)
+    assert shard["usage"] == [2, search.TITLE_WEIGHT, 1, 3 + search.TITLE_WEIGHT]
+    assert shard["using"] == [1, 1]
+
+    written = {"manifest.json", *index["document_shards"], *index["shards"].values()}
+    assert set(os.listdir(temporary_dir)) == written  # replacing the previous index
+
+
+def test_sharded_search_index(temporary_dir, chdir, mocker):
+    with open(os.path.join(temporary_dir, "README.md"), "w") as readme:
+        readme.write("# Searchable\n\n## Sharded\n\nFound by the sharded search index.\n")
+
+    with chdir(temporary_dir):
+        project_config = config.project(
+            directory=temporary_dir,
+            config_file="pyproject.toml",
+            modules=[],
+            include_reference_documentation=False,
+            output_dir=os.path.join(temporary_dir, "site"),
+            search_index="sharded",
+        )
+        render.documentation(project_config)
+        site_dir = project_config["output_dir"]
+        assert not os.path.exists(os.path.join(site_dir, "search", "search_index.json"))
+        assert os.path.isfile(os.path.join(site_dir, "search", "manifest.json"))
+        worker = os.path.join("assets", "javascripts", "workers", "portray_search.js")
+        assert os.path.isfile(os.path.join(site_dir, worker))
+        with open(os.path.join(site_dir, "index.html")) as index_html:
+            assert "portray_search.js" in index_html.read()
+
+        # MkDocs' own search index is written by default
+        render.documentation({**project_config, "search_index": "mkdocs"}, overwrite=True)
+        assert os.path.isfile(os.path.join(site_dir, "search", "search_index.json"))
+        assert not os.path.exists(os.path.join(site_dir, "search", "manifest.json"))
+        with open(os.path.join(site_dir, "index.html")) as index_html:
+            assert "portray_search.js" not in index_html.read()
+        assert config.PORTRAY_DEFAULTS["search_index"] == "mkdocs"
+
+        # and in place of the sharded index with releases of the theme it isn't supported by
+        mocker.patch.object(search, "theme_version", return_value=(9, 1))
+        mocker.patch.dict(render._validated_mkdocs_configs, clear=True)
+        with pytest.warns(UserWarning, match="isn't supported by mkdocs-material 9.1"):
+            render.documentation(project_config, overwrite=True)
+        assert os.path.isfile(os.path.join(site_dir, "search", "search_index.json"))
+        assert not os.path.exists(os.path.join(site_dir, "search", "manifest.json"))
+
+        with pytest.raises(ValueError):
+            render.documentation({**project_config, "search_index": "lunr"}, overwrite=True)
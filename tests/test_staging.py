@@ -0,0 +1,51 @@
+import os
+
+import pytest
+from portray import staging
+
+
+def _source_tree(directory):
+    source = os.path.join(directory, "source")
+    os.makedirs(os.path.join(source, "nested"))
+    with open(os.path.join(source, "image.png"), "wb") as image:
+        image.write(b"\x89PNG" * 1024)
+    with open(os.path.join(source, "nested", "page.md"), "w") as page:
+        page.write("# Page\n")
+    return source
+
+
+@pytest.mark.parametrize("strategy", staging.STRATEGIES)
+def test_place_tree(temporary_dir, strategy):
+    source = _source_tree(temporary_dir)
+    destination = os.path.join(temporary_dir, "staged", "media")
+    staging.place_tree(source, destination, strategy)
+
+    with open(os.path.join(destination, "nested", "page.md")) as page:
+        assert page.read() == "# Page\n"
+    with open(os.path.join(destination, "image.png"), "rb") as image:
+        assert image.read() == b"\x89PNG" * 1024
+
+    if strategy == "symlink":
+        assert os.path.islink(destination)
+    elif strategy == "hardlink":
+        assert os.path.samefile(
+            os.path.join(source, "image.png"), os.path.join(destination, "image.png")
+        )
+
+
+@pytest.mark.parametrize("strategy", staging.STRATEGIES)
+def test_place_file_never_writes_through(temporary_dir, strategy):
+    source = _source_tree(temporary_dir)
+    destination = os.path.join(temporary_dir, "staged", "page.md")
+    staging.place_file(os.path.join(source, "image.png"), destination, strategy)
+    staging.place_file(os.path.join(source, "nested", "page.md"), destination, strategy)
+
+    with open(destination) as page:
+        assert page.read() == "# Page\n"
+    with open(os.path.join(source, "image.png"), "rb") as image:
+        assert image.read() == b"\x89PNG" * 1024
+
+
+def test_unknown_strategy(temporary_dir):
+    with pytest.raises(ValueError):
+        staging.place_file(__file__, os.path.join(temporary_dir, "test.py"), "teleport")
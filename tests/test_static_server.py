@@ -0,0 +1,104 @@
+import gzip
+import http.client
+import os
+import threading
+
+import pytest
+from portray import api, static_server
+
+PAGE = "<html><body>" + "<p>Served documentation</p>" * 200 + "</body></html>"
+
+
+@pytest.fixture()
+def site(temporary_dir):
+    site_dir = os.path.join(temporary_dir, "site")
+    os.makedirs(os.path.join(site_dir, "docs"))
+    os.makedirs(os.path.join(site_dir, "assets"))
+    with open(os.path.join(site_dir, "index.html"), "w") as index:
+        index.write(PAGE)
+    with open(os.path.join(site_dir, "index.html.gz"), "wb") as compressed_index:
+        compressed_index.write(gzip.compress(PAGE.encode()))
+    with open(os.path.join(site_dir, "docs", "index.html"), "w") as docs_index:
+        docs_index.write("<p>Docs</p>")
+    with open(os.path.join(site_dir, "assets", "bundle.8492ddcf.min.js"), "w") as bundle:
+        bundle.write("console.log('bundled');")
+    with open(os.path.join(site_dir, "404.html"), "w") as not_found:
+        not_found.write("<p>Nothing here</p>")
+
+    http_server = static_server.server(site_dir, port=0)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    connection = http.client.HTTPConnection("127.0.0.1", http_server.server_address[1])
+    yield connection
+    connection.close()
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def _get(connection, path, method="GET", **headers):
+    connection.request(method, path, headers=headers)
+    response = connection.getresponse()
+    return response, response.read()
+
+
+def test_static_server(site):
+    response, body = _get(site, "/")
+    assert response.status == 200
+    assert body.decode() == PAGE
+    assert response.getheader("Content-Type") == "text/html"
+    assert response.getheader("Cache-Control") == "no-cache"
+    assert response.getheader("Vary") == "Accept-Encoding"
+    etag = response.getheader("ETag")
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    # conditional requests, over the same persistent connection
+    response, body = _get(site, "/index.html", **{"If-None-Match": etag})
+    assert (response.status, body) == (304, b"")
+    response, body = _get(site, "/", **{"If-Modified-Since": response.getheader("Last-Modified")})
+    assert (response.status, body) == (304, b"")
+    response, _ = _get(site, "/", **{"If-None-Match": '"outdated"'})
+    assert response.status == 200
+
+    # precompressed variants, to clients accepting them
+    response, body = _get(site, "/", **{"Accept-Encoding": "br;q=0, gzip"})
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(body).decode() == PAGE
+    assert response.getheader("ETag") != etag
+    response, body = _get(site, "/", **{"Accept-Encoding": "gzip;q=0"})
+    assert response.getheader("Content-Encoding") is None
+
+    response, body = _get(site, "/", method="HEAD")
+    assert body == b""
+    assert response.getheader("Content-Length") == str(len(PAGE))
+
+    response, body = _get(site, "/assets/bundle.8492ddcf.min.js")
+    assert response.getheader("Cache-Control") == static_server.IMMUTABLE_CACHE_CONTROL
+    assert response.getheader("Vary") is None
+
+    response, _ = _get(site, "/docs?page=1")
+    assert response.status == 301
+    assert response.getheader("Location") == "/docs/?page=1"
+    response, body = _get(site, "/docs/")
+    assert body == b"<p>Docs</p>"
+
+    response, body = _get(site, "/missing/")
+    assert (response.status, body) == (404, b"<p>Nothing here</p>")
+    response, _ = _get(site, "/../../etc/passwd")
+    assert response.status == 404
+
+
+def test_production_server(mocker, project_dir, chdir):
+    served = []
+
+    def serve(docs_folder, host, port):
+        served.append((host, port))
+        assert os.path.isfile(os.path.join(docs_folder, "index.html"))
+        assert os.path.isfile(os.path.join(docs_folder, "index.html.gz"))
+
+    mocker.patch("portray.static_server.serve", side_effect=serve)
+    with chdir(project_dir):
+        api.server(production=True)
+    assert served == [("127.0.0.1", 8000)]
+
+    with pytest.raises(ValueError):
+        api.server(production=True, reload=True)
@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+from git import Repo
+from portray import versions
+
+
+def _repository(directory):
+    repository = Repo.init(directory)
+    with repository.config_writer() as git_config:
+        git_config.set_value("user", "name", "portray")
+        git_config.set_value("user", "email", "portray@example.com")
+    return repository
+
+
+def _commit(repository, files, message):
+    for path, contents in files.items():
+        path = os.path.join(repository.working_tree_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as written:
+            written.write(contents)
+    repository.index.add(list(files))
+    return repository.index.commit(message).hexsha
+
+
+def test_name():
+    assert versions.name("v1.2.0") == "v1.2.0"
+    assert versions.name("origin/main") == "origin-main"
+    assert versions.name("HEAD~1") == "HEAD-1"
+    with pytest.raises(ValueError):
+        versions.name("..")
+
+
+def test_export(temporary_dir):
+    repository = _repository(os.path.join(temporary_dir, "repository"))
+    first = _commit(repository, {"project/module.py": "FIRST = 1\n", "other.py": ""}, "first")
+    repository.create_tag("v1")
+    second = _commit(repository, {"project/module.py": "SECOND = 2\n"}, "second")
+
+    cache_directory = os.path.join(temporary_dir, "cache")
+    project = os.path.join(repository.working_tree_dir, "project")
+    commit, exported = versions.export(project, "v1", cache_directory)
+    assert commit == first
+    assert os.path.basename(exported) == "project"
+    assert sorted(os.listdir(exported)) == ["module.py"]  # only the project is exported
+    with open(os.path.join(exported, "module.py")) as module:
+        assert module.read() == "FIRST = 1\n"
+    assert versions.export(project, "v1", cache_directory) == (commit, exported)
+
+    assert versions.export(project, "HEAD", cache_directory)[0] == second
+    versions.prune_exports(cache_directory, [second])
+    assert os.listdir(os.path.join(cache_directory, versions.EXPORTS_DIRECTORY)) == [second]
+    assert repository.git.status("--porcelain") == ""  # the working tree is left untouched
+
+
+def test_write(temporary_dir):
+    for version in ("v1", "v2", "unlisted"):
+        os.makedirs(os.path.join(temporary_dir, version))
+    versions.write(
+        temporary_dir, [{"version": "v2", "title": "v2"}, {"version": "v1", "title": "v1"}]
+    )
+    with open(os.path.join(temporary_dir, "index.html")) as index:
+        assert 'url=v2/"' in index.read()
+
+    versions.write(temporary_dir, [{"version": "v1", "title": "refs/tags/v1"}], "v1")
+    with open(os.path.join(temporary_dir, versions.VERSIONS_FILE)) as versions_file:
+        assert json.load(versions_file) == [
+            {"version": "v1", "title": "refs/tags/v1", "aliases": []}
+        ]
+    # versions no longer documented are removed, anything else is left as is
+    assert sorted(os.listdir(temporary_dir)) == ["index.html", "unlisted", "v1", "versions.json"]